@@ -0,0 +1,207 @@
+"""
+Conditional-Logit Win Model — Benter-style, fitted on padded races
+==================================================================
+The engine's win calibrator is a per-horse LogisticRegression on the
+ranker score, renormalized inside each race afterwards. It is fitted as if
+every runner were an independent coin, although exactly one runner wins
+each race. The conditional (multinomial) logit fits that structure
+directly:
+
+  p_i = exp(x_i . beta) / sum_{j in race} exp(x_j . beta)
+
+  clogit   x = [model_score]
+  benter   x = [model_score, log public p]   (public p = normalized 1/win_odds)
+           — Benter's second stage: how far to trust the model over the
+           market, fitted rather than assumed
+
+Races are padded to one (n_races, max_field, k) array with a runner mask
+(race_tensor.py), so the log-likelihood and its gradient are a few
+whole-array operations and L-BFGS converges in a few dozen evaluations —
+a 5-season window fits in well under a second. Races without exactly one
+winner among the kept runners carry no conditional-logit information and
+are left out.
+
+predict_proba keeps sklearn's shape for ONE field (column 1 = p_i, summing
+to 1 over the field), so a score-only model drops in wherever the
+LogisticRegression calibrator is used. WalkForwardEngine(win_model=...)
+selects it in _fit_model; win_probability() builds the inputs per field.
+
+  evaluate   one development season: out-of-sample win log-loss (per race)
+             and fit time of logistic / clogit / benter
+
+Run from project root:
+    python3 backtest_engine/conditional_logit.py evaluate --season 2023/2024
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+import numpy as np
+from scipy.optimize import minimize
+from scipy.special import logsumexp
+
+log = logging.getLogger("conditional_logit")
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+sys.path.insert(0, _SCRIPT_DIR)
+sys.path.insert(0, os.path.join(_PROJECT_ROOT, "data_pipeline"))
+from race_tensor import pad_races, masked_logsumexp, masked_softmax   # noqa: E402
+
+WIN_MODELS = ('logistic', 'clogit', 'benter')
+L2 = 1e-4          # ridge on beta, per race
+
+
+def public_log_prob(win_odds: np.ndarray) -> np.ndarray:
+    """log of the normalized 1/win_odds of one field."""
+    inv = 1.0 / np.asarray(win_odds, dtype=float)
+    return np.log(inv / inv.sum())
+
+
+def _nll(beta, Xp, mask, win_slot, l2):
+    """Mean negative conditional log-likelihood and its gradient."""
+    z = Xp @ beta
+    lse = masked_logsumexp(z, mask)
+    p = masked_softmax(z, mask)
+    R = len(Xp)
+    Xw = Xp[np.arange(R), win_slot]
+    f = -(z[np.arange(R), win_slot] - lse).mean() + 0.5 * l2 * beta @ beta
+    g = -(Xw - np.einsum('rm,rmk->rk', p, Xp)).mean(axis=0) + l2 * beta
+    return f, g
+
+
+class ConditionalLogit:
+    """Per-race multinomial logit on [model_score] (+ public log prob)."""
+
+    def __init__(self, public: bool = False, l2: float = L2):
+        self.public = public
+        self.l2 = l2
+        self.coef_ = None
+
+    def inputs(self, score: np.ndarray, win_odds=None) -> np.ndarray:
+        """One field's design matrix."""
+        score = np.asarray(score, dtype=float)
+        if not self.public:
+            return score.reshape(-1, 1)
+        return np.column_stack([score, public_log_prob(win_odds)])
+
+    def fit(self, X: np.ndarray, race_ids: np.ndarray, won: np.ndarray) -> "ConditionalLogit":
+        """X (N, k) one row per runner, race_ids / won (0/1) aligned."""
+        T = pad_races(race_ids, X)
+        W = T.take(np.asarray(won, dtype=float))
+        keep = W.sum(axis=1) == 1
+        Xp, mask, win_slot = T.values[keep], T.mask[keep], np.argmax(W[keep], axis=1)
+        res = minimize(_nll, np.zeros(Xp.shape[2]), args=(Xp, mask, win_slot, self.l2),
+                       jac=True, method='L-BFGS-B')
+        self.coef_ = res.x
+        self.n_races_, self.nll_ = int(keep.sum()), float(res.fun)
+        return self
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """ONE field: column 1 is p_i (sums to 1 over the rows)."""
+        z = np.asarray(X, dtype=float) @ self.coef_
+        p = np.exp(z - logsumexp(z))
+        return np.column_stack([1.0 - p, p])
+
+    def predict_races(self, Xp: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Whole season at once: Xp (R, M, k) padded inputs -> (R, M) p."""
+        return masked_softmax(Xp @ self.coef_, mask)
+
+
+def fit_win_model(kind: str, score: np.ndarray, race_ids: np.ndarray, won: np.ndarray,
+                  win_odds=None) -> ConditionalLogit:
+    """clogit / benter on in-sample ranker scores. For benter, rows without
+    a win price are dropped (as the desk drops them) before the public
+    probability is normalized per race."""
+    model = ConditionalLogit(public=(kind == 'benter'))
+    score = np.asarray(score, dtype=float)
+    if not model.public:
+        return model.fit(score.reshape(-1, 1), race_ids, won)
+    import pandas as pd
+    t = pd.DataFrame({'race_id': race_ids, 'score': score, 'won': won,
+                      'inv': 1.0 / pd.to_numeric(pd.Series(win_odds), errors='coerce').to_numpy()})
+    t = t.dropna(subset=['inv'])
+    pub = np.log(t['inv'] / t.groupby('race_id', sort=False)['inv'].transform('sum'))
+    return model.fit(np.column_stack([t['score'].to_numpy(), pub.to_numpy()]),
+                     t['race_id'].to_numpy(), t['won'].to_numpy())
+
+
+# =====================================================================
+# EVALUATE
+# =====================================================================
+def evaluate(season: str, eng) -> dict:
+    """Out-of-sample mean -log p(winner) per race, same ranker, each win
+    model on the same priced fields."""
+    import pandas as pd
+    import walk_forward_engine_v32 as wfe
+
+    tr_start, tr_end = wfe.train_window_bounds(season)
+    te_start, te_end = wfe.season_bounds(season)
+    c = eng.cache
+    train = c[(c['date_iso'] >= tr_start) & (c['date_iso'] <= tr_end)]
+    test = c[(c['date_iso'] >= te_start) & (c['date_iso'] <= te_end)]
+    eng.win_model = 'logistic'
+    ranker, _, _ = eng._fit_model(train)
+    fit_df = _in_sample(eng, ranker, train)
+    out = {}
+    for kind in WIN_MODELS:
+        eng.win_model = kind
+        t = time.perf_counter()
+        cal_win = eng._fit_win_calibrator(fit_df)
+        fit_s = time.perf_counter() - t
+        losses = []
+        for _, snap in test.groupby('race_id', sort=False):
+            df = snap.dropna(subset=eng.features)
+            df = df.assign(win_odds=pd.to_numeric(df['win_odds'], errors='coerce')).dropna(
+                subset=['win_odds'])
+            won = (pd.to_numeric(df['finish_position'], errors='coerce') == 1).to_numpy()
+            if len(df) < wfe.MIN_FIELD or won.sum() != 1:
+                continue
+            score = ranker.predict(df[eng.features].astype(float))
+            p = wfe.win_probability(cal_win, score, df['win_odds'].to_numpy(dtype=float))
+            losses.append(-np.log(p[won][0] / p.sum()))
+        out[kind] = {'log_loss': float(np.mean(losses)), 'races': len(losses),
+                     'fit_s': fit_s, 'coef': getattr(cal_win, 'coef_', None)}
+    return out
+
+
+def _in_sample(eng, ranker, train_df):
+    """The frame _fit_model fits its calibrators on."""
+    import pandas as pd
+    df = train_df.dropna(subset=eng.features)
+    df = df[df['finish_position'].notna()].sort_values(['date_iso', 'race_id'])
+    return df.assign(
+        model_score=ranker.predict(df[eng.features].astype(float)),
+        is_win=(pd.to_numeric(df['finish_position'], errors='coerce') == 1).astype(int))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import walk_forward_engine_v32 as wfe
+
+    ap = argparse.ArgumentParser(description="Conditional-logit win model vs per-horse logistic")
+    ap.add_argument('--db', default=wfe.DB_PATH)
+    ap.add_argument('--cache-dir', default=wfe.CACHE_DIR)
+    ap.add_argument('--incident-features', action='store_true')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    ev = sub.add_parser('evaluate', help="out-of-sample win log-loss per win model")
+    ev.add_argument('--season', default=wfe.DEV_SEASONS[-1])
+    args = ap.parse_args()
+    if args.season not in wfe.DEV_SEASONS:
+        ap.error(f"evaluate runs on development seasons only, not {args.season}")
+
+    eng = wfe.WalkForwardEngine(args.db, cache_dir=args.cache_dir,
+                                incident_features=args.incident_features)
+    res = evaluate(args.season, eng)
+    log.info(f"{args.season}: {next(iter(res.values()))['races']:,} test races")
+    log.info(f"{'model':>9} | {'win log-loss':>12} | {'fit s':>6} | coef")
+    for kind, r in res.items():
+        coef = '' if r['coef'] is None else np.array2string(np.ravel(r['coef']), precision=3)
+        log.info(f"{kind:>9} | {r['log_loss']:>12.4f} | {r['fit_s']:>6.2f} | {coef}")
+
+
+if __name__ == "__main__":
+    main()
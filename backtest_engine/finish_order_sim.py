@@ -0,0 +1,239 @@
+"""
+Finishing-Order Simulator — Gaussian copula over pace profiles
+==============================================================
+Every exotic price here goes through Harville: once the winner is out,
+the rest finish independently in proportion to their win chances. Pace
+breaks that: when the speed collapses, the closers come home together;
+when it crawls, the leaders hold on together. This simulator keeps the
+engine's win probabilities and adds that dependence:
+
+  runner i performs  Y_i = mu_i + G_i,  finishing order = Y descending
+  G_i                Gumbel margins, joined by a Gaussian copula with
+                     correlation  R = (1 - rho) I + rho K,
+                     K_ij = exp(-|profile_i - profile_j|^2 / 2) over the
+                     pace profile (shifted_rolling_ESI, shifted_rolling_CSI,
+                     each divided by its bandwidth); a runner without a
+                     profile is independent of the rest
+  mu_i               log p_i, then re-fitted on the simulated winners so the
+                     win probabilities stay the engine's
+
+With rho = 0 this is exactly Harville (independent Gumbel performances are
+the Plackett-Luce model), so rho is the only new assumption. One race
+draws N_SIMS orders with common random numbers, counts every top-3
+(a bincount over n^3 cells) and reads off all trio / tierce / quinella /
+forecast probabilities at once — ~50k orders in a few tens of ms.
+
+The desk uses it behind WalkForwardEngine's opt-in copula_rho: the
+engine-side trio probabilities come from here instead of Harville (the
+public side stays Harville on the win odds — that is how the pool prices).
+
+  evaluate   one development season: log-loss of the actual trio / tierce
+             under Harville vs the copula at several rho, from the same
+             model win probabilities
+
+Run from project root:
+    python3 backtest_engine/finish_order_sim.py evaluate --season 2023/2024
+    python3 backtest_engine/finish_order_sim.py evaluate --season 2023/2024 --rhos 0,0.2,0.4 --races 300
+"""
+
+import time
+import zlib
+import logging
+import argparse
+import itertools
+from typing import Optional
+
+import numpy as np
+from scipy.special import log_ndtr
+
+log = logging.getLogger("finish_order_sim")
+
+# pace-profile feature -> kernel bandwidth (in the feature's own units)
+PACE_PROFILE = {'shifted_rolling_ESI': 0.10, 'shifted_rolling_CSI': 1.0}
+COPULA_RHO = 0.3
+N_SIMS = 50_000
+CALIBRATION_ITERS = 8
+
+
+def check_rho(rho: float) -> float:
+    """rho must be in [0, 1): at 1 two runners with the same pace profile
+    are perfectly correlated and R is no longer positive definite."""
+    if not 0.0 <= rho < 1.0:
+        raise ValueError(f"copula rho must be in [0, 1), got {rho}")
+    return rho
+
+
+def race_seed(race_id: str) -> int:
+    """Stable per-race seed (common random numbers across runs)."""
+    return zlib.crc32(race_id.encode())
+
+
+def pace_correlation(profile: np.ndarray, rho: float) -> np.ndarray:
+    """(n, d) pace profiles, already divided by their bandwidths -> (n, n)
+    copula correlation. Rows with a missing profile are uncorrelated."""
+    n = len(profile)
+    ok = ~np.isnan(profile).any(axis=1)
+    diff = profile[:, None, :] - profile[None, :, :]
+    k = np.exp(-0.5 * np.nansum(diff ** 2, axis=-1))
+    k[~ok, :] = 0.0
+    k[:, ~ok] = 0.0
+    np.fill_diagonal(k, 1.0)
+    return (1.0 - rho) * np.eye(n) + rho * k
+
+
+class RaceOrderSim:
+    """Simulated finishing orders of one field; all top-3 probabilities.
+
+    horse_ids / p_win (normalized or not) / profile aligned by runner;
+    profile is (n, len(PACE_PROFILE)) raw feature values."""
+
+    def __init__(self, horse_ids, p_win, profile, rho: float = COPULA_RHO,
+                 n_sims: int = N_SIMS, seed: int = 0):
+        check_rho(rho)
+        p = np.asarray(p_win, dtype=float)
+        p = p / p.sum()
+        n = len(p)
+        if n < 3:
+            raise ValueError(f"need at least 3 runners, got {n}")
+        self.horse_ids = list(horse_ids)
+        self._pos = {h: i for i, h in enumerate(self.horse_ids)}
+        self.n, self.n_sims = n, n_sims
+
+        rng = np.random.default_rng(seed)
+        z = rng.standard_normal((n_sims, n))
+        if rho > 0:
+            bw = np.array(list(PACE_PROFILE.values()))
+            z = z @ np.linalg.cholesky(pace_correlation(np.asarray(profile, float) / bw, rho)).T
+        g = -np.log(-log_ndtr(z))                    # Gumbel margins
+
+        mu = np.log(p)
+        if rho > 0:                                  # keep the engine's win probabilities
+            floor = 0.5 / n_sims
+            for _ in range(CALIBRATION_ITERS):
+                won = np.bincount(np.argmax(g + mu, axis=1), minlength=n) / n_sims
+                mu += np.log(p) - np.log(np.maximum(won, floor))
+        self.mu = mu
+
+        y = g + mu
+        top = np.argpartition(-y, 2, axis=1)[:, :3]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(y, top, axis=1), axis=1),
+                                 axis=1)
+        cells = (top[:, 0] * n + top[:, 1]) * n + top[:, 2]
+        self.tierce = np.bincount(cells, minlength=n ** 3).reshape(n, n, n) / n_sims
+        self.forecast = self.tierce.sum(axis=2)                  # ordered 1-2
+        self.quinella = self.forecast + self.forecast.T          # unordered 1-2
+        self.trio = sum(self.tierce.transpose(perm) for perm in itertools.permutations(range(3)))
+        self.win = self.forecast.sum(axis=1)
+
+    def _ix(self, combo):
+        return tuple(self._pos[h] for h in combo)
+
+    def unordered_trio(self, combo) -> float:
+        """Same question as harville_unordered_trio(prob, combo)."""
+        return float(self.trio[self._ix(combo)])
+
+    def ordered_tierce(self, combo) -> float:
+        return float(self.tierce[self._ix(combo)])
+
+    def unordered_quinella(self, pair) -> float:
+        return float(self.quinella[self._ix(pair)])
+
+
+def copula_trio_fn(race_id: str, horse_ids, p_win, profile, rho: float = COPULA_RHO,
+                   n_sims: int = N_SIMS):
+    """combos -> engine trio probabilities, simulated only when the desk
+    asks (desk_decision's trio_fn hook)."""
+    check_rho(rho)
+
+    def trio(combos):
+        sim = RaceOrderSim(horse_ids, p_win, profile, rho, n_sims, race_seed(race_id))
+        return [sim.unordered_trio(c) for c in combos]
+    return trio
+
+
+# =====================================================================
+# EVALUATE (Harville vs copula log-loss)
+# =====================================================================
+def _harville_tierce(p, a, b, c) -> float:
+    return p[a] * p[b] / (1.0 - p[a]) * p[c] / (1.0 - p[a] - p[b])
+
+
+def evaluate(season: str, eng, rhos: list[float], max_races: Optional[int] = None,
+             n_sims: int = N_SIMS) -> dict:
+    """Mean -log P(actual trio) and -log P(actual tierce) per model."""
+    import pandas as pd
+    import walk_forward_engine_v32 as wfe
+
+    tr_start, tr_end = wfe.train_window_bounds(season)
+    te_start, te_end = wfe.season_bounds(season)
+    c = eng.cache
+    ranker, cal_win, _ = eng._fit_model(c[(c['date_iso'] >= tr_start) & (c['date_iso'] <= tr_end)])
+    test = c[(c['date_iso'] >= te_start) & (c['date_iso'] <= te_end)]
+
+    floor = 0.5 / n_sims
+    loss = {m: {'trio': [], 'tierce': []} for m in ['harville'] + [f"rho={r:g}" for r in rhos]}
+    sim_ms = []
+    for rid, snap in test.groupby('race_id', sort=False):
+        df = snap.dropna(subset=eng.features)
+        df = df.assign(win_odds=pd.to_numeric(df['win_odds'], errors='coerce')).dropna(
+            subset=['win_odds'])
+        pos = pd.to_numeric(df['finish_position'], errors='coerce').to_numpy()
+        if len(df) < wfe.MIN_FIELD or not all((pos == k).sum() == 1 for k in (1, 2, 3)):
+            continue
+        a, b, c3 = (int(np.flatnonzero(pos == k)[0]) for k in (1, 2, 3))
+        score = ranker.predict(df[eng.features].astype(float))
+        p = wfe.win_probability(cal_win, score, df['win_odds'].to_numpy(dtype=float))
+        p = p / p.sum()
+        perms = list(itertools.permutations((a, b, c3)))
+        loss['harville']['tierce'].append(-np.log(_harville_tierce(p, a, b, c3)))
+        loss['harville']['trio'].append(-np.log(sum(_harville_tierce(p, *x) for x in perms)))
+        profile = df[list(PACE_PROFILE)].to_numpy(dtype=float)
+        for r in rhos:
+            t = time.perf_counter()
+            sim = RaceOrderSim(range(len(p)), p, profile, r, n_sims, race_seed(rid))
+            sim_ms.append(1000 * (time.perf_counter() - t))
+            key = f"rho={r:g}"
+            loss[key]['tierce'].append(-np.log(max(sim.tierce[a, b, c3], floor)))
+            loss[key]['trio'].append(-np.log(max(sim.trio[a, b, c3], floor)))
+        if max_races and len(loss['harville']['trio']) >= max_races:
+            break
+    out = {m: {k: float(np.mean(v)) for k, v in d.items()} for m, d in loss.items()}
+    out['_races'] = len(loss['harville']['trio'])
+    out['_sim_ms'] = (float(np.median(sim_ms)), float(np.percentile(sim_ms, 99))) if sim_ms else (0, 0)
+    return out
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import walk_forward_engine_v32 as wfe
+
+    ap = argparse.ArgumentParser(description="Copula finishing-order simulator vs Harville")
+    ap.add_argument('--db', default=wfe.DB_PATH)
+    ap.add_argument('--cache-dir', default=wfe.CACHE_DIR)
+    ap.add_argument('--incident-features', action='store_true')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    ev = sub.add_parser('evaluate', help="trio / tierce log-loss, Harville vs copula")
+    ev.add_argument('--season', default=wfe.DEV_SEASONS[-1])
+    ev.add_argument('--rhos', default="0,0.15,0.3,0.5")
+    ev.add_argument('--races', type=int, default=None, help="cap on test races")
+    ev.add_argument('--sims', type=int, default=N_SIMS)
+    args = ap.parse_args()
+    if args.season not in wfe.DEV_SEASONS:
+        ap.error(f"evaluate runs on development seasons only, not {args.season}")
+    rhos = [float(r) for r in args.rhos.split(',')]
+    if not all(0.0 <= r < 1.0 for r in rhos):
+        ap.error(f"--rhos must all be in [0, 1), got {args.rhos}")
+
+    eng = wfe.WalkForwardEngine(args.db, cache_dir=args.cache_dir,
+                                incident_features=args.incident_features)
+    res = evaluate(args.season, eng, rhos, args.races, args.sims)
+    med, p99 = res.pop('_sim_ms')
+    log.info(f"{res.pop('_races'):,} races; one {args.sims:,}-order simulation: "
+             f"median {med:.1f} ms, p99 {p99:.1f} ms")
+    log.info(f"{'model':>10} | {'trio log-loss':>13} | {'tierce log-loss':>15}")
+    for m, v in res.items():
+        log.info(f"{m:>10} | {v['trio']:>13.4f} | {v['tierce']:>15.4f}")
+
+
+if __name__ == "__main__":
+    main()
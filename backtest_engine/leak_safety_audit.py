@@ -0,0 +1,271 @@
+"""
+v32 Leak-Safety Audit — shuffled-future replays
+===============================================
+The engine is leak-free only if every snapshot reads prior-race state:
+snapshot_for(race) BEFORE advance_race(race), with nothing read ahead.
+FeatureCacheBuilder.build follows that convention; this audit checks it
+end to end, treating the builder + engine as a black box.
+
+For each sampled cut race C it copies the database into memory and
+perturbs everything from C onward:
+  runners          each race's runners get their results (finishing
+                   order, margins, times, pace inputs) reassigned at
+                   random and jittered; pre-race fields stay with the horse
+  race_incidents   every trouble flag inverted
+  exotic_dividends every dividend scaled
+then replays FeatureCacheBuilder.build through C's day on that copy.
+Every snapshot of every race up to and including C must be IDENTICAL
+(exact values, NaN-aware, same dtypes) to an unperturbed replay. Only
+the label column (finish_position) may differ. Cuts run in parallel,
+one replay per process.
+
+--plant-leak runs the same audit on an engine that advances each race
+BEFORE snapshotting it, and must FAIL — a check of the audit itself.
+
+Run from project root:
+    python3 backtest_engine/leak_safety_audit.py
+    python3 backtest_engine/leak_safety_audit.py --samples 16 --workers 8
+    python3 backtest_engine/leak_safety_audit.py --through 2019-07-31 --plant-leak
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+log = logging.getLogger("leak_safety_audit")
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+sys.path.insert(0, _SCRIPT_DIR)
+sys.path.insert(0, os.path.join(_PROJECT_ROOT, "data_pipeline"))
+
+import stateful_feature_engine as sfe               # noqa: E402
+import walk_forward_engine_v32 as wfe               # noqa: E402
+from incident_tagger import INCIDENT_FLAG_COLS      # noqa: E402
+
+# Snapshot columns that are outcomes of the race itself, not features.
+LABEL_COLUMNS = ['finish_position']
+
+# Pre-race fields: they travel with the horse when results are reassigned.
+_PRE_RACE = ['horse_id', 'horse_no', 'horse_name', 'jockey', 'trainer',
+             'act_wt', 'horse_wt', 'draw', 'win_odds']
+_JITTER = ['lbw_lengths', 'finish_time_sec', 'esi_raw']
+
+
+# ---------------------------------------------------------------------
+# Perturbation
+# ---------------------------------------------------------------------
+def race_key_of(race_id: str) -> int:
+    """'2024-01-01_R7' -> 2024010107 (ingest_v32.race_key)."""
+    day, no = race_id.split('_R')
+    return int(day.replace('-', '')) * 100 + int(no)
+
+
+def perturb_future(conn: sqlite3.Connection, cut_key: int, seed: int) -> int:
+    """Scramble every result from race cut_key onward, in place. Returns
+    the number of runner rows rewritten."""
+    rng = np.random.default_rng(seed)
+    ru = pd.read_sql("SELECT * FROM runners WHERE race_key >= ? ORDER BY race_key",
+                     conn, params=(cut_key,))
+    if len(ru):
+        shuffled = (ru.assign(_r=rng.random(len(ru)))
+                    .sort_values(['race_key', '_r'], kind='stable'))
+        for c in _PRE_RACE:
+            ru[c] = shuffled[c].to_numpy()
+        for c in _JITTER:
+            ru[c] = ru[c] + rng.uniform(0.5, 5.0, len(ru))
+        ru['csi_raw'] = ru['csi_raw'] + rng.integers(1, 4, len(ru))
+    cols = list(ru.columns)
+    with conn:
+        conn.execute("DELETE FROM runners WHERE race_key >= ?", (cut_key,))
+        data = [ru[c].astype(object).where(ru[c].notna(), None).tolist() for c in cols]
+        conn.executemany(f"INSERT INTO runners ({', '.join(cols)}) "
+                         f"VALUES ({', '.join('?' * len(cols))})", zip(*data))
+        flips = ", ".join(f"{c} = 1 - {c}" for c in INCIDENT_FLAG_COLS)
+        conn.execute(f"UPDATE race_incidents SET {flips} WHERE race_key >= ?", (cut_key,))
+        conn.execute("UPDATE exotic_dividends SET dividend = dividend * 1.7 + 1 "
+                     "WHERE race_id IN (SELECT race_id FROM races WHERE race_key >= ?)",
+                     (cut_key,))
+    return len(ru)
+
+
+# ---------------------------------------------------------------------
+# Replays
+# ---------------------------------------------------------------------
+class _LeakyEngine(sfe.StatefulFeatureEngine):
+    """Planted leak for --plant-leak: the race's own result is folded into
+    the state before it is snapshotted."""
+
+    def snapshot_for(self, race_id):
+        self.advance_race(race_id)
+        return super().snapshot_for(race_id)
+
+    def advance_race(self, race_id):
+        if race_id in self._advanced:
+            return
+        self._advanced.add(race_id)
+        super().advance_race(race_id)
+
+    def reset(self):
+        super().reset()
+        self._advanced = set()
+
+
+def _replay(db_path: str, end_iso: str, cut_key: Optional[int], seed: int,
+            incident_features: bool, plant_leak: bool) -> pd.DataFrame:
+    """FeatureCacheBuilder.build through end_iso on an in-memory copy of
+    the database, perturbed from cut_key onward (None = untouched)."""
+    src = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn = sqlite3.connect(":memory:")
+    try:
+        src.backup(conn)
+        src.close()
+        if cut_key is not None:
+            perturb_future(conn, cut_key, seed)
+        builder = wfe.FeatureCacheBuilder(conn, incident_features=incident_features)
+        if plant_leak:
+            builder.fe = _LeakyEngine(conn)
+        with tempfile.TemporaryDirectory() as tmp:
+            return builder.build(end_iso, os.path.join(tmp, "cache.pkl"))
+    finally:
+        conn.close()
+
+
+def _canonical(snaps: pd.DataFrame, race_ids: set) -> pd.DataFrame:
+    df = snaps[snaps['race_id'].isin(race_ids)].drop(columns=LABEL_COLUMNS)
+    return df.sort_values(['race_id', 'horse_id']).reset_index(drop=True)
+
+
+def _first_difference(a: pd.DataFrame, b: pd.DataFrame) -> str:
+    if len(a) != len(b) or list(a.columns) != list(b.columns):
+        return f"shape {a.shape} vs {b.shape}"
+    for c in a.columns:
+        if a[c].dtype != b[c].dtype:
+            return f"{c}: dtype {a[c].dtype} vs {b[c].dtype}"
+        same = (a[c] == b[c]) | (a[c].isna() & b[c].isna())
+        if not same.all():
+            i = int(np.flatnonzero(~same.to_numpy())[0])
+            return (f"{c} @ {a.at[i, 'race_id']} {a.at[i, 'horse_id']}: "
+                    f"{a.at[i, c]!r} vs {b.at[i, c]!r}")
+    return "frames differ"
+
+
+def _quiet_replay(*args) -> pd.DataFrame:
+    """_replay without the builder's INFO progress lines."""
+    root = logging.getLogger()
+    prev = root.level
+    root.setLevel(logging.WARNING)
+    try:
+        return _replay(*args)
+    finally:
+        root.setLevel(prev)
+
+
+def _audit_job(job) -> dict:
+    (db_path, cut_id, cut_day, prefix, seed,
+     incident_features, plant_leak, reference) = job
+    t = time.perf_counter()
+    got = _quiet_replay(db_path, cut_day, race_key_of(cut_id), seed,
+                        incident_features, plant_leak)
+    a = _canonical(reference, prefix)
+    b = _canonical(got, prefix)
+    ok = a.equals(b)
+    return {'cut': cut_id, 'races': len(prefix), 'rows': len(a), 'ok': ok,
+            'diff': None if ok else _first_difference(a, b),
+            'seconds': time.perf_counter() - t}
+
+
+def audit(db_path: str, samples: int = 8, workers: Optional[int] = None,
+          through: Optional[str] = None, seed: int = 42,
+          incident_features: bool = True, plant_leak: bool = False) -> list[dict]:
+    """Sample cut races, replay each with a perturbed future, compare every
+    snapshot up to the cut against one unperturbed replay."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        races = conn.execute(wfe.CHRONO_RACES_SQL, (through or '9999-12-31',)).fetchall()
+    finally:
+        conn.close()
+    if not races:
+        raise ValueError(f"no bettable races in {db_path}")
+
+    rng = np.random.default_rng(seed)
+    picks = sorted(rng.choice(len(races), size=min(samples, len(races)), replace=False))
+    last_day = races[picks[-1]][1]
+    log.info(f"{len(races):,} races; {len(picks)} cuts from {races[picks[0]][0]} "
+             f"to {races[picks[-1]][0]}; reference replay through {last_day}")
+
+    t = time.perf_counter()
+    reference = _quiet_replay(db_path, last_day, None, seed, incident_features, plant_leak)
+    log.info(f"  reference replay: {len(reference):,} snapshot rows "
+             f"in {time.perf_counter() - t:.1f}s")
+
+    jobs = [(db_path, races[k][0], races[k][1],
+             {rid for rid, _ in races[:k + 1]}, seed + k,
+             incident_features, plant_leak,
+             reference[reference['date_iso'] <= races[k][1]])
+            for k in picks]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        return [_audit_job(j) for j in jobs]
+    # longest replays first so the pool drains evenly
+    order = sorted(range(len(jobs)), key=lambda i: -len(jobs[i][3]))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        done = dict(zip(order, ex.map(_audit_job, [jobs[i] for i in order])))
+    return [done[i] for i in range(len(jobs))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Shuffled-future leak audit of the v32 feature replay")
+    ap.add_argument('--db', default=wfe.DB_PATH)
+    ap.add_argument('--samples', type=int, default=8, help="cut races to test")
+    ap.add_argument('--workers', type=int, default=None, help="default: all cores")
+    ap.add_argument('--through', default=None,
+                    help="only sample races up to this ISO date (shorter replays)")
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--base-only', action='store_true',
+                    help="replay without the incident feature family")
+    ap.add_argument('--plant-leak', action='store_true',
+                    help="audit a deliberately leaky engine; the audit must FAIL")
+    args = ap.parse_args()
+    if not os.path.exists(args.db):
+        ap.error(f"no database at {args.db} (run data_pipeline/ingest_v32.py first)")
+
+    t = time.perf_counter()
+    results = audit(args.db, args.samples, args.workers, args.through, args.seed,
+                    incident_features=not args.base_only, plant_leak=args.plant_leak)
+    n_bad = 0
+    for r in results:
+        status = "ok" if r['ok'] else "FAIL"
+        log.info(f"[{status:>4}] cut {r['cut']}: {r['races']:,} races / {r['rows']:,} "
+                 f"snapshot rows identical={r['ok']} ({r['seconds']:.1f}s)")
+        if not r['ok']:
+            log.info(f"         first difference: {r['diff']}")
+            n_bad += 1
+    elapsed = time.perf_counter() - t
+
+    if args.plant_leak:
+        if n_bad:
+            log.info(f"Planted leak detected in {n_bad}/{len(results)} cuts ({elapsed:.0f}s).")
+            return
+        log.error("Planted leak NOT detected — the audit is not sensitive enough.")
+        sys.exit(1)
+    if n_bad:
+        log.error(f"{n_bad}/{len(results)} cuts: snapshots changed when only the "
+                  f"future changed — the replay leaks")
+        sys.exit(1)
+    log.info(f"No leakage: {len(results)} shuffled-future replays reproduce every "
+             f"snapshot up to their cut ({elapsed:.0f}s).")
+
+
+if __name__ == "__main__":
+    main()
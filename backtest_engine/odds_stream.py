@@ -0,0 +1,441 @@
+"""
+Odds Stream — desk decisions recomputed tick by tick
+====================================================
+Win odds move until the off; the desk's public probabilities, Harville
+block EV and Kelly stake move with them. This is an asyncio processor
+that consumes odds ticks from a pluggable source and re-runs the desk for
+the race a tick touches — only that race, and through ScoredField's
+cached selection only the public-side pricing unless a price crosses a
+desk line (see race_day_scorer.py). It emits an event when a decision
+crosses a threshold:
+
+  bet_on       the race became a bet (block EV / stake over the lines)
+  bet_off      a bet stopped qualifying (skip_reason says which line)
+  bet_revised  still a bet, but anchor, legs or ticket size changed
+  final        the decision standing at the off
+
+Messages (JSON, one per line, from any source):
+  {"race_id": "...", "odds": {"3": 4.6, "7": 12.0, "9": null}, "ts": 1694000000.0}
+      odds tick; partial (unlisted runners keep their price), null = withdrawn
+  {"type": "field", ...declared field...}
+      race_day_service.py declared field, snapshotted from the latest engine
+      checkpoint (listen mode)
+  {"type": "off", "race_id": "..."}      the off: emit final, drop the race
+  {"type": "end"}                        stop (socket source)
+
+Sources: FileTickSource (JSONL replay, optionally paced by ts) and
+SocketTickSource (localhost TCP, JSON lines — a stand-in for the tote
+feed). Latency is summarized per tick (tick_ms: merge + desk + event),
+per field scored (field_ms) and, on the socket, receipt -> decision
+(feed_lag_ms).
+
+  make-ticks   synthetic odds paths for a development season's races from
+               the feature cache, ending at each race's cached final odds
+  replay       run the processor over a tick file (--check: every tick's
+               decision == desk_decision; the decision at the off ==
+               _execute_desk on the cached snapshot)
+  listen       run the processor on a local socket
+  push         send a tick file to a listening processor
+
+Run from project root:
+    python3 backtest_engine/odds_stream.py make-ticks --season 2023/2024 --out ticks.jsonl
+    python3 backtest_engine/odds_stream.py replay --season 2023/2024 --ticks ticks.jsonl --check
+    python3 backtest_engine/odds_stream.py listen --season 2025/26 --port 8733
+    python3 backtest_engine/odds_stream.py push --ticks ticks.jsonl --port 8733 --speed 60
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+log = logging.getLogger("odds_stream")
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+sys.path.insert(0, _SCRIPT_DIR)
+sys.path.insert(0, os.path.join(_PROJECT_ROOT, "data_pipeline"))
+
+import walk_forward_engine_v32 as wfe                                # noqa: E402
+from walk_forward_engine_v32 import (WalkForwardEngine, desk_decision,  # noqa: E402
+                                     season_bounds, STARTING_BANKROLL)
+from race_day_scorer import (RaceDayScorer, ScoredField, bundle_path,  # noqa: E402
+                             decision_summary, MODEL_DIR)
+
+DEFAULT_PORT = 8733
+
+
+# =====================================================================
+# SOURCES
+# =====================================================================
+class FileTickSource:
+    """JSONL replay. speed=None replays as fast as possible; otherwise
+    waits (ts gap / speed) between messages that carry a ts."""
+
+    def __init__(self, path: str, speed: Optional[float] = None):
+        self.path, self.speed = path, speed
+
+    async def __aiter__(self):
+        prev_ts = None
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                msg = json.loads(line)
+                ts = msg.get('ts')
+                if self.speed and ts is not None and prev_ts is not None and ts > prev_ts:
+                    await asyncio.sleep((ts - prev_ts) / self.speed)
+                if ts is not None:
+                    prev_ts = ts
+                yield msg
+
+
+class SocketTickSource:
+    """Local TCP server; every connection sends JSON lines. Iteration ends
+    at an {"type": "end"} message."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.host, self.port = host, port
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info(f"Listening for ticks on {self.host}:{self.port}")
+
+    async def _client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    msg = json.loads(line)
+                except json.JSONDecodeError:
+                    log.warning(f"bad tick line: {line[:80]!r}")
+                    continue
+                msg.setdefault('_recv', time.perf_counter())
+                await self._queue.put(msg)
+        finally:
+            writer.close()
+
+    async def __aiter__(self):
+        if self.server is None:
+            await self.start()
+        try:
+            while True:
+                msg = await self._queue.get()
+                if msg.get('type') == 'end':
+                    return
+                yield msg
+        finally:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+# =====================================================================
+# PROCESSOR
+# =====================================================================
+class OddsStreamProcessor:
+    """Race id -> ScoredField, each re-decided on its own ticks only.
+
+    field_loader(race_id) -> snapshot or None supplies fields for race ids
+    first seen in a tick (cache replay); live declared fields arrive as
+    "field" messages and need a LiveFeatureService (`live`)."""
+
+    def __init__(self, scorer: RaceDayScorer, bankroll: float = STARTING_BANKROLL,
+                 field_loader: Optional[Callable] = None, live=None,
+                 sink: Optional[Callable[[dict], None]] = None, check: bool = False):
+        self.scorer, self.bankroll = scorer, bankroll
+        self.field_loader, self.live = field_loader, live
+        self.sink = sink or (lambda ev: log.info(json.dumps(ev, default=str)))
+        self.check = check
+        self.fields: dict[str, ScoredField] = {}
+        self._signature: dict[str, tuple] = {}
+        self.finals: dict[str, object] = {}
+        self.tick_ms: list[float] = []
+        self.field_ms: list[float] = []
+        self.feed_lag_ms: list[float] = []
+        self.counts = dict(ticks=0, unchanged=0, unknown=0, fields=0, events=0,
+                           check_mismatch=0)
+
+    # ---- fields ----
+    def add_field(self, snap: pd.DataFrame) -> ScoredField:
+        fld = self.scorer.score_field(snap)
+        self.fields[fld.race_id] = fld
+        self.counts['fields'] += 1
+        return fld
+
+    def _field(self, race_id: str) -> Optional[ScoredField]:
+        fld = self.fields.get(race_id)
+        if fld is None and self.field_loader is not None and race_id not in self.finals:
+            t = time.perf_counter()
+            snap = self.field_loader(race_id)
+            if snap is not None and len(snap):
+                fld = self.add_field(snap)
+                self.field_ms.append(1000 * (time.perf_counter() - t))
+        return fld
+
+    # ---- events ----
+    def _emit(self, kind: str, fld: ScoredField, d, msg: dict, ms: float):
+        ev = {'event': kind, 'ts': msg.get('ts'), **decision_summary(fld, d),
+              'tick_ms': round(ms, 3)}
+        self.counts['events'] += 1
+        self.sink(ev)
+
+    def _crossing(self, fld: ScoredField, d, msg: dict, t0: float):
+        sig = ((d.anchor, tuple(d.legs), d.per_combo_stake) if d.skip_reason is None else None)
+        prev = self._signature.get(fld.race_id)
+        self._signature[fld.race_id] = sig
+        if sig == prev:
+            return
+        kind = 'bet_on' if prev is None else ('bet_off' if sig is None else 'bet_revised')
+        self._emit(kind, fld, d, msg, 1000 * (time.perf_counter() - t0))
+
+    # ---- messages ----
+    def handle(self, msg: dict) -> None:
+        t0 = time.perf_counter()
+        kind = msg.get('type', 'odds')
+        if kind == 'field':
+            if self.live is None:
+                log.warning("field message but no engine checkpoint loaded; ignored")
+                return
+            fld = self.add_field(self.live.snapshot(msg))
+            self._crossing(fld, fld.decide(self.bankroll), msg, t0)
+            return
+        race_id = msg.get('race_id')
+        if kind == 'off':
+            fld = self.fields.pop(race_id, None)
+            if fld is not None:
+                d = fld.decide(self.bankroll)
+                self.finals[race_id] = d
+                self._signature.pop(race_id, None)
+                self._emit('final', fld, d, msg, 1000 * (time.perf_counter() - t0))
+            return
+
+        fld = self._field(race_id)
+        t0 = time.perf_counter()                     # field scoring is timed on its own
+        self.counts['ticks'] += 1
+        if fld is None:
+            self.counts['unknown'] += 1
+            return
+        if not fld.apply_odds(msg.get('odds') or {}) and race_id in self._signature:
+            self.counts['unchanged'] += 1             # nothing moved: decision stands
+        else:
+            d = fld.decide(self.bankroll)
+            if self.check:
+                self._check(fld, d)
+            self._crossing(fld, d, msg, t0)
+        self.tick_ms.append(1000 * (time.perf_counter() - t0))
+        if '_recv' in msg:
+            self.feed_lag_ms.append(1000 * (time.perf_counter() - msg['_recv']))
+
+    def _check(self, fld: ScoredField, d) -> None:
+        m = ~np.isnan(fld.win_odds)
+        ref = desk_decision(fld.horse_ids[m], fld.horse_nos[m], fld.win_odds[m],
+                            fld.model_score[m], fld.p_win[m], fld.p_place[m], self.bankroll)
+        if vars(ref) != vars(d):
+            self.counts['check_mismatch'] += 1
+            if self.counts['check_mismatch'] <= 3:
+                log.error(f"  {fld.race_id}: incremental {d} != desk_decision {ref}")
+
+    async def run(self, source) -> dict:
+        t = time.perf_counter()
+        async for msg in source:
+            try:
+                self.handle(msg)
+            except (ValueError, KeyError, TypeError) as e:
+                log.warning(f"bad message {str(msg)[:80]}: {e}")
+        return self.summary(time.perf_counter() - t)
+
+    def summary(self, elapsed: float) -> dict:
+        out = {**self.counts, 'seconds': round(elapsed, 3)}
+        for name, lat in (('tick_ms', self.tick_ms), ('field_ms', self.field_ms),
+                          ('feed_lag_ms', self.feed_lag_ms)):
+            if lat:
+                p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+                out[name] = {'p50': round(p50, 3), 'p95': round(p95, 3),
+                             'p99': round(p99, 3), 'max': round(max(lat), 3)}
+        return out
+
+
+# =====================================================================
+# SYNTHETIC TICKS
+# =====================================================================
+def make_ticks(cache: pd.DataFrame, season: str, out_path: str, max_races: Optional[int] = None,
+               ticks_per_race: int = 40, seed: int = 42) -> int:
+    """Odds paths for the season's cached races: each runner starts from
+    its final price x lognormal noise and random-walks to it; every tick
+    moves 1-4 runners. Races of a day trade interleaved (by ts), each
+    closing with its final prices and an "off". Returns ticks written."""
+    rng = np.random.default_rng(seed)
+    te_start, te_end = season_bounds(season)
+    c = cache[(cache['date_iso'] >= te_start) & (cache['date_iso'] <= te_end)]
+    race_ids = c.drop_duplicates('race_id').sort_values(['date_iso', 'race_no'])['race_id']
+    if max_races:
+        race_ids = race_ids[:max_races]
+    msgs = []
+    for rid, race in c[c['race_id'].isin(set(race_ids))].groupby('race_id'):
+        race = race[pd.to_numeric(race['win_odds'], errors='coerce').notna()]
+        if race.empty:
+            continue
+        nos = race['horse_no'].astype(int).to_numpy()
+        final = pd.to_numeric(race['win_odds']).to_numpy(dtype=float)
+        r0 = race.iloc[0]
+        off = datetime.fromisoformat(f"{r0['date_iso']}T12:00:00").timestamp() + 1800 * int(r0['race_no'])
+        walk = np.log(final) + rng.normal(0, 0.35, len(final))
+        for k in range(ticks_per_race):
+            left = ticks_per_race - k
+            movers = rng.choice(len(final), size=min(len(final), int(rng.integers(1, 5))),
+                                replace=False)
+            walk[movers] += (np.log(final[movers]) - walk[movers]) / left \
+                + rng.normal(0, 0.08, len(movers)) * (left > 1)
+            price = np.maximum(1.0, np.round(np.exp(walk[movers]), 1))
+            msgs.append({'ts': off - 5 * left, 'race_id': rid,
+                         'odds': {str(no): p for no, p in zip(nos[movers].tolist(), price.tolist())}})
+        msgs.append({'ts': off - 1, 'race_id': rid,
+                     'odds': {str(no): p for no, p in zip(nos.tolist(), final.tolist())}})
+        msgs.append({'ts': off, 'type': 'off', 'race_id': rid})
+    msgs.sort(key=lambda m: m['ts'])
+    with open(out_path, 'w') as f:
+        for m in msgs:
+            f.write(json.dumps(m) + "\n")
+    return len(msgs)
+
+
+# =====================================================================
+# CLI
+# =====================================================================
+def _log_summary(s: dict):
+    log.info(f"  {s['ticks']:,} ticks ({s['unchanged']:,} no-change, {s['unknown']:,} unknown race) "
+             f"| {s['fields']:,} fields | {s['events']:,} events | {s['seconds']:.2f}s")
+    for name in ('tick_ms', 'field_ms', 'feed_lag_ms'):
+        if name in s:
+            q = s[name]
+            log.info(f"  {name:>11}: p50 {q['p50']:.3f} | p95 {q['p95']:.3f} | "
+                     f"p99 {q['p99']:.3f} | max {q['max']:.3f}")
+
+
+def _event_sink(path: Optional[str]):
+    if not path:
+        return None, None
+    f = open(path, 'w')
+    return (lambda ev: f.write(json.dumps(ev, default=str) + "\n")), f
+
+
+async def _push(path: str, host: str, port: int, speed: Optional[float]) -> int:
+    _, writer = await asyncio.open_connection(host, port)
+    n = 0
+    async for msg in FileTickSource(path, speed):
+        writer.write((json.dumps(msg) + "\n").encode())
+        await writer.drain()
+        n += 1
+    writer.write(b'{"type": "end"}\n')
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming desk decisions from odds ticks")
+    ap.add_argument('--db', default=wfe.DB_PATH)
+    ap.add_argument('--cache-dir', default=wfe.CACHE_DIR)
+    ap.add_argument('--model-dir', default=MODEL_DIR)
+    ap.add_argument('--incident-features', action='store_true')
+    ap.add_argument('--bankroll', type=float, default=STARTING_BANKROLL)
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    mk = sub.add_parser('make-ticks', help="synthetic ticks for a development season")
+    mk.add_argument('--season', default=wfe.DEV_SEASONS[-1])
+    mk.add_argument('--out', required=True)
+    mk.add_argument('--races', type=int, default=None)
+    mk.add_argument('--ticks-per-race', type=int, default=40)
+    rp = sub.add_parser('replay', help="run the processor over a tick file")
+    rp.add_argument('--season', required=True, help="model bundle (race_day_scorer.py fit)")
+    rp.add_argument('--ticks', required=True)
+    rp.add_argument('--speed', type=float, default=None, help="pace by ts (x real time)")
+    rp.add_argument('--events', default=None, help="write events as JSONL here")
+    rp.add_argument('--check', action='store_true',
+                    help="verify every decision against desk_decision / _execute_desk")
+    ls = sub.add_parser('listen', help="run the processor on a local socket")
+    ls.add_argument('--season', required=True)
+    ls.add_argument('--host', default="127.0.0.1")
+    ls.add_argument('--port', type=int, default=DEFAULT_PORT)
+    ls.add_argument('--events', default=None)
+    ls.add_argument('--from-cache', action='store_true',
+                    help="also resolve unknown race ids from the dev feature cache")
+    ps = sub.add_parser('push', help="send a tick file to a listening processor")
+    ps.add_argument('--ticks', required=True)
+    ps.add_argument('--host', default="127.0.0.1")
+    ps.add_argument('--port', type=int, default=DEFAULT_PORT)
+    ps.add_argument('--speed', type=float, default=None)
+    args = ap.parse_args()
+
+    if args.cmd == 'push':
+        n = asyncio.run(_push(args.ticks, args.host, args.port, args.speed))
+        log.info(f"Pushed {n:,} messages to {args.host}:{args.port}")
+        return
+
+    eng = None
+    if args.cmd in ('make-ticks', 'replay') or args.from_cache:
+        eng = WalkForwardEngine(args.db, cache_dir=args.cache_dir,
+                                incident_features=args.incident_features)
+    if args.cmd == 'make-ticks':
+        n = make_ticks(eng.cache, args.season, args.out, args.races, args.ticks_per_race)
+        log.info(f"Wrote {n:,} messages to {args.out}")
+        return
+
+    scorer = RaceDayScorer(bundle_path(args.season, args.incident_features, args.model_dir))
+    sink, sink_file = _event_sink(args.events)
+    loader = eng.cache_by_race.get if eng is not None else None
+    try:
+        if args.cmd == 'replay':
+            proc = OddsStreamProcessor(scorer, args.bankroll, loader, sink=sink, check=args.check)
+            s = asyncio.run(proc.run(FileTickSource(args.ticks, args.speed)))
+            _log_summary(s)
+            if args.check:
+                sys.exit(0 if _check_finals(proc, eng, s) else 1)
+        else:
+            from race_day_service import LiveFeatureService, latest_checkpoint
+            checkpoint = latest_checkpoint(incident_features=args.incident_features)
+            live = LiveFeatureService(checkpoint) if checkpoint else None
+            if live is None:
+                log.warning("No engine checkpoint: field messages will be ignored")
+            proc = OddsStreamProcessor(scorer, args.bankroll, loader, live, sink)
+            s = asyncio.run(proc.run(SocketTickSource(args.host, args.port)))
+            _log_summary(s)
+    finally:
+        if sink_file is not None:
+            sink_file.close()
+
+
+def _check_finals(proc: OddsStreamProcessor, eng: WalkForwardEngine, s: dict) -> bool:
+    """Decisions at the off == _execute_desk on the cached snapshot (whose
+    win_odds are the final prices every synthetic path ends on)."""
+    with open(proc.scorer.path, 'rb') as f:
+        blob = pickle.load(f)
+    bad = 0
+    for rid, d in proc.finals.items():
+        bet = eng._execute_desk(rid, eng.cache_by_race[rid], blob['ranker'], blob['cal_win'],
+                                blob['cal_place'], proc.bankroll)
+        bad += not ((bet is None) == (d.skip_reason is not None) and
+                    (bet is None or (bet.block_stake == d.block_stake and
+                                     bet.combos == d.combo_nos and
+                                     bet.est_block_ev == d.block_ev)))
+    log.info(f"  check: {s['check_mismatch']} ticks where incremental != desk_decision; "
+             f"{len(proc.finals) - bad}/{len(proc.finals)} finals == _execute_desk")
+    return bad == 0 and s['check_mismatch'] == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,7 @@ from walk_forward_engine_v32 import (   # noqa: E402
     WalkForwardEngine, MODEL_FEATURES, XGB_PARAMS, MIN_FIELD,
     DEV_SEASONS, season_bounds, train_window_bounds,
 )
+from race_tensor import race_tensor, top_k, take_slots   # noqa: E402
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -71,49 +72,43 @@ class OracleDiagnostic:
         train_df = c[(c['date_iso'] >= tr_start) & (c['date_iso'] <= tr_end)]
         ranker = fit_ranker(train_df)
 
-        test = c[(c['date_iso'] >= te_start) & (c['date_iso'] <= te_end)].copy()
-
-        recs = []
-        for rid, g in test.groupby('race_id'):
-            g = g.dropna(subset=MODEL_FEATURES).copy()
-            g['win_odds'] = pd.to_numeric(g['win_odds'], errors='coerce')
-            g['fp'] = pd.to_numeric(g['finish_position'], errors='coerce')
-            g = g.dropna(subset=['win_odds', 'fp'])
-            if len(g) < MIN_FIELD:
-                continue
-
-            g['ms'] = ranker.predict(g[MODEL_FEATURES].astype(float))
-
-            g_model = g.sort_values('ms', ascending=False)
-            g_pub   = g.sort_values('win_odds', ascending=True)
-            g_act   = g.sort_values('fp', ascending=True)
-
-            model_top1  = g_model.iloc[0]['horse_id']
-            public_top1 = g_pub.iloc[0]['horse_id']
-            model_top3  = set(g_model.iloc[:3]['horse_id'])
-            public_top3 = set(g_pub.iloc[:3]['horse_id'])
-            actual_top3 = set(g_act.iloc[:3]['horse_id'])
-            actual_winner = g_act.iloc[0]['horse_id']
-            fp_map = dict(zip(g['horse_id'], g['fp']))
-
-            diverge = (model_top1 != public_top1)
-            recs.append({
-                'm_top1_win':   int(model_top1 == actual_winner),
-                'p_top1_win':   int(public_top1 == actual_winner),
-                'm_top1_place': int(model_top1 in actual_top3),
-                'p_top1_place': int(public_top1 in actual_top3),
-                'm_trio_exact': int(model_top3 == actual_top3),
-                'p_trio_exact': int(public_top3 == actual_top3),
-                'm_overlap':    len(model_top3 & actual_top3),
-                'p_overlap':    len(public_top3 & actual_top3),
-                'diverge':      int(diverge),
-                # in divergence races only:
-                'div_model_win': int(model_top1 == actual_winner) if diverge else np.nan,
-                'div_public_win': int(public_top1 == actual_winner) if diverge else np.nan,
-                'div_model_beats_public': (int(fp_map[model_top1] < fp_map[public_top1])
-                                           if diverge else np.nan),
-            })
-        return pd.DataFrame(recs)
+        test = c[(c['date_iso'] >= te_start) & (c['date_iso'] <= te_end)]
+        g = test.dropna(subset=MODEL_FEATURES)
+        g = g.assign(win_odds=pd.to_numeric(g['win_odds'], errors='coerce'),
+                     fp=pd.to_numeric(g['finish_position'], errors='coerce'))
+        g = g.dropna(subset=['win_odds', 'fp'])
+        g = g.assign(ms=ranker.predict(g[MODEL_FEATURES].astype(float)))
+
+        # whole season as padded fields, races in groupby order (race_tensor.py);
+        # stable top-k = the per-race sort_values the metrics are defined on
+        T = race_tensor(g, ['ms', 'win_odds', 'fp'], sort=True)
+        T = T.select(T.field_size >= MIN_FIELD)
+        model_top3  = top_k(T['ms'], T.mask, 3)
+        public_top3 = top_k(T['win_odds'], T.mask, 3, descending=False)
+        actual_top3 = top_k(T['fp'], T.mask, 3, descending=False)
+        m1, p1, a1 = model_top3[:, 0], public_top3[:, 0], actual_top3[:, 0]
+
+        def in_actual(top):
+            return (top[:, :, None] == actual_top3[:, None, :]).any(axis=2)
+
+        diverge = m1 != p1
+        fp = T['fp']
+        model_beats = take_slots(fp, m1[:, None])[:, 0] < take_slots(fp, p1[:, None])[:, 0]
+        return pd.DataFrame({
+            'm_top1_win':   (m1 == a1).astype(int),
+            'p_top1_win':   (p1 == a1).astype(int),
+            'm_top1_place': in_actual(m1[:, None])[:, 0].astype(int),
+            'p_top1_place': in_actual(p1[:, None])[:, 0].astype(int),
+            'm_trio_exact': in_actual(model_top3).all(axis=1).astype(int),
+            'p_trio_exact': in_actual(public_top3).all(axis=1).astype(int),
+            'm_overlap':    in_actual(model_top3).sum(axis=1),
+            'p_overlap':    in_actual(public_top3).sum(axis=1),
+            'diverge':      diverge.astype(int),
+            # in divergence races only:
+            'div_model_win':  np.where(diverge, m1 == a1, np.nan),
+            'div_public_win': np.where(diverge, p1 == a1, np.nan),
+            'div_model_beats_public': np.where(diverge, model_beats, np.nan),
+        })
 
     def run(self):
         per_season = []
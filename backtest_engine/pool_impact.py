@@ -0,0 +1,282 @@
+"""
+Pari-Mutuel Pool Impact — post-bet dividends and growth-optimal stakes
+=====================================================================
+The desk prices every combo at (1 / p_pub) * (1 - RAKE): the dividend
+the public's money alone would pay. Our own stake joins the pool (the
+"Infinite Liquidity Illusion" of Phase 39), so the dividend actually paid
+on a winning combo c is, in closed form,
+
+  single-winner pools (WIN, QUINELLA, TIERCE, TRIO, FIRST 4, QUARTET)
+      D_c = (1 - t) (P + S) / (P q_c + s_c)
+  PLACE / QUINELLA PLACE (m winning combos share what is left after
+  the winning stakes are refunded)
+      D_c = 1 + [(1 - t)(P + S) - sum_w (P q_w + s_w)] / (m (P q_c + s_c))
+
+P is the pool before our bet, q_c the public's share on c, s_c our stake
+on c, S our total in the pool and t the takeout. With s = 0 this is the desk's
+(1 - t) / q_c. All dividends here are per $1 (the database stores per $10).
+
+The desk bets an equal x on each of its k combos, and the engine gives a hit
+probability p_c per combo. Expected log growth of bankroll B is
+
+  G(x) = sum_c p_c log(1 - kx/B + x D_c(x)/B) + (1 - sum_c p_c) log(1 - kx/B)
+
+x D_c(x) is concave in x whenever k q_c < 1, which always holds for a
+block of small combos. So G is concave, and its maximizer is the root of
+G'(x), found by bisection for every race at once on (n_races, k) arrays.
+
+The desk uses it behind WalkForwardEngine's opt-in trio_pool: stake
+KELLY_MULT x the impact-aware optimum, settle on diluted dividends.
+
+  sweep    one development season: the desk's pool-blind stakes vs
+           impact-aware stakes, both settled on real TRIO dividends
+           diluted by our own money, across assumed pool sizes (flat
+           bankroll, so all races and pool sizes are one array pass)
+
+Run from project root:
+    python3 backtest_engine/pool_impact.py sweep --season 2023/2024
+    python3 backtest_engine/pool_impact.py sweep --season 2023/2024 --pools 1e6,3e6,10e6,inf
+"""
+
+import time
+import logging
+import argparse
+
+import numpy as np
+
+log = logging.getLogger("pool_impact")
+
+# Typical per-race pool totals (HKD) at a Sha Tin / Happy Valley meeting:
+# order-of-magnitude defaults when no per-race estimate is supplied.
+POOL_SIZE_ESTIMATE = {
+    'WIN': 12e6, 'PLACE': 6e6, 'QUINELLA': 12e6, 'QUINELLA PLACE': 8e6,
+    'TIERCE': 15e6, 'TRIO': 10e6, 'FIRST 4': 6e6, 'QUARTET': 4e6,
+}
+# Takeout per pool. TRIO follows the desk's RAKE.
+POOL_TAKEOUT = {
+    'WIN': 0.175, 'PLACE': 0.175, 'QUINELLA': 0.175, 'QUINELLA PLACE': 0.175,
+    'TIERCE': 0.25, 'TRIO': 0.23, 'FIRST 4': 0.25, 'QUARTET': 0.25,
+}
+# Pools that pay several winning combos from equal shares.
+MULTI_WINNER_POOLS = {'PLACE': 3, 'QUINELLA PLACE': 3}
+
+_Q_FLOOR = 1e-12          # a combo nobody else backed
+_NO_IMPACT_POOL = 1e15    # stands in for an infinite pool
+
+
+# =====================================================================
+# CLOSED FORM
+# =====================================================================
+def post_bet_dividend(q, stake, pool, takeout: float, total_stake=None) -> np.ndarray:
+    """Single-winner pools: dividend per $1 on each combo (..., k) once our
+    stakes (..., k) are in a pool of `pool` (...) public money. total_stake
+    (...) is everything we put in the pool, default the sum of `stake`."""
+    q = np.maximum(np.asarray(q, dtype=float), _Q_FLOOR)
+    stake = np.asarray(stake, dtype=float)
+    pool = np.asarray(pool, dtype=float)[..., None]
+    total = (stake.sum(axis=-1, keepdims=True) if total_stake is None
+             else np.asarray(total_stake, dtype=float)[..., None])
+    return (1.0 - takeout) * (pool + total) / (pool * q + stake)
+
+
+def post_bet_place_dividend(q_winners, stake_winners, pool, takeout: float,
+                            total_stake) -> np.ndarray:
+    """PLACE / QUINELLA PLACE: dividend per $1 on each of the m winning
+    combos (..., m), given the public shares and our stakes on them and
+    our total stake in the pool (...)."""
+    q = np.maximum(np.asarray(q_winners, dtype=float), _Q_FLOOR)
+    pool = np.asarray(pool, dtype=float)[..., None]
+    on_winner = pool * q + np.asarray(stake_winners, dtype=float)
+    left = ((1.0 - takeout) * (pool + np.asarray(total_stake, dtype=float)[..., None])
+            - on_winner.sum(axis=-1, keepdims=True))
+    return 1.0 + left / (q.shape[-1] * on_winner)
+
+
+def diluted_dividend(dividend, stake, pool, takeout: float, total_stake=None) -> np.ndarray:
+    """Single-winner pools: an observed dividend per $1 (public money
+    only, q = (1 - t) / dividend) as it would have paid with our stake
+    on that combo and total_stake (default: stake) in the pool."""
+    dividend = np.asarray(dividend, dtype=float)
+    stake = np.asarray(stake, dtype=float)
+    pool = np.asarray(pool, dtype=float)
+    total = stake if total_stake is None else np.asarray(total_stake, dtype=float)
+    return (1.0 - takeout) * (pool + total) / (pool * (1.0 - takeout) / dividend + stake)
+
+
+# =====================================================================
+# GROWTH-OPTIMAL BLOCK STAKE
+# =====================================================================
+def _terms(x, p, q, pool, takeout, bankroll):
+    """x (n,), p/q (n,k), pool/bankroll (n,) -> (return x D_c, its slope, W_c, W_0)."""
+    k = p.shape[-1]
+    u = pool[:, None] * q                    # public money on each combo
+    xc = x[:, None]
+    ret = (1.0 - takeout) * (pool[:, None] + k * xc) * xc / (u + xc)
+    slope = (1.0 - takeout) * (pool[:, None] * u + 2 * k * u * xc + k * xc**2) / (u + xc)**2
+    w_hit = bankroll[:, None] - k * xc + ret
+    w_miss = bankroll - k * x
+    return ret, slope, w_hit, w_miss
+
+
+def block_log_growth(x, p, q, pool, takeout: float, bankroll) -> np.ndarray:
+    """G(x) per race for an equal stake x on each of the block's k combos."""
+    p, q, x, pool, bankroll = _broadcast(p, q, x, pool, bankroll)
+    _, _, w_hit, w_miss = _terms(x, p, q, pool, takeout, bankroll)
+    miss = 1.0 - p.sum(axis=-1)
+    return (p * np.log(w_hit / bankroll[:, None])).sum(axis=-1) + miss * np.log(w_miss / bankroll)
+
+
+def optimal_block_stake(p, q, pool, takeout: float, bankroll, iters: int = 60) -> np.ndarray:
+    """Full-Kelly (growth-optimal) per-combo stake x* for each race, with
+    our own money diluting the pool. p / q: engine hit probability and
+    public share per combo (n, k); pool / bankroll broadcast to (n,).
+    Zero where even the first dollar has no edge."""
+    p, q, _, pool, bankroll = _broadcast(p, q, 0.0, pool, bankroll)
+    k = p.shape[-1]
+    miss = 1.0 - p.sum(axis=-1)
+
+    def slope(x):
+        _, s, w_hit, w_miss = _terms(x, p, q, pool, takeout, bankroll)
+        return (p * (s - k) / w_hit).sum(axis=-1) - miss * k / w_miss
+
+    lo = np.zeros(len(pool))
+    hi = bankroll / k * (1.0 - 1e-9)
+    bet = slope(lo) > 0
+    for _ in range(iters):
+        mid = 0.5 * (lo + hi)
+        up = slope(mid) > 0
+        lo = np.where(up, mid, lo)
+        hi = np.where(up, hi, mid)
+    return np.where(bet, 0.5 * (lo + hi), 0.0)
+
+
+def _broadcast(p, q, x, pool, bankroll):
+    p = np.atleast_2d(np.asarray(p, dtype=float))
+    q = np.maximum(np.atleast_2d(np.asarray(q, dtype=float)), _Q_FLOOR)
+    n = p.shape[0]
+    as_n = lambda v: np.broadcast_to(np.asarray(v, dtype=float), (n,))  # noqa: E731
+    return p, q, as_n(x), as_n(pool), as_n(bankroll)
+
+
+# =====================================================================
+# SEASON SWEEP (walk_forward_engine_v32 imports this module, so the
+# sweep imports it lazily)
+# =====================================================================
+def _season_blocks(season: str, eng):
+    """Per bettable-EV race of the season: engine / public combo
+    probabilities of the desk's block and, for the winning combo if it is
+    in the block, its index and real TRIO dividend per $1."""
+    import walk_forward_engine_v32 as wfe
+
+    tr_start, tr_end = wfe.train_window_bounds(season)
+    te_start, te_end = wfe.season_bounds(season)
+    c = eng.cache
+    ranker, cal_win, cal_place = eng._fit_model(
+        c[(c['date_iso'] >= tr_start) & (c['date_iso'] <= tr_end)])
+    test = c[(c['date_iso'] >= te_start) & (c['date_iso'] <= te_end)]
+    P, Q, HIT, DIV = [], [], [], []
+    # selected blocks of the whole season at once (race_tensor.py)
+    for rid, (d, p, q, no, _) in eng._season_desk(test, ranker, cal_win, cal_place).items():
+        hit, div = -1, 0.0
+        winning = dict(eng._clean_trio_dividends(rid))
+        for j, cb in enumerate(d.combos):
+            try:
+                nos = frozenset(int(no[h]) for h in cb)
+            except (TypeError, ValueError):
+                continue
+            if nos in winning:
+                hit, div = j, winning[nos] / 10.0
+                break
+        P.append(p), Q.append(q), HIT.append(hit), DIV.append(div)
+    return np.array(P), np.array(Q), np.array(HIT), np.array(DIV)
+
+
+def _ticket_stakes(per_combo_raw: np.ndarray, k: int, bankroll: float, wfe) -> np.ndarray:
+    """The desk's ticket rules on a raw per-combo stake (vectorized)."""
+    block = per_combo_raw * k
+    ticket = np.maximum(wfe.MIN_TICKET,
+                        np.round(per_combo_raw / wfe.MIN_TICKET) * wfe.MIN_TICKET)
+    ok = (block >= wfe.MIN_BLOCK_BET) & (ticket * k <= bankroll)
+    return np.where(ok, ticket, 0.0)
+
+
+def sweep(season: str, pools: list[float], eng) -> list[dict]:
+    import walk_forward_engine_v32 as wfe
+
+    t = time.perf_counter()
+    p, q, hit, div = _season_blocks(season, eng)
+    t_prep = time.perf_counter() - t
+    n, k = p.shape
+    B = wfe.STARTING_BANKROLL
+    # the desk's pool-blind gate and Kelly (desk_price)
+    valid = q > 0
+    avg_synth = np.where(valid, (1.0 / np.where(valid, q, 1.0)) * (1.0 - wfe.RAKE), 0.0)
+    avg_synth = avg_synth.sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+    hit_prob = np.where(valid, p, 0.0).sum(axis=1)
+    ev = hit_prob * avg_synth
+    b = avg_synth - 1.0
+    gate = (ev >= wfe.EV_THRESHOLD) & (b > 0)
+    f_star = np.where(gate, (b * hit_prob - (1.0 - hit_prob)) / np.where(b > 0, b, 1.0), 0.0)
+    blind = np.where(gate, _ticket_stakes(np.maximum(0.0, f_star * wfe.KELLY_MULT) * B / k,
+                                          k, B, wfe), 0.0)
+    won = hit >= 0
+
+    t = time.perf_counter()
+    rows = []
+    for pool in pools:
+        # inf: the multi-outcome Kelly stake at fixed odds (no dilution)
+        x_star = optimal_block_stake(p, q, _NO_IMPACT_POOL if np.isinf(pool) else pool,
+                                     wfe.RAKE, B)
+        aware = np.where(gate, _ticket_stakes(wfe.KELLY_MULT * x_star, k, B, wfe), 0.0)
+        row = {'pool': pool}
+        for name, stake in (('blind', blind), ('aware', aware)):
+            paid = (np.where(won, div, 0.0) if np.isinf(pool) else
+                    np.where(won, diluted_dividend(np.where(won, div, 1.0), stake, pool,
+                                                   wfe.RAKE, stake * k), 0.0))
+            staked = stake * k
+            ret = np.where(stake > 0, stake * paid, 0.0)
+            row[f'{name}_bets'] = int((stake > 0).sum())
+            row[f'{name}_staked'] = float(staked.sum())
+            row[f'{name}_roi'] = float((ret.sum() - staked.sum()) / staked.sum()) if staked.sum() else 0.0
+        # how much the desk's own stake costs it on the dividends it wins
+        hits = won & (blind > 0)
+        row['blind_dividend_kept'] = (float(np.mean(diluted_dividend(div[hits], blind[hits], pool,
+                                                                    wfe.RAKE, blind[hits] * k)
+                                                   / div[hits]))
+                                      if hits.any() and not np.isinf(pool) else 1.0)
+        rows.append(row)
+    log.info(f"  {n:,} blocks selected ({int(gate.sum()):,} pass the EV gate); prep "
+             f"{t_prep:.1f}s, {len(pools)} pool sizes swept in {time.perf_counter() - t:.3f}s")
+    return rows
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import walk_forward_engine_v32 as wfe
+
+    ap = argparse.ArgumentParser(description="Pari-mutuel pool impact on desk stakes")
+    ap.add_argument('--db', default=wfe.DB_PATH)
+    ap.add_argument('--cache-dir', default=wfe.CACHE_DIR)
+    ap.add_argument('--incident-features', action='store_true')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    sw = sub.add_parser('sweep', help="pool-blind vs impact-aware stakes over a season")
+    sw.add_argument('--season', default=wfe.DEV_SEASONS[-1])
+    sw.add_argument('--pools', default="1e6,2e6,5e6,10e6,20e6,inf",
+                    help="assumed TRIO pool sizes (HKD), comma-separated")
+    args = ap.parse_args()
+    if args.season not in wfe.DEV_SEASONS:
+        ap.error(f"sweep runs on development seasons only, not {args.season}")
+
+    eng = wfe.WalkForwardEngine(args.db, cache_dir=args.cache_dir,
+                                incident_features=args.incident_features)
+    rows = sweep(args.season, [float(x) for x in args.pools.split(',')], eng)
+    log.info(f"{'pool':>10} | {'blind bets':>10} {'staked':>11} {'ROI':>8} {'div kept':>8} | "
+             f"{'aware bets':>10} {'staked':>11} {'ROI':>8}")
+    for r in rows:
+        log.info(f"{r['pool']:>10,.0f} | {r['blind_bets']:>10,} {r['blind_staked']:>11,.0f} "
+                 f"{r['blind_roi']*100:>+7.2f}% {r['blind_dividend_kept']*100:>7.1f}% | "
+                 f"{r['aware_bets']:>10,} {r['aware_staked']:>11,.0f} {r['aware_roi']*100:>+7.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+v32 Query-Plan Audit
+====================
+Runs EXPLAIN QUERY PLAN for every query the v32 engine issues per race
+(StatefulFeatureEngine._load_race / _load_incidents, FeatureCacheBuilder
+race list, WalkForwardEngine Trio settlement) against a built database and FAILS
+(exit 1) if any of them full-scans a table or sorts through a temp B-tree.
+
+The matching indexes live in ingest_v32 (SCHEMA_SQL / INDEX_SQL): re-run
+this after any schema or query change.
+
+Run from project root:
+    python3 backtest_engine/query_plan_audit.py
+    python3 backtest_engine/query_plan_audit.py --db /path/to/hk_racing.db
+"""
+
+import os
+import sys
+import logging
+import argparse
+import sqlite3
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+log = logging.getLogger("query_plan_audit")
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+sys.path.insert(0, _SCRIPT_DIR)
+sys.path.insert(0, os.path.join(_PROJECT_ROOT, "data_pipeline"))
+
+import stateful_feature_engine as sfe               # noqa: E402
+import walk_forward_engine_v32 as wfe               # noqa: E402
+
+# (caller, sql, sample params). Parameter values do not change the plan.
+AUDITED_QUERIES = [
+    ('StatefulFeatureEngine._load_race', sfe.LOAD_RACE_SQL, ('2024-01-01_R1',)),
+    ('FeatureCacheBuilder._chrono_races_through', wfe.CHRONO_RACES_SQL, ('2025-08-31',)),
+    ('WalkForwardEngine._clean_trio_dividends', wfe.TRIO_DIVIDENDS_SQL, ('2024-01-01_R1',)),
+    ('StatefulFeatureEngine._load_incidents', sfe.LOAD_INCIDENTS_SQL, ('2024-01-01_R1',)),
+]
+
+# Plan details that mean the query does not use an index as intended.
+BAD_PLAN_PREFIXES = ('SCAN ', 'USE TEMP B-TREE')
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple) -> list[str]:
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def audit(db_path: str) -> list[tuple]:
+    """Return [(caller, plan, problems)] for every audited query."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        out = []
+        for caller, sql, params in AUDITED_QUERIES:
+            plan = explain(conn, sql, params)
+            problems = [p for p in plan if p.startswith(BAD_PLAN_PREFIXES)]
+            out.append((caller, plan, problems))
+        return out
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN audit of the v32 engine's queries")
+    ap.add_argument('--db', default=wfe.DB_PATH)
+    args = ap.parse_args()
+    if not os.path.exists(args.db):
+        ap.error(f"no database at {args.db} (run data_pipeline/ingest_v32.py first)")
+
+    results = audit(args.db)
+    n_bad = 0
+    for caller, plan, problems in results:
+        status = "FAIL" if problems else "ok"
+        log.info(f"[{status:>4}] {caller}")
+        for step in plan:
+            flag = "  <-- " if step in problems else ""
+            log.info(f"         {step}{flag}")
+        n_bad += bool(problems)
+
+    if n_bad:
+        log.error(f"{n_bad}/{len(results)} queries scan or sort; "
+                  f"fix the indexes in ingest_v32.INDEX_SQL")
+        sys.exit(1)
+    log.info(f"All {len(results)} engine queries use index searches with no temp sorts.")
+
+
+if __name__ == "__main__":
+    main()
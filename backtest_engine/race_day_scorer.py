@@ -0,0 +1,344 @@
+"""
+Race-Day Scorer — resident model + desk, re-scored on every odds move
+====================================================================
+WalkForwardEngine._execute_desk is shaped for the backtest: per race it
+copies the snapshot, re-runs the ranker and both calibrators through
+DataFrames, and only then applies the desk rules. On race day the
+features of a field are fixed once it is declared; only win odds move.
+This module splits the two:
+
+  RaceDayScorer.score_field(snap)   once per field: XGBRanker booster +
+                                    win/place calibrators -> ScoredField
+  ScoredField.update(odds)          every odds tick: merge the new prices
+                                    and re-run the desk (the same pure
+                                    rules as desk_decision, re-pricing
+                                    only what the move touches) ->
+                                    anchor, legs, block EV, stake
+
+The fitted ranker and calibrators live in a model bundle fitted by
+WalkForwardEngine._fit_model on the season's training window, saved under
+data/models/race_day_model_<season>.pkl and kept in memory.
+
+  fit      fit and save the bundle for a season (train window per
+           train_window_bounds; a window that reaches into the sealed
+           season needs --include-sealed)
+  verify   for every race of a development season in the feature cache,
+           the scorer's decision == _execute_desk's Bet, at the cached
+           odds and at randomly moved odds; prints per-call latency
+  score    declared field JSON (race_day_service.py format, runners with
+           win_odds) -> live snapshot from the latest engine checkpoint ->
+           decision
+
+Run from project root:
+    python3 backtest_engine/race_day_scorer.py fit --season 2025/26
+    python3 backtest_engine/race_day_scorer.py verify --season 2023/2024
+    python3 backtest_engine/race_day_scorer.py score --season 2025/26 --field field.json
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import logging
+import argparse
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+log = logging.getLogger("race_day_scorer")
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+sys.path.insert(0, _SCRIPT_DIR)
+sys.path.insert(0, os.path.join(_PROJECT_ROOT, "data_pipeline"))
+
+import walk_forward_engine_v32 as wfe                       # noqa: E402
+from walk_forward_engine_v32 import (WalkForwardEngine, DeskDecision,  # noqa: E402
+                                     desk_select, desk_price, harville_unordered_trio,
+                                     season_bounds, train_window_bounds,
+                                     ANCHOR_MAX_ODDS, LEG_MIN_ODDS, STARTING_BANKROLL)
+
+MODEL_DIR = os.path.join(_PROJECT_ROOT, "data", "models")
+BUNDLE_VERSION = 1
+
+
+def bundle_path(season: str, incident_features: bool = False, model_dir: str = MODEL_DIR) -> str:
+    suffix = "_incidents" if incident_features else ""
+    return os.path.join(model_dir, f"race_day_model_{season.replace('/', '-')}{suffix}.pkl")
+
+
+# =====================================================================
+# MODEL BUNDLE
+# =====================================================================
+def fit_bundle(season: str, db_path: str = wfe.DB_PATH, incident_features: bool = False,
+               cache_dir: str = wfe.CACHE_DIR, model_dir: str = MODEL_DIR,
+               include_sealed: bool = False, engine: Optional[WalkForwardEngine] = None) -> str:
+    """Fit ranker + calibrators on `season`'s training window (exactly as
+    run_season does) and save them. `engine` reuses a loaded cache."""
+    tr_start, tr_end = train_window_bounds(season)
+    if tr_end > season_bounds(wfe.DEV_SEASONS[-1])[1] and not include_sealed:
+        raise ValueError(f"{season} trains through {tr_end}, into the sealed "
+                         f"{wfe.SEALED_SEASON} season (pass include_sealed)")
+    if engine is None:
+        engine = WalkForwardEngine(db_path, end_iso=tr_end, cache_dir=cache_dir,
+                                   incident_features=incident_features)
+    if engine.win_model == 'benter':
+        raise ValueError("the benter win model moves with the odds; the scorer "
+                         "fixes p_win when the field is scored")
+    c = engine.cache
+    train_df = c[(c['date_iso'] >= tr_start) & (c['date_iso'] <= tr_end)]
+    log.info(f"Fitting {season}: train {tr_start}->{tr_end}, {len(train_df):,} rows")
+    ranker, cal_win, cal_place = engine._fit_model(train_df)
+
+    os.makedirs(model_dir, exist_ok=True)
+    path = bundle_path(season, incident_features, model_dir)
+    blob = {'version': BUNDLE_VERSION, 'season': season, 'features': engine.features,
+            'train_window': (tr_start, tr_end), 'ranker': ranker,
+            'cal_win': cal_win, 'cal_place': cal_place,
+            'created_at': datetime.now().isoformat(timespec='seconds')}
+    with open(f"{path}.tmp", 'wb') as f:
+        pickle.dump(blob, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{path}.tmp", path)
+    log.info(f"  model bundle saved: {path}")
+    return path
+
+
+# =====================================================================
+# SCORER
+# =====================================================================
+class ScoredField:
+    """One declared field with model outputs fixed; odds are the only
+    moving input. Arrays are aligned by runner (complete-feature runners
+    only, as _execute_desk drops the rest).
+
+    decide() is incremental: the desk's selection (anchor, legs, combos)
+    and the engine-side Harville probabilities depend on the odds only
+    through which runners are priced and which prices sit beyond the
+    ANCHOR_MAX_ODDS / LEG_MIN_ODDS lines, so they are cached on that key
+    and a plain price move re-prices the public side only. The result is
+    the one desk_decision returns for the same field and prices."""
+
+    def __init__(self, race_id, date_iso, horse_ids, horse_nos, model_score,
+                 p_win, p_place, win_odds):
+        self.race_id, self.date_iso = race_id, date_iso
+        self.horse_ids, self.horse_nos = horse_ids, horse_nos
+        self.model_score, self.p_win, self.p_place = model_score, p_win, p_place
+        self.win_odds = win_odds                     # float, NaN = no price / scratched
+        self._pos = {k: i for i, k in enumerate(horse_ids)}
+        for i, no in enumerate(horse_nos):
+            if no is not None and not pd.isna(no):
+                self._pos.setdefault(int(no), i)
+        self._no_map = dict(zip(horse_ids, horse_nos))
+        self._sel_key = None
+
+    def apply_odds(self, odds: dict) -> int:
+        """Merge an odds tick {horse_no or horse_id: price (None =
+        withdrawn)}. Runners not in the tick keep their last price; unknown
+        keys are ignored. Returns the number of prices that changed."""
+        changed = 0
+        for key, price in odds.items():
+            i = self._pos.get(key)
+            if i is None and isinstance(key, str) and key.isdigit():
+                i = self._pos.get(int(key))
+            if i is None:
+                continue
+            new = np.nan if price is None else float(price)
+            old = self.win_odds[i]
+            if not (new == old or (np.isnan(new) and np.isnan(old))):
+                self.win_odds[i] = new
+                changed += 1
+        return changed
+
+    def update(self, odds: dict, bankroll: float = STARTING_BANKROLL) -> DeskDecision:
+        """apply_odds + decide."""
+        self.apply_odds(odds)
+        return self.decide(bankroll)
+
+    def decide(self, bankroll: float = STARTING_BANKROLL) -> DeskDecision:
+        """desk_decision over the runners that currently have a price."""
+        o = self.win_odds
+        priced = ~np.isnan(o)
+        key = (priced.tobytes(), (o >= LEG_MIN_ODDS).tobytes(), (o > ANCHOR_MAX_ODDS).tobytes())
+        if key != self._sel_key:
+            idx = np.flatnonzero(priced)
+            ids = self.horse_ids[idx]
+            sel = desk_select(ids, o[idx], self.model_score[idx], self.p_place[idx])
+            if not sel.skip_reason:
+                pw = self.p_win[idx]
+                eng_p = dict(zip(ids, (pw / pw.sum()).tolist()))
+                self._p_eng = [harville_unordered_trio(eng_p, c) for c in sel.combos]
+                at = {h: j for j, h in enumerate(ids)}
+                self._block_pos = [(h, at[h]) for h in [sel.anchor] + sel.legs]
+            self._sel_key, self._sel, self._idx = key, sel, idx
+        sel, idx = self._sel, self._idx
+        if sel.skip_reason:                          # fresh, so the reason quotes current odds
+            return desk_select(self.horse_ids[idx], o[idx], self.model_score[idx],
+                               self.p_place[idx])
+
+        inv_odds = 1.0 / o[idx]
+        pub = inv_odds / inv_odds.sum()
+        pub_p = {h: float(pub[j]) for h, j in self._block_pos}
+        d = DeskDecision(None, anchor=sel.anchor, legs=sel.legs, combos=sel.combos)
+        return desk_price(d, self._p_eng, [harville_unordered_trio(pub_p, c) for c in sel.combos],
+                          bankroll, self._no_map)
+
+
+class RaceDayScorer:
+    """The fitted bundle, resident."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            blob = pickle.load(f)
+        if blob.get('version') != BUNDLE_VERSION:
+            raise ValueError(f"{path}: model bundle v{blob.get('version')} != v{BUNDLE_VERSION}")
+        self.path = path
+        self.season = blob['season']
+        self.features = blob['features']
+        self.booster = blob['ranker'].get_booster()
+        self.cal_win, self.cal_place = blob['cal_win'], blob['cal_place']
+
+    def score_field(self, snap: pd.DataFrame) -> ScoredField:
+        """Model score + calibrated win/place probability per runner with
+        complete features. Prices start from the snapshot's win_odds."""
+        df = snap.dropna(subset=self.features)
+        X = df[self.features].to_numpy(dtype=float)
+        score = (self.booster.inplace_predict(X) if len(df)
+                 else np.empty(0, dtype=np.float32))
+        s2 = score.reshape(-1, 1)
+        p_win = self.cal_win.predict_proba(s2)[:, 1] if len(df) else score
+        p_place = self.cal_place.predict_proba(s2)[:, 1] if len(df) else score
+        return ScoredField(
+            str(snap['race_id'].iat[0]), str(snap['date_iso'].iat[0]),
+            df['horse_id'].to_numpy(), df['horse_no'].to_numpy(), score, p_win, p_place,
+            pd.to_numeric(df['win_odds'], errors='coerce').to_numpy(dtype=float, copy=True))
+
+
+def decision_summary(field: ScoredField, d: DeskDecision) -> dict:
+    """JSON-friendly view of a desk decision."""
+    no = dict(zip(field.horse_ids, field.horse_nos))
+    as_no = lambda hid: None if pd.isna(no.get(hid)) else int(no[hid])  # noqa: E731
+    out = {'race_id': field.race_id, 'bet': d.skip_reason is None,
+           'skip_reason': d.skip_reason,
+           'anchor': d.anchor, 'anchor_no': as_no(d.anchor) if d.anchor is not None else None,
+           'legs': list(d.legs), 'leg_nos': [as_no(h) for h in d.legs],
+           'block_hit_prob': round(d.block_hit_prob, 6), 'block_ev': round(d.block_ev, 4),
+           'per_combo_stake': d.per_combo_stake, 'block_stake': d.block_stake,
+           'combos': [sorted(c) for c in d.combo_nos]}
+    return out
+
+
+# =====================================================================
+# VERIFY
+# =====================================================================
+def verify(season: str, db_path: str = wfe.DB_PATH, incident_features: bool = False,
+           cache_dir: str = wfe.CACHE_DIR, model_dir: str = MODEL_DIR,
+           odds_moves: int = 3, seed: int = 42) -> bool:
+    """Scorer decisions == _execute_desk Bets over a development season."""
+    if season not in wfe.DEV_SEASONS:
+        raise ValueError(f"verify runs on development seasons only, not {season}")
+    eng = WalkForwardEngine(db_path, cache_dir=cache_dir, incident_features=incident_features)
+    path = fit_bundle(season, db_path, incident_features, cache_dir, model_dir, engine=eng)
+    scorer = RaceDayScorer(path)
+    with open(path, 'rb') as f:
+        blob = pickle.load(f)
+    ranker, cal_win, cal_place = blob['ranker'], blob['cal_win'], blob['cal_place']
+
+    te_start, te_end = season_bounds(season)
+    c = eng.cache
+    race_ids = (c[(c['date_iso'] >= te_start) & (c['date_iso'] <= te_end)]
+                .drop_duplicates('race_id').sort_values(['date_iso', 'race_no'])['race_id'])
+    rng = np.random.default_rng(seed)
+    t_score, t_update, n_cases, n_bets, n_bad = [], [], 0, 0, 0
+    for rid in race_ids:
+        snap = eng.cache_by_race[rid]
+        t = time.perf_counter()
+        fld = scorer.score_field(snap)
+        t_score.append(1000 * (time.perf_counter() - t))
+        for move in range(odds_moves + 1):
+            tick = {}
+            if move:
+                # odd moves: big swings + the odd withdrawal (selection
+                # changes); even moves: small drifts (cached selection)
+                big = move % 2 == 1
+                lo, hi = (0.6, 1.6) if big else (0.97, 1.03)
+                for no, o in zip(snap['horse_no'], pd.to_numeric(snap['win_odds'], errors='coerce')):
+                    tick[no] = (None if big and rng.random() < 0.05 else
+                                round(float(o) * rng.uniform(lo, hi), 1)) if pd.notna(o) else None
+                snap = snap.assign(win_odds=snap['horse_no'].map(tick))
+            t = time.perf_counter()
+            d = fld.update(tick)
+            t_update.append(1000 * (time.perf_counter() - t))
+            bet = eng._execute_desk(rid, snap, ranker, cal_win, cal_place, STARTING_BANKROLL)
+            n_cases += 1
+            n_bets += bet is not None
+            same = ((bet is None) == (d.skip_reason is not None) and
+                    (bet is None or (bet.block_stake == d.block_stake and
+                                     bet.per_combo_stake == d.per_combo_stake and
+                                     bet.combos == d.combo_nos and
+                                     bet.est_block_ev == d.block_ev)))
+            if not same:
+                n_bad += 1
+                if n_bad <= 3:
+                    log.error(f"  {rid} move {move}: desk {bet} vs scorer {d}")
+    log.info(f"  {len(race_ids):,} races x {odds_moves + 1} odds states: "
+             f"{n_cases - n_bad:,}/{n_cases:,} decisions identical ({n_bets:,} bets)")
+    for name, lat in (("score_field", t_score), ("update+decide", t_update)):
+        p50, p99 = np.percentile(lat, [50, 99])
+        log.info(f"  {name:>13}: p50 {p50:.2f} ms | p99 {p99:.2f} ms | max {max(lat):.2f} ms")
+    return n_bad == 0
+
+
+# =====================================================================
+# CLI
+# =====================================================================
+def main():
+    ap = argparse.ArgumentParser(description="Race-day scoring with a resident model")
+    ap.add_argument('--db', default=wfe.DB_PATH)
+    ap.add_argument('--cache-dir', default=wfe.CACHE_DIR)
+    ap.add_argument('--model-dir', default=MODEL_DIR)
+    ap.add_argument('--incident-features', action='store_true')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    ft = sub.add_parser('fit', help="fit and save the season's model bundle")
+    ft.add_argument('--season', required=True)
+    ft.add_argument('--include-sealed', action='store_true',
+                    help=f"allow a training window that reaches into {wfe.SEALED_SEASON}")
+    vf = sub.add_parser('verify', help="scorer == _execute_desk over a development season")
+    vf.add_argument('--season', default=wfe.DEV_SEASONS[-1])
+    vf.add_argument('--odds-moves', type=int, default=3)
+    sc = sub.add_parser('score', help="declared field JSON -> desk decision")
+    sc.add_argument('--season', required=True)
+    sc.add_argument('--field', required=True, help="race_day_service.py declared-field JSON")
+    sc.add_argument('--bankroll', type=float, default=STARTING_BANKROLL)
+    args = ap.parse_args()
+
+    if args.cmd == 'fit':
+        fit_bundle(args.season, args.db, args.incident_features, args.cache_dir,
+                   args.model_dir, args.include_sealed)
+    elif args.cmd == 'verify':
+        if not verify(args.season, args.db, args.incident_features, args.cache_dir,
+                      args.model_dir, args.odds_moves):
+            log.error("Scorer decisions differ from _execute_desk")
+            sys.exit(1)
+        log.info("Scorer decisions match _execute_desk.")
+    else:
+        from race_day_service import LiveFeatureService, latest_checkpoint
+        checkpoint = latest_checkpoint(incident_features=args.incident_features)
+        if checkpoint is None:
+            ap.error("no engine checkpoint (run: race_day_service.py checkpoint)")
+        with open(args.field) as f:
+            req = json.load(f)
+        scorer = RaceDayScorer(bundle_path(args.season, args.incident_features, args.model_dir))
+        service = LiveFeatureService(checkpoint)
+        t = time.perf_counter()
+        fld = scorer.score_field(service.snapshot(req))
+        out = decision_summary(fld, fld.decide(args.bankroll))
+        out['elapsed_ms'] = round(1000 * (time.perf_counter() - t), 2)
+        print(json.dumps(out, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+Race-Day Feature Service — live snapshots from an engine checkpoint
+===================================================================
+FeatureCacheBuilder.build replays every race since 2011 to produce
+snapshots; on race day the runners are declared but not in the database,
+and a full replay takes minutes. This module keeps a checkpoint of the
+engine state instead and snapshots a declared field against it in a few
+milliseconds, without reading any historical race.
+
+  checkpoint   advance the engine over the bettable races ingested since
+               the latest checkpoint (from scratch the first time) with
+               FeatureCacheBuilder's protocol — same race list, PageRank
+               frozen at the last day boundary — and save it under
+               data/engine_state/engine_state_through_<race_id>.pkl
+  serve        load the latest checkpoint and answer, on localhost,
+                   POST /snapshot   declared field -> snapshot_for rows
+                   GET  /health     checkpoint metadata
+                   POST /reload     switch to the newest checkpoint
+  verify       replay history; at sampled races, snapshot the declared
+               field from a checkpoint of the state just before it and
+               require the exact snapshot_for row set; then time /snapshot
+
+Declared field (POST /snapshot body):
+    {"date_iso": "2026-04-15", "race_no": 7, "distance": 1650,
+     "course": "TURF - \\"A\\" COURSE",
+     "runners": [{"horse_id": "K152", "horse_no": 1, "horse_name": "...",
+                  "jockey": "Z Purton", "trainer": "J Size",
+                  "draw": 5, "act_wt": 133, "win_odds": 4.2}, ...]}
+horse_no / horse_name / win_odds are optional. A race on a later day than
+the checkpoint uses PageRank over everything in it (that day's boundary
+freeze); a race on the checkpoint's own day uses the stored freeze, and
+must come after the checkpoint's last race (earlier ones are already in
+the state, so snapshotting them would leak).
+
+Run from project root:
+    python3 backtest_engine/race_day_service.py checkpoint
+    python3 backtest_engine/race_day_service.py serve --port 8732
+    curl -s localhost:8732/snapshot -d @field.json
+    python3 backtest_engine/race_day_service.py verify --samples 20
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import sqlite3
+import tempfile
+import threading
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+log = logging.getLogger("race_day_service")
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+sys.path.insert(0, _SCRIPT_DIR)
+sys.path.insert(0, os.path.join(_PROJECT_ROOT, "data_pipeline"))
+
+from stateful_feature_engine import StatefulFeatureEngine   # noqa: E402
+import walk_forward_engine_v32 as wfe                       # noqa: E402
+
+STATE_DIR = os.path.join(_PROJECT_ROOT, "data", "engine_state")
+KEEP_CHECKPOINTS = 3          # per flavour (base / incidents)
+DEFAULT_PORT = 8732
+
+_CHECKPOINT_RE = re.compile(r'engine_state_through_(\d{4}-\d{2}-\d{2}_R\d+)(_incidents)?\.pkl$')
+
+# Columns of a LOAD_RACE_SQL frame; the result ones stay empty when declared.
+_FIELD_COLUMNS = ['race_id', 'date_iso', 'race_no', 'horse_id', 'horse_no',
+                  'horse_name', 'finish_position', 'jockey', 'trainer',
+                  'act_wt', 'draw', 'distance', 'course',
+                  'lbw_lengths', 'esi_raw', 'csi_raw', 'win_odds']
+_RUNNER_FIELDS = ['horse_id', 'horse_no', 'horse_name', 'jockey', 'trainer',
+                  'draw', 'act_wt', 'win_odds']
+
+
+def race_key_of(race_id: str) -> int:
+    """'2024-01-01_R7' -> 2024010107 (ingest_v32.race_key)."""
+    day, no = race_id.split('_R')
+    return int(day.replace('-', '')) * 100 + int(no)
+
+
+# =====================================================================
+# CHECKPOINTS
+# =====================================================================
+def _suffix(incident_features: bool) -> str:
+    return "_incidents" if incident_features else ""
+
+
+def list_checkpoints(state_dir: str = STATE_DIR, incident_features: bool = False) -> list[str]:
+    """Checkpoint paths of one flavour, oldest first."""
+    out = []
+    for path in glob.glob(os.path.join(state_dir, "engine_state_through_*.pkl")):
+        m = _CHECKPOINT_RE.search(os.path.basename(path))
+        if m and bool(m.group(2)) == incident_features:
+            out.append((race_key_of(m.group(1)), path))
+    return [p for _, p in sorted(out)]
+
+
+def latest_checkpoint(state_dir: str = STATE_DIR,
+                      incident_features: bool = False) -> Optional[str]:
+    paths = list_checkpoints(state_dir, incident_features)
+    return paths[-1] if paths else None
+
+
+def build_checkpoint(db_path: str = wfe.DB_PATH, state_dir: str = STATE_DIR,
+                     through: Optional[str] = None, incident_features: bool = False,
+                     from_scratch: bool = False) -> Optional[str]:
+    """Advance the latest checkpoint (or a fresh engine) over the bettable
+    races after it, through ISO date `through` (default: all), and save
+    the result. Returns the checkpoint path (the existing one when there
+    is nothing new)."""
+    os.makedirs(state_dir, exist_ok=True)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        fe = StatefulFeatureEngine(conn)
+        fe.use_daily_pr_freeze = True
+        fe.use_incident_features = incident_features
+        prev = None if from_scratch else latest_checkpoint(state_dir, incident_features)
+        start_key, current_day = 0, None
+        if prev:
+            meta = fe.load_state(prev)
+            start_key, current_day = meta['through_key'], meta['through_date']
+            log.info(f"Resuming from {os.path.basename(prev)}")
+
+        races = [(rid, d) for rid, d in
+                 conn.execute(wfe.CHRONO_RACES_SQL, (through or '9999-12-31',))
+                 if race_key_of(rid) > start_key]
+        if not races:
+            log.info("Engine state is up to date — no new races")
+            return prev
+
+        # Same state as FeatureCacheBuilder.build after these races: only
+        # the freeze at the LAST day boundary survives, so it is the only
+        # one computed (snapshots do not change state).
+        t = time.perf_counter()
+        final_day = races[-1][1]
+        for rid, day in races:
+            if day != current_day:
+                if day == final_day:
+                    fe.freeze_daily_pagerank()
+                current_day = day
+            fe.advance_race(rid)
+        last_rid = races[-1][0]
+        path = os.path.join(state_dir, f"engine_state_through_{last_rid}"
+                                       f"{_suffix(incident_features)}.pkl")
+        fe.save_state(path, through_race=last_rid, through_key=race_key_of(last_rid),
+                      through_date=final_day, db_path=db_path,
+                      created_at=datetime.now().isoformat(timespec='seconds'))
+    finally:
+        conn.close()
+    log.info(f"Advanced {len(races):,} races in {time.perf_counter() - t:.1f}s -> "
+             f"{os.path.basename(path)}")
+    for old in list_checkpoints(state_dir, incident_features)[:-KEEP_CHECKPOINTS]:
+        os.remove(old)
+    return path
+
+
+# =====================================================================
+# LIVE SNAPSHOTS
+# =====================================================================
+def declared_field(req: dict) -> tuple[str, pd.DataFrame]:
+    """Validate a declared-field request -> (race_id, LOAD_RACE_SQL-shaped frame)."""
+    try:
+        date_iso = datetime.strptime(str(req['date_iso']), "%Y-%m-%d").strftime("%Y-%m-%d")
+        race_no = int(req['race_no'])
+        runners = req['runners']
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"need date_iso (YYYY-MM-DD), race_no and runners: {e}")
+    if not isinstance(runners, list) or not runners:
+        raise ValueError("runners must be a non-empty list")
+    rows = []
+    for i, r in enumerate(runners):
+        if not isinstance(r, dict) or not r.get('horse_id'):
+            raise ValueError(f"runner {i}: horse_id is required")
+        rows.append({k: r.get(k) for k in _RUNNER_FIELDS})
+    race_id = f"{date_iso}_R{race_no}"
+    field = pd.DataFrame(rows).assign(
+        race_id=race_id, date_iso=date_iso, race_no=race_no,
+        distance=req.get('distance'), course=req.get('course'),
+        finish_position=np.nan, lbw_lengths=np.nan, esi_raw=np.nan, csi_raw=np.nan)
+    for c in ('act_wt', 'draw', 'win_odds', 'distance'):
+        field[c] = pd.to_numeric(field[c], errors='coerce')
+    return race_id, field[_FIELD_COLUMNS]
+
+
+class LiveFeatureService:
+    """An engine restored from a checkpoint, snapshotting declared fields.
+    Thread-safe: requests share one engine under a lock (snapshots only
+    read state; the lock covers the PageRank freeze swap)."""
+
+    def __init__(self, checkpoint_path: str):
+        self.path = checkpoint_path
+        self.fe = StatefulFeatureEngine(conn=None)   # never reads the database
+        self.meta = self.fe.load_state(checkpoint_path)
+        self._lock = threading.Lock()
+        self._pr_same_day = self.fe.frozen_pr        # boundary freeze of through_date
+        self._pr_next_day = None                     # lazily: PageRank of the full graph
+        self.n_requests = 0
+
+    def health(self) -> dict:
+        return {'checkpoint': os.path.basename(self.path), **self.meta,
+                'incident_features': self.fe.use_incident_features,
+                'requests': self.n_requests}
+
+    def _pagerank_for(self, race_id: str, date_iso: str) -> dict:
+        through_date = self.meta['through_date']
+        if date_iso > through_date:
+            if self._pr_next_day is None:
+                self.fe.freeze_daily_pagerank()
+                self._pr_next_day = self.fe.frozen_pr
+            return self._pr_next_day
+        if date_iso == through_date and race_key_of(race_id) > self.meta['through_key']:
+            return self._pr_same_day
+        raise ValueError(f"{race_id} is not after the checkpoint "
+                         f"({self.meta['through_race']}); its result is already in the state")
+
+    def snapshot(self, req: dict) -> pd.DataFrame:
+        race_id, field = declared_field(req)
+        with self._lock:
+            self.fe.frozen_pr = self._pagerank_for(race_id, field['date_iso'].iat[0])
+            self.n_requests += 1
+            return self.fe.snapshot_for_field(race_id, field)
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    """JSON-safe rows: NaN -> null, numpy scalars -> Python."""
+    out = df.astype(object).where(df.notna(), None)
+    return [{k: (v.item() if isinstance(v, np.generic) else v) for k, v in row.items()}
+            for row in out.to_dict('records')]
+
+
+# =====================================================================
+# HTTP
+# =====================================================================
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "RaceDayFeatures/1"
+
+    def _send(self, code: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, self.server.service.health())
+        else:
+            self._send(404, {'error': f"no route {self.path}"})
+
+    def do_POST(self):
+        t = time.perf_counter()
+        if self.path == "/reload":
+            self._send(200, self.server.reload())
+            return
+        if self.path != "/snapshot":
+            self._send(404, {'error': f"no route {self.path}"})
+            return
+        try:
+            n = int(self.headers.get('Content-Length', 0))
+            req = json.loads(self.rfile.read(n) or b'{}')
+            service = self.server.service
+            snap = service.snapshot(req)
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send(400, {'error': str(e)})
+            return
+        self._send(200, {'race_id': snap['race_id'].iat[0],
+                         'through_race': service.meta['through_race'],
+                         'elapsed_ms': round(1000 * (time.perf_counter() - t), 2),
+                         'rows': _records(snap)})
+
+    def log_message(self, fmt, *args):
+        log.debug("%s - " + fmt, self.address_string(), *args)
+
+
+class RaceDayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, state_dir: str = STATE_DIR, incident_features: bool = False):
+        self.state_dir = state_dir
+        self.incident_features = incident_features
+        self.service = None
+        self.reload()
+        super().__init__(addr, _Handler)
+
+    def reload(self) -> dict:
+        path = latest_checkpoint(self.state_dir, self.incident_features)
+        if path is None:
+            raise FileNotFoundError(f"no engine checkpoint in {self.state_dir} "
+                                    f"(run: race_day_service.py checkpoint)")
+        if self.service is None or path != self.service.path:
+            self.service = LiveFeatureService(path)
+            log.info(f"Serving {os.path.basename(path)}")
+        return self.service.health()
+
+
+# =====================================================================
+# VERIFY
+# =====================================================================
+def _request_for(race: pd.DataFrame) -> dict:
+    """The declared-field request a race day would send for a stored race."""
+    r0 = race.iloc[0]
+    req = {'date_iso': r0['date_iso'], 'race_no': int(r0['race_no']),
+           'distance': r0['distance'], 'course': r0['course'],
+           'runners': _records(race[_RUNNER_FIELDS])}
+    return json.loads(json.dumps(req, default=lambda o: o.item()))
+
+
+def _comparable(snap: pd.DataFrame) -> pd.DataFrame:
+    return (snap.drop(columns=['finish_position'])
+            .sort_values('horse_id').reset_index(drop=True))
+
+
+def verify(db_path: str = wfe.DB_PATH, samples: int = 20, through: Optional[str] = None,
+           incident_features: bool = False, seed: int = 42, latency_calls: int = 200) -> bool:
+    """Live snapshots from checkpoints == snapshot_for during a builder
+    replay, at sampled races; then the /snapshot round-trip latency."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    tmp = tempfile.mkdtemp(prefix="race_day_verify_")
+    ok = True
+    try:
+        races = conn.execute(wfe.CHRONO_RACES_SQL, (through or '9999-12-31',)).fetchall()
+        rng = np.random.default_rng(seed)
+        picks = set(rng.choice(np.arange(1, len(races)), size=min(samples, len(races) - 1),
+                               replace=False).tolist())
+        # plus the first race after a mid-history day, for the built checkpoint
+        mid_day = races[len(races) // 2][1]
+        k_next = next(k for k, (_, d) in enumerate(races) if d > mid_day)
+        picks.add(k_next)
+        log.info(f"Verifying {len(picks)} races of {len(races):,}")
+
+        fe = StatefulFeatureEngine(conn)
+        fe.use_daily_pr_freeze = True
+        fe.use_incident_features = incident_features
+        current_day, n_bad, last_service = None, 0, None
+        for k, (rid, day) in enumerate(races[:max(picks) + 1]):
+            if day != current_day:
+                fe.freeze_daily_pagerank()
+                current_day = day
+            if k in picks:
+                ref = fe.snapshot_for(rid)
+                prid, pday = races[k - 1]
+                path = os.path.join(tmp, "state.pkl")
+                fe.save_state(path, through_race=prid, through_key=race_key_of(prid),
+                              through_date=pday)
+                last_service = LiveFeatureService(path)
+                req = _request_for(fe._load_race(rid))
+                got = last_service.snapshot(req)
+                try:
+                    pd.testing.assert_frame_equal(_comparable(ref), _comparable(got),
+                                                  check_dtype=False, check_exact=True)
+                except AssertionError as e:
+                    n_bad += 1
+                    log.error(f"  {rid}: live snapshot differs: {str(e).splitlines()[0:3]}")
+            fe.advance_race(rid)
+        log.info(f"  replay checkpoints: {len(picks) - n_bad}/{len(picks)} races identical")
+
+        # build_checkpoint from scratch, then incrementally, must serve the
+        # same rows for the first race of the next day
+        state_dir = os.path.join(tmp, "state")
+        first_half = races[len(races) // 4][1]
+        build_checkpoint(db_path, state_dir, first_half, incident_features, from_scratch=True)
+        build_checkpoint(db_path, state_dir, mid_day, incident_features)
+        service = LiveFeatureService(latest_checkpoint(state_dir, incident_features))
+        rid = races[k_next][0]
+        fe2 = StatefulFeatureEngine(conn)
+        req = _request_for(fe2._load_race(rid))
+        ref_rows = _replay_reference(conn, races[:k_next + 1], incident_features)
+        try:
+            pd.testing.assert_frame_equal(_comparable(ref_rows), _comparable(service.snapshot(req)),
+                                          check_dtype=False, check_exact=True)
+            log.info(f"  build_checkpoint (scratch + incremental) -> {rid}: identical")
+        except AssertionError as e:
+            n_bad += 1
+            log.error(f"  build_checkpoint -> {rid}: differs: {str(e).splitlines()[0:3]}")
+        ok = n_bad == 0
+
+        _time_http(service, req, latency_calls)
+    finally:
+        conn.close()
+        for root, dirs, files in os.walk(tmp, topdown=False):
+            for f in files:
+                os.remove(os.path.join(root, f))
+            for d in dirs:
+                os.rmdir(os.path.join(root, d))
+        os.rmdir(tmp)
+    return ok
+
+
+def _replay_reference(conn, races: list, incident_features: bool) -> pd.DataFrame:
+    """snapshot_for of the last race in `races` under the builder protocol."""
+    fe = StatefulFeatureEngine(conn)
+    fe.use_daily_pr_freeze = True
+    fe.use_incident_features = incident_features
+    current_day = None
+    for rid, day in races:
+        if day != current_day:
+            fe.freeze_daily_pagerank()
+            current_day = day
+        if rid == races[-1][0]:
+            return fe.snapshot_for(rid)
+        fe.advance_race(rid)
+
+
+def _time_http(service: LiveFeatureService, req: dict, calls: int) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.service = service
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/snapshot"
+    body = json.dumps(req).encode()
+    lat = []
+    try:
+        for _ in range(calls):
+            t = time.perf_counter()
+            with urllib.request.urlopen(urllib.request.Request(url, data=body)) as r:
+                json.loads(r.read())
+            lat.append(1000 * (time.perf_counter() - t))
+    finally:
+        server.shutdown()
+        server.server_close()
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    log.info(f"  POST /snapshot ({len(req['runners'])} runners, {calls} calls): "
+             f"p50 {p50:.1f} ms | p95 {p95:.1f} ms | p99 {p99:.1f} ms | max {max(lat):.1f} ms")
+
+
+# =====================================================================
+# CLI
+# =====================================================================
+def main():
+    ap = argparse.ArgumentParser(description="Race-day live feature snapshots")
+    ap.add_argument('--db', default=wfe.DB_PATH)
+    ap.add_argument('--state-dir', default=STATE_DIR)
+    ap.add_argument('--incident-features', action='store_true',
+                    help="engine with the stewards' incident family (own checkpoints)")
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    cp = sub.add_parser('checkpoint', help="advance the engine state to the latest ingested race")
+    cp.add_argument('--through', default=None, help="ISO date (default: everything ingested)")
+    cp.add_argument('--from-scratch', action='store_true')
+    sv = sub.add_parser('serve', help="serve POST /snapshot on localhost")
+    sv.add_argument('--host', default="127.0.0.1")
+    sv.add_argument('--port', type=int, default=DEFAULT_PORT)
+    vf = sub.add_parser('verify', help="live snapshots == replay snapshots, plus latency")
+    vf.add_argument('--samples', type=int, default=20)
+    vf.add_argument('--through', default=None, help="only sample races up to this ISO date")
+    args = ap.parse_args()
+
+    if args.cmd == 'checkpoint':
+        build_checkpoint(args.db, args.state_dir, args.through, args.incident_features,
+                         args.from_scratch)
+    elif args.cmd == 'serve':
+        server = RaceDayServer((args.host, args.port), args.state_dir, args.incident_features)
+        log.info(f"Listening on http://{args.host}:{args.port} (POST /snapshot, "
+                 f"GET /health, POST /reload)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    else:
+        if not verify(args.db, args.samples, args.through, args.incident_features):
+            log.error("Live snapshots do not match the replay")
+            sys.exit(1)
+        log.info("Live snapshots match the replay.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Race Tensor — padded (race, runner) arrays for whole-season computations
+========================================================================
+Per-race work (desk selection, Harville, oracle metrics, per-race softmax
+calibration) used to run as a groupby or a Python loop over race_id, a
+few hundred microseconds of pandas overhead per race. Laying a cache
+slice out as one dense block removes the loop:
+
+  values  (n_races, max_field, n_columns)   float, 0 at padding
+  mask    (n_races, max_field)              True for a real runner
+  rows    (n_races, max_field)              source row of each runner, -1 at padding
+
+Runners are packed to the left of their row in source order, so "first
+runner on ties" means the same thing it does for argmax / a stable sort
+over one field. Every helper takes the mask and ignores padding; one that
+also takes a narrower mask (e.g. the desk's leg pool) treats masked-out
+runners as absent. The ordering helpers also treat a NaN value as absent,
+as pandas' rank / nlargest / nsmallest do.
+
+Used by the season desk in walk_forward_engine_v32.py, the conditional
+logit (conditional_logit.py) and oracle_diagnostic_v32.py.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class RaceTensor:
+    race_ids: np.ndarray                 # (R,)
+    columns: list
+    values: np.ndarray                   # (R, M, k)
+    mask: np.ndarray                     # (R, M) bool
+    rows: np.ndarray                     # (R, M) int, -1 at padding
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.values[:, :, self.columns.index(column)]
+
+    @property
+    def field_size(self) -> np.ndarray:
+        return self.mask.sum(axis=1)
+
+    def select(self, keep: np.ndarray) -> "RaceTensor":
+        """The races where keep (R,) is True."""
+        return RaceTensor(self.race_ids[keep], self.columns, self.values[keep],
+                          self.mask[keep], self.rows[keep])
+
+    def take(self, source, fill=0.0) -> np.ndarray:
+        """A per-row array of the source frame -> (R, M); float dtypes are
+        kept as they are."""
+        source = np.asarray(source)
+        if source.dtype.kind == 'f':
+            dtype = source.dtype
+        elif source.dtype.kind in 'biu' and fill is not None:
+            dtype = np.result_type(source.dtype, type(fill))
+        else:
+            dtype = object
+        out = np.full(self.mask.shape, fill, dtype=dtype)
+        out[self.mask] = source[self.rows[self.mask]]
+        return out
+
+    def scatter(self, x: np.ndarray, n_rows: int, fill=np.nan) -> np.ndarray:
+        """(R, M) -> per-row array of the source frame (rows left out of
+        the tensor get `fill`)."""
+        out = np.full(n_rows, fill, dtype=np.result_type(x.dtype, np.float64))
+        out[self.rows[self.mask]] = x[self.mask]
+        return out
+
+
+def pad_races(race_ids, X: np.ndarray, columns=None, sort: bool = False) -> RaceTensor:
+    """Runner rows (race_ids (N,), X (N, k)) -> RaceTensor. Races come in
+    order of first appearance (sort=True: sorted, as groupby does), rows in
+    source order within each race."""
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X.reshape(-1, 1)
+    codes, uniques = pd.factorize(np.asarray(race_ids), sort=sort)
+    order = np.argsort(codes, kind='stable')
+    sizes = np.bincount(codes, minlength=len(uniques))
+    R, M = len(uniques), int(sizes.max()) if len(sizes) else 0
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    race = codes[order]
+    slot = race * M + (np.arange(len(order)) - starts[race])
+
+    values = np.zeros((R * M, X.shape[1]))
+    values[slot] = X[order]
+    mask = np.zeros(R * M, dtype=bool)
+    mask[slot] = True
+    rows = np.full(R * M, -1, dtype=np.int64)
+    rows[slot] = order
+    return RaceTensor(np.asarray(uniques), list(columns or range(X.shape[1])),
+                      values.reshape(R, M, -1), mask.reshape(R, M), rows.reshape(R, M))
+
+
+def race_tensor(df: pd.DataFrame, columns: list, race_col: str = 'race_id',
+                sort: bool = False) -> RaceTensor:
+    """Cache slice -> RaceTensor over `columns` (coerced to float)."""
+    X = np.column_stack([pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=float)
+                         for c in columns]) if columns else np.empty((len(df), 0))
+    return pad_races(df[race_col].to_numpy(), X, columns, sort)
+
+
+# =====================================================================
+# MASKED HELPERS — all (R, M) in, padding / masked-out runners ignored
+# =====================================================================
+def masked_sum(x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    return np.where(mask, x, 0.0).sum(axis=1)
+
+
+def masked_logsumexp(z: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    zm = np.where(mask, z, -np.inf)
+    top = zm.max(axis=1)
+    top = np.where(np.isfinite(top), top, 0.0)
+    return top + np.log(np.exp(zm - top[:, None]).sum(axis=1))
+
+
+def masked_softmax(z: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Per-race softmax; 0 outside the mask."""
+    return np.where(mask, np.exp(np.where(mask, z, -np.inf)
+                                 - masked_logsumexp(z, mask)[:, None]), 0.0)
+
+
+def _ranked(x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """The runners the ordering helpers see: masked and not NaN."""
+    return mask & ~np.isnan(x)
+
+
+def _order(x: np.ndarray, mask: np.ndarray, descending: bool) -> np.ndarray:
+    """Stable per-race ordering of the ranked runners, the rest after."""
+    key = np.where(_ranked(x, mask), -x if descending else x, np.inf).astype(float)
+    return np.argsort(key, axis=1, kind='stable')
+
+
+def masked_rank(x: np.ndarray, mask: np.ndarray, descending: bool = True) -> np.ndarray:
+    """0-based rank within the race (earlier runner first on ties), -1
+    outside the mask or at NaN."""
+    order = _order(x, mask, descending)
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.broadcast_to(np.arange(x.shape[1]), order.shape), axis=1)
+    return np.where(_ranked(x, mask), rank, -1)
+
+
+def top_k(x: np.ndarray, mask: np.ndarray, k: int, descending: bool = True) -> np.ndarray:
+    """(R, k) slots of the k best runners per race, best first (stable);
+    -1 where the race has fewer than k non-NaN runners."""
+    idx = _order(x, mask, descending)[:, :k]
+    if idx.shape[1] < k:
+        idx = np.pad(idx, ((0, 0), (0, k - idx.shape[1])), constant_values=-1)
+    return np.where(np.arange(k)[None, :] < _ranked(x, mask).sum(axis=1)[:, None], idx, -1)
+
+
+def nlargest(x: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    """(R, k) the k largest values per race, descending; NaN where short."""
+    idx = top_k(x, mask, k)
+    return np.where(idx >= 0, np.take_along_axis(x, np.maximum(idx, 0), axis=1), np.nan)
+
+
+def take_slots(x: np.ndarray, idx: np.ndarray, fill=np.nan) -> np.ndarray:
+    """x (R, M) at per-race slots idx (R, j); `fill` where idx is -1."""
+    out = np.take_along_axis(x, np.maximum(idx, 0), axis=1)
+    return np.where(idx >= 0, out, fill)
@@ -20,6 +20,15 @@ CACHE INVALIDATION:
   The cache stores feature snapshots. If a FEATURE definition changes,
   rebuild with --rebuild-cache. If only DESK parameters change (Kelly, EV,
   odds bands), the cache is still valid — reuse it (the common Tier 2 case).
+  --incident-features adds the engine's stewards' incident family
+  (INCIDENT_FEATURES) to the model and keeps its own cache file
+  (feature_cache_through_<date>_incidents.pkl). --trio-pool (a desk
+  parameter, cache still valid) stakes and settles with our own money in
+  an estimated TRIO pool of that size (pool_impact.py). --copula-rho (also
+  desk-only) prices the engine side of each block with the pace-copula
+  finishing-order simulator instead of Harville (finish_order_sim.py).
+  --win-model swaps the win calibrator for a per-race conditional logit,
+  optionally Benter-style with the public log-odds (conditional_logit.py).
 
 SEAL PROTECTION:
   The development cache is built only THROUGH end of 2024/25. It physically
@@ -30,7 +39,12 @@ SEAL PROTECTION:
 Run from project root:
     python3 backtest_engine/walk_forward_engine_v32.py --mode development
     python3 backtest_engine/walk_forward_engine_v32.py --mode development --rebuild-cache
+    python3 backtest_engine/walk_forward_engine_v32.py --mode development --rebuild-cache --profile
     python3 backtest_engine/walk_forward_engine_v32.py --mode single --season 2018/19
+    python3 backtest_engine/walk_forward_engine_v32.py --mode development --incident-features
+    python3 backtest_engine/walk_forward_engine_v32.py --mode development --trio-pool 10e6
+    python3 backtest_engine/walk_forward_engine_v32.py --mode development --copula-rho 0.3
+    python3 backtest_engine/walk_forward_engine_v32.py --mode development --win-model benter
     python3 backtest_engine/walk_forward_engine_v32.py --mode sealed     # ONCE
 """
 
@@ -43,6 +57,7 @@ import logging
 import sqlite3
 import itertools
 from dataclasses import dataclass, field
+from typing import Callable, Optional
 
 import numpy as np
 import pandas as pd
@@ -52,20 +67,18 @@ from sklearn.linear_model import LogisticRegression
 _SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
 _PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
 sys.path.insert(0, os.path.join(_PROJECT_ROOT, "data_pipeline"))
-from stateful_feature_engine import StatefulFeatureEngine  # noqa: E402
+from stateful_feature_engine import (StatefulFeatureEngine, StageProfiler,  # noqa: E402
+                                     INCIDENT_FEATURES)
+from pool_impact import optimal_block_stake, diluted_dividend               # noqa: E402
+from finish_order_sim import PACE_PROFILE, copula_trio_fn, check_rho         # noqa: E402
+from conditional_logit import ConditionalLogit, WIN_MODELS, fit_win_model   # noqa: E402
+from race_tensor import RaceTensor, race_tensor, masked_sum, top_k          # noqa: E402
 
 DB_PATH    = os.path.join(_PROJECT_ROOT, "data", "hk_racing.db")
 CACHE_DIR  = os.path.join(_PROJECT_ROOT, "data", "feature_cache")
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(_PROJECT_ROOT, "data", "walk_forward_log.txt")),
-        logging.StreamHandler()
-    ]
-)
+LOG_PATH   = os.path.join(_PROJECT_ROOT, "data", "walk_forward_log.txt")
 log = logging.getLogger(__name__)
 
 # =====================================================================
@@ -103,6 +116,24 @@ DEV_SEASONS  = [f"{y}/{y+1}" for y in range(2016, 2025)]   # 2016/17..2024/25
 SEALED_SEASON = "2025/26"
 
 
+# =====================================================================
+# SQL (audited by query_plan_audit.py; see ingest_v32 INDEX_SQL)
+# =====================================================================
+CHRONO_RACES_SQL = """
+    SELECT race_id, date_iso FROM race_metadata
+    WHERE is_bettable = 1 AND date_iso <= ?
+    ORDER BY date_iso, race_no
+"""
+
+TRIO_DIVIDENDS_SQL = """
+    SELECT combo, dividend FROM exotic_dividends
+    WHERE race_id = ? AND pool = 'TRIO' AND is_refund = 0
+      AND combo NOT LIKE '%/%'
+      AND combo GLOB '*[0-9]*'
+      AND combo NOT GLOB '*[A-Za-z]*'
+"""
+
+
 # =====================================================================
 # SEASON / DATE HELPERS
 # =====================================================================
@@ -133,6 +164,177 @@ def harville_unordered_trio(prob: dict, combo: tuple) -> float:
     return total
 
 
+def harville_unordered_trio_races(prob: np.ndarray, combos: np.ndarray) -> np.ndarray:
+    """harville_unordered_trio for every (race, combo) at once: prob (R, M)
+    normalized per race (race_tensor.py), combos (R, C, 3) runner slots ->
+    (R, C). Same terms in the same order."""
+    total = np.zeros(combos.shape[:2])
+    for perm in itertools.permutations(range(3)):
+        pa, pb, pc = (np.take_along_axis(prob, combos[:, :, i], axis=1) for i in perm)
+        d1 = 1.0 - pa
+        d2 = 1.0 - pa - pb
+        ok = (d1 > 0) & (d2 > 0)
+        total = total + np.where(ok, pa * (pb / np.where(ok, d1, 1.0))
+                                 * (pc / np.where(ok, d2, 1.0)), 0.0)
+    return total
+
+
+def win_probability(cal_win, score: np.ndarray, win_odds: np.ndarray) -> np.ndarray:
+    """One field's calibrated (not yet renormalized) win probabilities.
+    Only the Benter-style conditional logit reads win_odds."""
+    if isinstance(cal_win, ConditionalLogit):
+        return cal_win.predict_proba(cal_win.inputs(score, win_odds))[:, 1]
+    return cal_win.predict_proba(score.reshape(-1, 1))[:, 1]
+
+
+def win_probability_races(cal_win, T: RaceTensor, score: np.ndarray,
+                          win_odds: np.ndarray) -> np.ndarray:
+    """win_probability for every field of a RaceTensor at once; score /
+    win_odds per source row, result (R, M)."""
+    if not isinstance(cal_win, ConditionalLogit):
+        return T.take(cal_win.predict_proba(score.reshape(-1, 1))[:, 1])
+    X = T.take(np.asarray(score, dtype=float))[:, :, None]
+    if cal_win.public:
+        inv = T.take(1.0 / win_odds)
+        pub = np.log(np.where(T.mask, inv / masked_sum(inv, T.mask)[:, None], 1.0))
+        X = np.concatenate([X, pub[:, :, None]], axis=2)
+    return cal_win.predict_races(X, T.mask)
+
+
+# =====================================================================
+# DESK RULES (Phase 53 Structural Anchor) — pure, shared with race day
+# =====================================================================
+def desk_decision(horse_ids, horse_nos, win_odds, model_score, p_win, p_place,
+                  bankroll: float, pool: Optional[float] = None,
+                  trio_fn: Optional[Callable] = None) -> "DeskDecision":
+    """Anchor + legs + block EV + Kelly stake for one field.
+
+    Plain arrays aligned by runner, already restricted to runners with
+    complete features and a win price; p_win / p_place are the calibrated
+    (not yet renormalized) probabilities. No DataFrames and no database, so
+    the backtest desk and the race-day scorer (race_day_scorer.py) apply the
+    same rules. A skipped race comes back with skip_reason set. `pool` (an
+    estimated TRIO pool, HKD) switches to impact-aware staking (desk_price).
+    `trio_fn` (combos -> engine trio probabilities, e.g. the copula
+    simulator in finish_order_sim.py) replaces Harville on the engine side;
+    it is only called for a selected block."""
+    d = desk_select(horse_ids, win_odds, model_score, p_place)
+    if d.skip_reason:
+        return d
+    if trio_fn is None:
+        eng_p = dict(zip(horse_ids, (p_win / p_win.sum()).tolist()))
+        p_eng = [harville_unordered_trio(eng_p, c) for c in d.combos]
+    else:
+        p_eng = trio_fn(d.combos)
+    inv_odds = 1.0 / win_odds
+    pub_p = dict(zip(horse_ids, (inv_odds / inv_odds.sum()).tolist()))
+    return desk_price(d, p_eng,
+                      [harville_unordered_trio(pub_p, c) for c in d.combos],
+                      bankroll, dict(zip(horse_ids, horse_nos)), pool)
+
+
+def desk_select(horse_ids, win_odds, model_score, p_place) -> "DeskDecision":
+    """Structural part of the desk: field size, anchor, legs, combos. It
+    reads win_odds only through the ANCHOR_MAX_ODDS / LEG_MIN_ODDS tests,
+    so it holds until a price crosses one of them (or a runner drops out)."""
+    n = len(horse_ids)
+    if n < MIN_FIELD:
+        return DeskDecision(f"field {n} < {MIN_FIELD}")
+
+    a = int(np.argmax(model_score))            # model_rank == 1 (first on ties)
+    anchor_id = horse_ids[a]
+    if win_odds[a] > ANCHOR_MAX_ODDS:
+        return DeskDecision(f"anchor odds {win_odds[a]:.1f} > {ANCHOR_MAX_ODDS}",
+                            anchor=anchor_id)
+
+    pool = np.flatnonzero((horse_ids != anchor_id) & (win_odds >= LEG_MIN_ODDS))
+    if len(pool) < N_LEGS:
+        return DeskDecision(f"{len(pool)} legs >= {LEG_MIN_ODDS} < {N_LEGS}",
+                            anchor=anchor_id)
+    legs = pool[np.argsort(-p_place[pool], kind='stable')[:N_LEGS]]
+    leg_ids = [horse_ids[i] for i in legs]
+    combos = [(anchor_id, x, y) for x, y in itertools.combinations(leg_ids, 2)]
+    return DeskDecision(None, anchor=anchor_id, legs=leg_ids, combos=combos)
+
+
+def desk_select_races(model_score, win_odds, p_place, mask):
+    """desk_select for a whole season of padded fields (race_tensor.py):
+    (R, M) runner arrays -> ok (R,), anchor (R,) and legs (R, N_LEGS) as
+    runner slots. Same anchor and legs as desk_select, ties included."""
+    anchor = np.argmax(np.where(mask, model_score, -np.inf), axis=1)
+    anchor_odds = np.take_along_axis(win_odds, anchor[:, None], axis=1)[:, 0]
+    pool = (mask & (np.arange(mask.shape[1])[None, :] != anchor[:, None])
+            & (win_odds >= LEG_MIN_ODDS))
+    legs = top_k(p_place, pool, N_LEGS)
+    ok = ((mask.sum(axis=1) >= MIN_FIELD) & (anchor_odds <= ANCHOR_MAX_ODDS)
+          & (pool.sum(axis=1) >= N_LEGS))
+    return ok, anchor, legs
+
+
+def desk_price(d: "DeskDecision", p_eng: list, p_pub: list, bankroll: float,
+               no_map: dict, pool: Optional[float] = None) -> "DeskDecision":
+    """Block EV + Kelly stake for a selected block, from the Harville trio
+    probability of each combo under the engine (p_eng) and the public
+    (p_pub) win distributions. Fills d in place and returns it.
+
+    With an estimated TRIO `pool` the stake is KELLY_MULT x the growth-
+    optimal stake once our own money dilutes the dividends
+    (pool_impact.optimal_block_stake) instead of Kelly on the pool-blind
+    average payout. The EV gate is unchanged."""
+    block_hit_prob = 0.0
+    synth_payouts = []
+    for pe, pp in zip(p_eng, p_pub):
+        if pp <= 0:
+            synth_payouts.append(0.0)
+            continue
+        synth_payouts.append((1.0 / pp) * (1.0 - RAKE))
+        block_hit_prob += pe
+
+    d.block_hit_prob = block_hit_prob
+    valid_payouts = [s for s in synth_payouts if s > 0]
+    if not valid_payouts or block_hit_prob <= 0:
+        d.skip_reason = "no priced combos"
+        return d
+    d.avg_synth_payout = float(np.mean(valid_payouts))
+    d.block_ev = block_hit_prob * d.avg_synth_payout
+    if d.block_ev < EV_THRESHOLD:
+        d.skip_reason = f"block EV {d.block_ev:.3f} < {EV_THRESHOLD}"
+        return d
+
+    b = d.avg_synth_payout - 1.0
+    if b <= 0:
+        d.skip_reason = "no payout edge"
+        return d
+    if pool is None:
+        f_star = (b * block_hit_prob - (1.0 - block_hit_prob)) / b
+        f = max(0.0, f_star * KELLY_MULT)
+        block_stake = f * bankroll
+    else:
+        x_star = optimal_block_stake([p_eng], [p_pub], pool, RAKE, bankroll)[0]
+        block_stake = KELLY_MULT * x_star * len(d.combos)
+    if block_stake < MIN_BLOCK_BET:
+        d.skip_reason = f"stake {block_stake:.0f} < {MIN_BLOCK_BET:.0f}"
+        return d
+
+    combos = d.combos
+    per_combo = max(MIN_TICKET, round((block_stake / len(combos)) / MIN_TICKET) * MIN_TICKET)
+    block_stake = per_combo * len(combos)
+    if block_stake > bankroll:
+        d.skip_reason = f"stake {block_stake:.0f} > bankroll"
+        return d
+    d.per_combo_stake, d.block_stake = per_combo, block_stake
+
+    # combos -> horse_no sets for settlement
+    for combo in combos:
+        try:
+            nos = frozenset(int(no_map[hid]) for hid in combo)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if len(nos) == 3:
+            d.combo_nos.append(nos)
+    return d
+
+
 # =====================================================================
 # CONTAINERS
 # =====================================================================
@@ -147,6 +349,19 @@ class Bet:
     realized_payout: float = 0.0
     est_block_ev: float = 0.0
 
+@dataclass
+class DeskDecision:
+    skip_reason: Optional[str]          # None = bet
+    anchor: object = None
+    legs: list = field(default_factory=list)
+    combos: list = field(default_factory=list)        # (anchor, leg, leg) horse_ids
+    combo_nos: list = field(default_factory=list)     # frozenset horse_nos (settlement)
+    block_hit_prob: float = 0.0
+    avg_synth_payout: float = 0.0
+    block_ev: float = 0.0
+    per_combo_stake: float = 0.0
+    block_stake: float = 0.0
+
 @dataclass
 class SeasonResult:
     season: str
@@ -185,22 +400,20 @@ class SeasonResult:
 # FEATURE CACHE BUILDER (one chronological pass, per-day PageRank)
 # =====================================================================
 class FeatureCacheBuilder:
-    def __init__(self, conn):
+    def __init__(self, conn, incident_features: bool = False):
         self.conn = conn
         self.fe = StatefulFeatureEngine(conn)
+        self.incident_features = incident_features
 
     def _chrono_races_through(self, end_iso: str):
-        q = """
-            SELECT race_id, date_iso FROM race_metadata
-            WHERE is_bettable = 1 AND date_iso <= ?
-            ORDER BY date_iso, race_no
-        """
-        return [(rid, d) for rid, d in self.conn.execute(q, (end_iso,))]
-
-    def build(self, end_iso: str, cache_path: str) -> pd.DataFrame:
+        return [(rid, d) for rid, d in self.conn.execute(CHRONO_RACES_SQL, (end_iso,))]
+
+    def build(self, end_iso: str, cache_path: str, profile: bool = False) -> pd.DataFrame:
         log.info(f"Building feature cache through {end_iso} ...")
         self.fe.reset()
         self.fe.use_daily_pr_freeze = True       # per-day PageRank (v31-faithful)
+        self.fe.use_incident_features = self.incident_features
+        self.fe.profiler = StageProfiler() if profile else None
 
         races = self._chrono_races_through(end_iso)
         log.info(f"  {len(races):,} races to replay")
@@ -218,11 +431,20 @@ class FeatureCacheBuilder:
             self.fe.advance_race(rid)
             if (k + 1) % 1000 == 0:
                 log.info(f"  ... {k+1:,}/{len(races):,} races")
+                if self.fe.profiler is not None:
+                    log.info(f"      {self.fe.profiler.format_line()}")
 
         cache = pd.concat(snaps, ignore_index=True)
         with open(cache_path, 'wb') as f:
             pickle.dump(cache, f)
         log.info(f"  cache saved: {cache_path} ({len(cache):,} rows)")
+
+        if self.fe.profiler is not None:
+            prof_path = os.path.splitext(cache_path)[0] + "_profile.json"
+            self.fe.profiler.dump_json(prof_path, end_iso=end_iso,
+                                       cache_rows=len(cache))
+            log.info(f"  profile: {self.fe.profiler.format_line()}")
+            log.info(f"  profile saved: {prof_path}")
         return cache
 
 
@@ -230,34 +452,37 @@ class FeatureCacheBuilder:
 # WALK-FORWARD ENGINE (cache-backed)
 # =====================================================================
 class WalkForwardEngine:
-    def __init__(self, db_path=DB_PATH, end_iso=None, rebuild=False):
+    def __init__(self, db_path=DB_PATH, end_iso=None, rebuild=False, profile=False,
+                 cache_dir=CACHE_DIR, incident_features=False, trio_pool=None,
+                 copula_rho=None, win_model='logistic'):
         self.conn = sqlite3.connect(db_path)
+        self.incident_features = incident_features
+        self.trio_pool = trio_pool          # estimated TRIO pool (HKD); None = infinite liquidity
+        # pace-copula engine trio probs; None = Harville
+        self.copula_rho = None if copula_rho is None else check_rho(copula_rho)
+        self.win_model = win_model          # win calibrator, one of WIN_MODELS
+        self.features = MODEL_FEATURES + (INCIDENT_FEATURES if incident_features else [])
         # cache horizon: dev -> end of 2024/25; sealed -> end of 2025/26
         self.end_iso = end_iso or season_bounds(DEV_SEASONS[-1])[1]
-        self.cache_path = os.path.join(CACHE_DIR, f"feature_cache_through_{self.end_iso}.pkl")
-        self.cache = self._load_or_build(rebuild)
+        suffix = "_incidents" if incident_features else ""
+        self.cache_path = os.path.join(cache_dir,
+                                       f"feature_cache_through_{self.end_iso}{suffix}.pkl")
+        self.cache = self._load_or_build(rebuild, profile)
         # index cache by race for fast slicing
         self.cache_by_race = dict(tuple(self.cache.groupby('race_id')))
 
-    def _load_or_build(self, rebuild):
+    def _load_or_build(self, rebuild, profile=False):
         if (not rebuild) and os.path.exists(self.cache_path):
             log.info(f"Loading feature cache: {self.cache_path}")
             with open(self.cache_path, 'rb') as f:
                 return pickle.load(f)
-        builder = FeatureCacheBuilder(self.conn)
-        return builder.build(self.end_iso, self.cache_path)
+        builder = FeatureCacheBuilder(self.conn, self.incident_features)
+        return builder.build(self.end_iso, self.cache_path, profile=profile)
 
     # ---- clean Trio dividends (settlement) ----
     def _clean_trio_dividends(self, race_id):
-        q = """
-            SELECT combo, dividend FROM exotic_dividends
-            WHERE race_id = ? AND pool = 'TRIO' AND is_refund = 0
-              AND combo NOT LIKE '%/%'
-              AND combo GLOB '*[0-9]*'
-              AND combo NOT GLOB '*[A-Za-z]*'
-        """
         out = []
-        for combo, div in self.conn.execute(q, (race_id,)):
+        for combo, div in self.conn.execute(TRIO_DIVIDENDS_SQL, (race_id,)):
             try:
                 nums = frozenset(int(x) for x in str(combo).split(',') if x.strip().isdigit())
                 if len(nums) == 3 and div is not None:
@@ -268,9 +493,9 @@ class WalkForwardEngine:
 
     # ---- model fit (per train window) ----
     def _fit_model(self, train_df):
-        df = train_df.dropna(subset=MODEL_FEATURES).copy()
+        df = train_df.dropna(subset=self.features).copy()
         df = df[df['finish_position'].notna()].sort_values(['date_iso', 'race_id'])
-        X = df[MODEL_FEATURES].astype(float)
+        X = df[self.features].astype(float)
         y = (20 - pd.to_numeric(df['finish_position'], errors='coerce').fillna(20)).clip(lower=0)
         groups = df.groupby('race_id', sort=False).size().values
         ranker = xgb.XGBRanker(**XGB_PARAMS)
@@ -278,15 +503,25 @@ class WalkForwardEngine:
         df['model_score'] = ranker.predict(X)
         df['is_win']   = (pd.to_numeric(df['finish_position'], errors='coerce') == 1).astype(int)
         df['is_place'] = (pd.to_numeric(df['finish_position'], errors='coerce') <= 3).astype(int)
-        cal_win = LogisticRegression(solver='lbfgs', max_iter=500)
-        cal_win.fit(df[['model_score']].values, df['is_win'].values)
+        cal_win = self._fit_win_calibrator(df)
         cal_place = LogisticRegression(solver='lbfgs', max_iter=500)
         cal_place.fit(df[['model_score']].values, df['is_place'].values)
         return ranker, cal_win, cal_place
 
+    def _fit_win_calibrator(self, df):
+        """model_score -> win probability on the in-sample training frame:
+        per-horse logistic, or the per-race conditional logit
+        (conditional_logit.py; 'benter' adds the public log-odds)."""
+        if self.win_model == 'logistic':
+            cal_win = LogisticRegression(solver='lbfgs', max_iter=500)
+            return cal_win.fit(df[['model_score']].values, df['is_win'].values)
+        return fit_win_model(self.win_model, df['model_score'].to_numpy(),
+                             df['race_id'].to_numpy(), df['is_win'].to_numpy(),
+                             df['win_odds'].to_numpy())
+
     # ---- execution desk (Phase 53 Structural Anchor) ----
     def _execute_desk(self, race_id, snap, ranker, cal_win, cal_place, bankroll):
-        df = snap.dropna(subset=MODEL_FEATURES).copy()
+        df = snap.dropna(subset=self.features).copy()
         if len(df) < MIN_FIELD:
             return None
         df['win_odds'] = pd.to_numeric(df['win_odds'], errors='coerce')
@@ -294,83 +529,79 @@ class WalkForwardEngine:
         if len(df) < MIN_FIELD:
             return None
 
-        X = df[MODEL_FEATURES].astype(float)
-        df['model_score'] = ranker.predict(X)
-        df['p_win_cal']   = cal_win.predict_proba(df[['model_score']].values)[:, 1]
-        df['p_place_cal'] = cal_place.predict_proba(df[['model_score']].values)[:, 1]
-        df['model_rank']  = df['model_score'].rank(ascending=False, method='first')
-
-        anchor_row = df[df['model_rank'] == 1.0]
-        if len(anchor_row) == 0:
-            return None
-        anchor = anchor_row.iloc[0]
-        if anchor['win_odds'] > ANCHOR_MAX_ODDS:
-            return None
-        anchor_id = anchor['horse_id']
-
-        leg_pool = df[(df['horse_id'] != anchor_id) & (df['win_odds'] >= LEG_MIN_ODDS)]
-        if len(leg_pool) < N_LEGS:
-            return None
-        legs = leg_pool.nlargest(N_LEGS, 'p_place_cal')
-        leg_ids = legs['horse_id'].tolist()
-
-        eng_p = df.set_index('horse_id')['p_win_cal']
-        eng_p = (eng_p / eng_p.sum()).to_dict()
-        df['inv_odds'] = 1.0 / df['win_odds']
-        pub_p = (df.set_index('horse_id')['inv_odds'] / df['inv_odds'].sum()).to_dict()
-
-        combos = [(anchor_id, a, b) for a, b in itertools.combinations(leg_ids, 2)]
-
-        block_hit_prob = 0.0
-        synth_payouts = []
-        for combo in combos:
-            p_eng = harville_unordered_trio(eng_p, combo)
-            p_pub = harville_unordered_trio(pub_p, combo)
-            if p_pub <= 0:
-                synth_payouts.append(0.0)
-                continue
-            synth_payouts.append((1.0 / p_pub) * (1.0 - RAKE))
-            block_hit_prob += p_eng
-
-        valid_payouts = [s for s in synth_payouts if s > 0]
-        if not valid_payouts or block_hit_prob <= 0:
-            return None
-        avg_synth = float(np.mean(valid_payouts))
-        block_ev = block_hit_prob * avg_synth
-        if block_ev < EV_THRESHOLD:
-            return None
-
-        b = avg_synth - 1.0
-        if b <= 0:
-            return None
-        f_star = (b * block_hit_prob - (1.0 - block_hit_prob)) / b
-        f = max(0.0, f_star * KELLY_MULT)
-        block_stake = f * bankroll
-        if block_stake < MIN_BLOCK_BET:
+        X = df[self.features].astype(float)
+        score = ranker.predict(X)
+        horse_ids = df['horse_id'].to_numpy()
+        win_odds = df['win_odds'].to_numpy(dtype=float)
+        p_win = win_probability(cal_win, score, win_odds)
+        trio_fn = None
+        if self.copula_rho is not None:
+            trio_fn = copula_trio_fn(race_id, horse_ids, p_win,
+                                     df[list(PACE_PROFILE)].to_numpy(dtype=float),
+                                     self.copula_rho)
+        d = desk_decision(horse_ids, df['horse_no'].to_numpy(),
+                          win_odds, score, p_win,
+                          cal_place.predict_proba(score.reshape(-1, 1))[:, 1],
+                          bankroll, self.trio_pool, trio_fn)
+        if d.skip_reason:
             return None
+        return self._bet(race_id, str(snap['date_iso'].iloc[0]), d)
 
-        per_combo = max(MIN_TICKET, round((block_stake / len(combos)) / MIN_TICKET) * MIN_TICKET)
-        block_stake = per_combo * len(combos)
-        if block_stake > bankroll:
-            return None
-
-        # combos -> horse_no sets for settlement (horse_no is in the snapshot)
-        no_map = df.set_index('horse_id')['horse_no'].to_dict()
-        combo_nos = []
-        for combo in combos:
-            try:
-                nos = frozenset(int(no_map[hid]) for hid in combo)
-            except (KeyError, TypeError, ValueError):
-                continue
-            if len(nos) == 3:
-                combo_nos.append(nos)
-
+    @staticmethod
+    def _bet(race_id, date_iso, d: DeskDecision) -> Bet:
         return Bet(
-            race_id=race_id, date_iso=str(snap['date_iso'].iloc[0]),
-            block_stake=block_stake, per_combo_stake=per_combo,
-            combos=combo_nos, est_block_ev=block_ev,
+            race_id=race_id, date_iso=date_iso,
+            block_stake=d.block_stake, per_combo_stake=d.per_combo_stake,
+            combos=d.combo_nos, est_block_ev=d.block_ev,
         )
 
+    def _season_desk(self, test, ranker, cal_win, cal_place) -> dict:
+        """The bankroll-independent half of _execute_desk for every race of
+        a test slice at once (race_tensor.py): one ranker and calibrator
+        call, then selection and both Harville sides as array ops. Returns
+        race_id -> (DeskDecision, p_eng, p_pub, no_map, date_iso) for the
+        selected races; run_season prices them (desk_price) against the
+        running bankroll."""
+        df = test.dropna(subset=self.features)
+        df = df.assign(win_odds=pd.to_numeric(df['win_odds'], errors='coerce')).dropna(
+            subset=['win_odds'])
+        if df.empty:
+            return {}
+        score = ranker.predict(df[self.features].astype(float))
+        win_odds = df['win_odds'].to_numpy(dtype=float)
+        T = race_tensor(df, ['win_odds'])
+        p_win = win_probability_races(cal_win, T, score, win_odds)
+        p_place = T.take(cal_place.predict_proba(score.reshape(-1, 1))[:, 1])
+        ok, anchor, legs = desk_select_races(T.take(score), T['win_odds'], p_place, T.mask)
+
+        legs = np.maximum(legs, 0)                      # skipped races only
+        combos = np.stack([np.column_stack([anchor, legs[:, i], legs[:, j]])
+                           for i, j in itertools.combinations(range(N_LEGS), 2)], axis=1)
+        eng_p = (p_win / masked_sum(p_win, T.mask)[:, None]).astype(float)   # as .tolist()
+        inv = T.take(1.0 / win_odds)
+        pub_p = inv / masked_sum(inv, T.mask)[:, None]
+        p_eng = harville_unordered_trio_races(eng_p, combos)
+        p_pub = harville_unordered_trio_races(pub_p, combos)
+
+        horse_ids, horse_nos = df['horse_id'].to_numpy(), df['horse_no'].to_numpy()
+        dates = df['date_iso'].to_numpy()
+        profile = (df[list(PACE_PROFILE)].to_numpy(dtype=float)
+                   if self.copula_rho is not None else None)
+        plan = {}
+        for r in np.flatnonzero(ok):
+            rows = T.rows[r, T.mask[r]]
+            ids = horse_ids[rows]
+            race_id = T.race_ids[r]
+            d = DeskDecision(None, anchor=ids[anchor[r]], legs=[ids[k] for k in legs[r]],
+                             combos=[tuple(ids[k] for k in c) for c in combos[r]])
+            pe = p_eng[r].tolist()
+            if self.copula_rho is not None:
+                pe = copula_trio_fn(race_id, ids, p_win[r, :len(rows)], profile[rows],
+                                    self.copula_rho)(d.combos)
+            plan[race_id] = (d, pe, p_pub[r].tolist(), dict(zip(ids, horse_nos[rows])),
+                             str(dates[rows[0]]))
+        return plan
+
     # ---- settlement (real dividends) ----
     def _settle(self, bet: Bet) -> Bet:
         winning = self._clean_trio_dividends(bet.race_id)
@@ -382,7 +613,12 @@ class WalkForwardEngine:
             for win_set, div in winning:
                 if combo_set == win_set:
                     hit = True
-                    payout += (bet.per_combo_stake / 10.0) * div
+                    if self.trio_pool is None:
+                        payout += (bet.per_combo_stake / 10.0) * div
+                    else:   # our own block diluted the dividend
+                        payout += bet.per_combo_stake * float(diluted_dividend(
+                            div / 10.0, bet.per_combo_stake, self.trio_pool, RAKE,
+                            bet.block_stake))
         bet.won, bet.realized_payout = hit, payout
         return bet
 
@@ -399,21 +635,22 @@ class WalkForwardEngine:
         ranker, cal_win, cal_place = self._fit_model(train_df)
 
         # test races in chronological order
-        test_ids = (c[(c['date_iso'] >= te_start) & (c['date_iso'] <= te_end)]
-                    .drop_duplicates('race_id')
+        test = c[(c['date_iso'] >= te_start) & (c['date_iso'] <= te_end)]
+        test_ids = (test.drop_duplicates('race_id')
                     .sort_values(['date_iso', 'race_no'])['race_id'].tolist())
+        plan = self._season_desk(test, ranker, cal_win, cal_place)
 
         result = SeasonResult(season=test_season)
         bankroll = STARTING_BANKROLL
         result.bankroll_curve.append(bankroll)
         for rid in test_ids:
-            snap = self.cache_by_race.get(rid)
             result.n_races += 1
-            if snap is None or len(snap) == 0:
+            if rid not in plan:
                 continue
-            bet = self._execute_desk(rid, snap, ranker, cal_win, cal_place, bankroll)
-            if bet is not None:
-                bet = self._settle(bet)
+            d, p_eng, p_pub, no_map, date_iso = plan[rid]
+            d = desk_price(d, p_eng, p_pub, bankroll, no_map, self.trio_pool)
+            if not d.skip_reason:
+                bet = self._settle(self._bet(rid, date_iso, d))
                 bankroll = bankroll - bet.block_stake + bet.realized_payout
                 result.bets.append(bet)
                 result.bankroll_curve.append(bankroll)
@@ -467,7 +704,26 @@ def main():
     ap.add_argument('--season', default=None)
     ap.add_argument('--rebuild-cache', action='store_true',
                     help="force rebuild of the feature cache (after feature changes)")
+    ap.add_argument('--profile', action='store_true',
+                    help="per-stage engine timing during a cache build "
+                         "(logged every 1000 races, saved as *_profile.json)")
+    ap.add_argument('--incident-features', action='store_true',
+                    help="add the stewards' incident family (INCIDENT_FEATURES) "
+                         "to the model; uses its own feature cache")
+    ap.add_argument('--trio-pool', type=float, default=None,
+                    help="estimated TRIO pool (HKD): size stakes and settle with our "
+                         "own money diluting the dividend (pool_impact.py)")
+    ap.add_argument('--copula-rho', type=float, default=None,
+                    help="engine trio probabilities from the pace-copula finishing-"
+                         "order simulator at this rho instead of Harville "
+                         "(finish_order_sim.py)")
+    ap.add_argument('--win-model', choices=WIN_MODELS, default='logistic',
+                    help="win calibrator: per-horse logistic, per-race conditional "
+                         "logit, or conditional logit on score + public log-odds "
+                         "(conditional_logit.py)")
     args = ap.parse_args()
+    if args.copula_rho is not None and not 0.0 <= args.copula_rho < 1.0:
+        ap.error(f"--copula-rho must be in [0, 1), got {args.copula_rho}")
 
     if args.mode == 'sealed':
         # sealed cache extends through 2025/26
@@ -477,12 +733,19 @@ def main():
         if confirm.strip() != 'SEAL BREAK':
             log.info("Aborted. Seal intact.")
             return
-        eng = WalkForwardEngine(end_iso=end_iso, rebuild=args.rebuild_cache)
+        eng = WalkForwardEngine(end_iso=end_iso, rebuild=args.rebuild_cache,
+                                profile=args.profile,
+                                incident_features=args.incident_features,
+                                trio_pool=args.trio_pool, copula_rho=args.copula_rho,
+                                win_model=args.win_model)
         eng.run_sealed()
         return
 
     # development / single: cache horizon = end of last dev season (2024/25)
-    eng = WalkForwardEngine(rebuild=args.rebuild_cache)
+    eng = WalkForwardEngine(rebuild=args.rebuild_cache, profile=args.profile,
+                            incident_features=args.incident_features,
+                            trio_pool=args.trio_pool, copula_rho=args.copula_rho,
+                            win_model=args.win_model)
     if args.mode == 'development':
         eng.run_development()
     elif args.mode == 'single':
@@ -495,4 +758,11 @@ def main():
 
 
 if __name__ == "__main__":
+    # only the engine's own runs go to walk_forward_log.txt; importers
+    # configure their own logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(LOG_PATH), logging.StreamHandler()]
+    )
     main()
@@ -0,0 +1,214 @@
+"""
+v32 Pipeline Benchmark Harness
+===============================
+Times the three hot paths of the v32 pipeline on a SYNTHETIC racing database
+(benchmarks/synthetic_racing_data.py), so performance regressions are caught
+without the real scrape or network access.
+
+  1. ingest      — ingest_v32.run_ingest over the synthetic CSVs (rows/sec)
+  2. replay      — FeatureCacheBuilder.build, chronological engine replay
+                   with per-stage profiling (races/sec)
+  3. backtest    — WalkForwardEngine.run_season on the last synthetic season
+                   (wall seconds: model fit + desk + settlement)
+
+Results are printed and written as JSON. Pass --baseline with an earlier
+JSON to fail (exit 1) when any metric regresses by more than --tolerance.
+
+Run from project root:
+    python3 benchmarks/run_benchmarks.py --seasons 3
+    python3 benchmarks/run_benchmarks.py --seasons 3 --out bench.json
+    python3 benchmarks/run_benchmarks.py --seasons 3 --baseline bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import sqlite3
+import tempfile
+from datetime import datetime
+
+# The pipeline modules only attach their data/ log files when run as
+# scripts, so importing them here writes nothing under data/.
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+log = logging.getLogger("benchmarks")
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+sys.path.insert(0, _SCRIPT_DIR)
+sys.path.insert(0, os.path.join(_PROJECT_ROOT, "data_pipeline"))
+sys.path.insert(0, os.path.join(_PROJECT_ROOT, "backtest_engine"))
+
+import synthetic_racing_data as synth               # noqa: E402
+import ingest_v32                                   # noqa: E402
+import walk_forward_engine_v32 as wfe               # noqa: E402
+
+# metric -> True if higher is better
+METRICS = {
+    'ingest_rows_per_sec':     True,
+    'ingest_seconds':          False,
+    'replay_races_per_sec':    True,
+    'replay_seconds':          False,
+    'backtest_season_seconds': False,
+}
+
+
+def _quiet(level=logging.WARNING):
+    """Silence the pipeline's INFO chatter during a timed section."""
+    root = logging.getLogger()
+    prev = root.level
+    root.setLevel(level)
+    return prev
+
+
+def bench_ingest(raw_dir: str, db_path: str) -> dict:
+    prev = _quiet()
+    try:
+        t = time.perf_counter()
+        counts = ingest_v32.run_ingest(raw_dir, db_path, checks=False,
+                                          full_rebuild=True)
+        secs = time.perf_counter() - t
+    finally:
+        logging.getLogger().setLevel(prev)
+    rows = sum(counts.values())
+    return {'ingest_seconds': secs, 'ingest_rows': rows,
+            'ingest_rows_per_sec': rows / secs if secs > 0 else 0.0,
+            'ingest_counts': counts,
+            'db_bytes': os.path.getsize(db_path)}
+
+
+def bench_replay(db_path: str, end_iso: str, cache_dir: str) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        builder = wfe.FeatureCacheBuilder(conn)
+        cache_path = os.path.join(cache_dir, f"feature_cache_through_{end_iso}.pkl")
+        prev = _quiet()
+        try:
+            t = time.perf_counter()
+            cache = builder.build(end_iso, cache_path, profile=True)
+            secs = time.perf_counter() - t
+        finally:
+            logging.getLogger().setLevel(prev)
+        prof = builder.fe.profiler.summary()
+    finally:
+        conn.close()
+    n = prof['n_races']
+    return {'replay_seconds': secs, 'replay_races': n,
+            'replay_races_per_sec': n / secs if secs > 0 else 0.0,
+            'replay_rows': len(cache),
+            'replay_stages': {k: v['seconds'] for k, v in prof['stages'].items()}}
+
+
+def bench_backtest(db_path: str, end_iso: str, cache_dir: str, season: str) -> dict:
+    prev = _quiet()
+    try:
+        eng = wfe.WalkForwardEngine(db_path=db_path, end_iso=end_iso,
+                                    cache_dir=cache_dir)
+        t = time.perf_counter()
+        res = eng.run_season(season)
+        secs = time.perf_counter() - t
+        eng.conn.close()
+    finally:
+        logging.getLogger().setLevel(prev)
+    s = res.summarize()
+    return {'backtest_season': season, 'backtest_season_seconds': secs,
+            'backtest_races': s['n_races'], 'backtest_bets': s['n_bets']}
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Return [(metric, baseline, current, change)] for regressions."""
+    bad = []
+    for m, higher_better in METRICS.items():
+        if m not in current or m not in baseline or not baseline[m]:
+            continue
+        change = (current[m] - baseline[m]) / baseline[m]
+        worse = -change if higher_better else change
+        if worse > tolerance:
+            bad.append((m, baseline[m], current[m], change))
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the v32 pipeline on synthetic data")
+    ap.add_argument('--seasons', type=int, default=3,
+                    help="synthetic seasons (>= 2: the last one is backtested)")
+    ap.add_argument('--start-year', type=int, default=2016)
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--workdir', default=None,
+                    help="where CSVs/DB/cache go (default: a temp dir, removed after)")
+    ap.add_argument('--out', default=None, help="write results JSON here")
+    ap.add_argument('--baseline', default=None, help="earlier results JSON to compare to")
+    ap.add_argument('--tolerance', type=float, default=0.25,
+                    help="allowed fractional slowdown before a metric counts as a regression")
+    ap.add_argument('--skip', nargs='*', default=[], choices=['replay', 'backtest'])
+    args = ap.parse_args()
+    if args.seasons < 2 and 'backtest' not in args.skip:
+        ap.error("--seasons must be >= 2 to backtest (one season of training data)")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="v32_bench_")
+    raw_dir = os.path.join(workdir, "raw_csvs")
+    cache_dir = os.path.join(workdir, "feature_cache")
+    db_path = os.path.join(workdir, "hk_racing.db")
+    # a reused --workdir: drop the previous run's meetings and feature cache
+    # so only this run's seasons are ingested and replayed
+    for d in (raw_dir, cache_dir):
+        shutil.rmtree(d, ignore_errors=True)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    last_season = f"{args.start_year + args.seasons - 1}/{args.start_year + args.seasons}"
+    end_iso = wfe.season_bounds(last_season)[1]
+
+    results = {'timestamp': datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(), 'machine': platform.machine(),
+               'seasons': args.seasons, 'start_year': args.start_year,
+               'seed': args.seed}
+    try:
+        log.info(f"Generating {args.seasons} synthetic seasons into {raw_dir}")
+        t = time.perf_counter()
+        results['synthetic'] = synth.generate(raw_dir, args.seasons,
+                                              args.start_year, args.seed)
+        results['generate_seconds'] = time.perf_counter() - t
+
+        log.info("Benchmark: ingest")
+        results.update(bench_ingest(raw_dir, db_path))
+        log.info(f"  {results['ingest_rows']:,} rows in {results['ingest_seconds']:.2f}s "
+                 f"-> {results['ingest_rows_per_sec']:,.0f} rows/s")
+
+        if 'replay' not in args.skip:
+            log.info("Benchmark: feature replay")
+            results.update(bench_replay(db_path, end_iso, cache_dir))
+            log.info(f"  {results['replay_races']:,} races in {results['replay_seconds']:.2f}s "
+                     f"-> {results['replay_races_per_sec']:.1f} races/s")
+
+        if 'backtest' not in args.skip:
+            log.info(f"Benchmark: season backtest ({last_season})")
+            results.update(bench_backtest(db_path, end_iso, cache_dir, last_season))
+            log.info(f"  {results['backtest_races']:,} races, {results['backtest_bets']} bets "
+                     f"in {results['backtest_season_seconds']:.2f}s")
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        log.info(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        bad = compare(results, base, args.tolerance)
+        for m, b, c, ch in bad:
+            log.error(f"REGRESSION {m}: {b:,.2f} -> {c:,.2f} ({ch*100:+.1f}%)")
+        if bad:
+            sys.exit(1)
+        log.info(f"No regressions beyond {args.tolerance*100:.0f}% vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""
+Synthetic HKJC Racing Data Generator
+=====================================
+Produces scraper-format raw CSVs (races/dividends/metadata/incidents{N}.csv)
+for a configurable number of seasons, so ingest_v32 -> StatefulFeatureEngine
+-> WalkForwardEngine can be exercised and timed without the real scrape.
+
+Files are byte-compatible with race_data_scraper_v3_2 output:
+  races{N}.csv      positional, integer header row (pandas index row)
+  dividends{N}.csv  date, race_no, race_name, pool, combo, dividend, is_refund
+  metadata{N}.csv   date, race_no, race_name, going, course, distance,
+                    race_class, prize, url
+  incidents{N}.csv  date, race_no, race_name, placing, horse_no, horse_name,
+                    horse_id, incident_text
+
+Shape of the data (per season, Sep -> mid-Jul):
+  ~88 meetings (Wed Happy Valley x 9 races, Sat/Sun Sha Tin x 10 races),
+  12-14 runners (HV max 12), latent-ability finishing orders, public odds
+  with ~17.5% overround, margin strings ('SH', 'N', '1-1/4' ...), running
+  positions with one call per section, WIN..QUARTET dividends priced off
+  the public book, occasional Triple Trio compound rows and non-finishers.
+
+Not a model of reality — a model of the DATA SHAPE. Feature values it
+produces are plausible, not predictive.
+
+Usage (from project root):
+    python3 benchmarks/synthetic_racing_data.py --out /tmp/synth_csvs --seasons 3
+"""
+
+import os
+import glob
+import argparse
+import logging
+import itertools
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+RESULTS_URL = ("https://racing.hkjc.com/racing/information/English/racing/"
+               "LocalResults.aspx?RaceDate={d}&Racecourse={v}&RaceNo={n}")
+
+GOINGS   = ["GOOD", "GOOD", "GOOD", "GOOD TO FIRM", "GOOD TO YIELDING",
+            "YIELDING", "WET FAST"]
+ST_TURF  = ['TURF - "A" Course', 'TURF - "A+3" Course', 'TURF - "B" Course',
+            'TURF - "B+2" Course', 'TURF - "C" Course', 'TURF - "C+3" Course']
+ST_AWT   = ["ALL WEATHER TRACK"]
+HV_TURF  = ['TURF - "A" Course', 'TURF - "B" Course', 'TURF - "C" Course',
+            'TURF - "C+3" Course']
+ST_DISTS = [1000, 1200, 1200, 1400, 1600, 1600, 1800, 2000, 2400]
+AWT_DISTS = [1200, 1650, 1800]
+HV_DISTS = [1000, 1200, 1200, 1650, 1650, 1800, 2200]
+CLASSES  = ["Class 5", "Class 4", "Class 4", "Class 3", "Class 3",
+            "Class 2", "Class 1", "Group 3"]
+PRIZES   = {"Class 5": 875000, "Class 4": 1170000, "Class 3": 1650000,
+            "Class 2": 2500000, "Class 1": 3450000, "Group 3": 4000000}
+
+# seconds per metre at racing pace, plus small going penalty
+SEC_PER_M = 0.0579
+RAKE = {"WIN": 0.175, "PLACE": 0.175, "QUINELLA": 0.175,
+        "QUINELLA PLACE": 0.175, "TIERCE": 0.25, "TRIO": 0.25,
+        "FIRST 4": 0.25, "QUARTET": 0.25}
+
+INCIDENTS = [
+    "Began awkwardly and lost ground.",
+    "Jumped only fairly.",
+    "Was slow to begin.",
+    "Shortly after the start was bumped by {other} and was unbalanced.",
+    "Near the 800 Metres was checked when awkwardly placed close to the heels of {other}.",
+    "Raced wide without cover throughout.",
+    "In the straight was held up for clear running until passing the 150 Metres.",
+    "Was crowded for room near the 1000 Metres.",
+    "Over the concluding stages was blocked for a run.",
+    "Lay in under pressure in the straight.",
+    "Raced keenly in the early and middle stages.",
+    "Was found to have bled from both nostrils.",
+    "Was found to be lame in the left front leg the day following the race.",
+    "Was found to have a cardiac arrhythmia.",
+    "Passed a veterinary inspection and was cleared to race.",
+    "Had its gear checked at the start and was passed fit to race.",
+]
+
+SYLLABLES = ["GOLD", "STAR", "FLYING", "LUCKY", "HAPPY", "DRAGON", "JADE",
+             "SPEED", "FORTUNE", "WIN", "POWER", "KING", "SUPER", "GLORY",
+             "SMART", "BEAUTY", "VICTORY", "SPARK", "SUN", "MASTER", "STORM",
+             "FIRE", "SPIRIT", "CHAMPION", "TEAM", "BRAVE", "MIGHTY", "ROCKET"]
+JOCKEY_NAMES = ["Z Purton", "J McDonald", "H Bowman", "K Teetan", "A Badel",
+                "L Ferraris", "B Avdulla", "A Hamelin", "M L Yeung", "C Y Ho",
+                "H T Mo", "M Chadwick", "K C Leung", "A Atzeni", "L Hewitson",
+                "E C W Wong", "Y L Chung", "J Orman", "R Kingscote", "H Bentley",
+                "B Thompson", "C L Chau", "K De Melo", "M F Poon", "A Pouchin"]
+TRAINER_NAMES = ["J Size", "F C Lor", "C Fownes", "P F Yiu", "A S Cruz",
+                 "D J Hall", "K W Lui", "C S Shum", "D Eustace", "P C Ng",
+                 "W Y So", "K L Man", "T P Yung", "C H Yip", "M Newnham",
+                 "Y S Tsui", "D A Hayes", "J Richards", "K H Ting", "A T Millard",
+                 "C W Chang", "B K Ng"]
+
+
+# ---------------------------------------------------------------------
+# Calendar
+# ---------------------------------------------------------------------
+def meeting_calendar(start_year: int, seasons: int):
+    """[(date, venue)] — Wed HV nights, Sun ST (Sat on alternate weeks),
+    Sep -> mid-Jul per season, with the summer break in between."""
+    out = []
+    for y in range(start_year, start_year + seasons):
+        d = date(y, 9, 1)
+        end = date(y + 1, 7, 15)
+        week = 0
+        while d <= end:
+            wd = d.weekday()
+            if wd == 6:
+                week += 1
+            if wd == 2:
+                out.append((d, "HV"))
+            elif (wd == 6 and week % 2 == 0) or (wd == 5 and week % 2 == 1):
+                out.append((d, "ST"))
+            d += timedelta(days=1)
+    return out
+
+
+def fmt_date(d: date) -> str:
+    return d.strftime("%d/%m/%Y")
+
+
+# ---------------------------------------------------------------------
+# Population
+# ---------------------------------------------------------------------
+class Population:
+    """Horses / jockeys / trainers with latent ability and a career window."""
+
+    def __init__(self, rng: np.random.Generator, calendar, horses_per_season=1400):
+        self.rng = rng
+        n_seasons = max(1, len({(d.year if d.month >= 9 else d.year - 1)
+                                for d, _ in calendar}))
+        n = horses_per_season + 600 * (n_seasons - 1)
+        first, last = calendar[0][0], calendar[-1][0]
+        span = (last - first).days or 1
+
+        self.jockeys  = JOCKEY_NAMES
+        self.j_skill  = rng.normal(0, 0.25, len(JOCKEY_NAMES))
+        self.trainers = TRAINER_NAMES
+        self.t_skill  = rng.normal(0, 0.2, len(TRAINER_NAMES))
+
+        letters = "ABCDEGHJKLNPRSTV"
+        codes, names = set(), set()
+        self.codes, self.names = [], []
+        while len(self.codes) < n:
+            c = f"{rng.choice(list(letters))}{rng.integers(1, 999):03d}"
+            nm = " ".join(rng.choice(SYLLABLES, 2, replace=False))
+            if rng.random() < 0.3:
+                nm += " " + rng.choice(SYLLABLES)
+            if c in codes or nm in names:
+                continue
+            codes.add(c); names.add(nm)
+            self.codes.append(c); self.names.append(nm)
+
+        self.ability = rng.normal(0, 1, n)
+        self.early_speed = rng.normal(0, 1, n)
+        self.body_wt = rng.integers(980, 1230, n).astype(float)
+        self.trainer = rng.integers(0, len(TRAINER_NAMES), n)
+        start = rng.integers(-400, span, n)
+        self.debut = np.array([first + timedelta(days=int(s)) for s in start])
+        self.retire = np.array([d + timedelta(days=int(rng.integers(300, 1500)))
+                                for d in self.debut])
+
+    def active(self, d: date) -> np.ndarray:
+        return np.flatnonzero((self.debut <= d) & (self.retire >= d))
+
+
+# ---------------------------------------------------------------------
+# Formatting helpers (mirror HKJC result-page strings)
+# ---------------------------------------------------------------------
+def lbw_string(lengths: float) -> str:
+    if lengths < 0.08:
+        return "N"
+    if lengths < 0.15:
+        return "SH"
+    if lengths < 0.3:
+        return "HD"
+    q = round(lengths * 4) / 4
+    whole, frac = int(q), q - int(q)
+    frac_s = {0.25: "1/4", 0.5: "1/2", 0.75: "3/4"}.get(round(frac, 2), "")
+    if whole == 0:
+        return frac_s or "1/4"
+    return f"{whole}-{frac_s}" if frac_s else str(whole)
+
+
+def finish_time_string(sec: float) -> str:
+    m, s = divmod(sec, 60.0)
+    return f"{int(m)}:{s:05.2f}"
+
+
+def n_calls(distance: int) -> int:
+    if distance <= 1200:
+        return 3
+    if distance <= 1650:
+        return 4
+    if distance <= 2000:
+        return 5
+    return 6
+
+
+def odds_string(p: float, rake: float = 0.175) -> float:
+    o = (1.0 - rake) / max(p, 1e-4)
+    o = min(max(o, 1.1), 99.0)
+    return round(o, 1) if o < 10 else float(round(o))
+
+
+def harville(p: np.ndarray, order) -> float:
+    prob, rem = 1.0, 1.0
+    for i in order:
+        if rem <= 0:
+            return 0.0
+        prob *= p[i] / rem
+        rem -= p[i]
+    return prob
+
+
+def combo_str(nos) -> str:
+    return ",".join(str(int(x)) for x in nos)
+
+
+# ---------------------------------------------------------------------
+# One race
+# ---------------------------------------------------------------------
+def simulate_race(rng, pop: Population, runners: np.ndarray, distance: int,
+                  going: str, incident_rate: float):
+    """Returns (result_rows, dividend_rows, incident_rows) sans race header."""
+    n = len(runners)
+    jockey = rng.choice(len(pop.jockeys), n, replace=False)
+    draw = rng.permutation(n) + 1
+    horse_no = np.arange(1, n + 1)
+    act_wt = rng.integers(113, 136, n)
+    horse_wt = (pop.body_wt[runners] + rng.normal(0, 8, n)).round().astype(int)
+
+    strength = (pop.ability[runners] + pop.j_skill[jockey]
+                + pop.t_skill[pop.trainer[runners]] - 0.02 * (draw - 1))
+    perf = strength + rng.gumbel(0, 0.9, n)
+    order = np.argsort(-perf)                     # index into field, 1st first
+    fin = np.empty(n, dtype=int)
+    fin[order] = np.arange(1, n + 1)
+
+    # public book: noisy view of strength, normalised to 1
+    pub = np.exp(1.1 * (strength + rng.normal(0, 0.35, n)))
+    pub /= pub.sum()
+    win_odds = np.array([odds_string(p) for p in pub])
+
+    # margins: cumulative lengths behind the winner
+    gaps = rng.exponential(0.9, n)
+    gaps[order[0]] = 0.0
+    cum = np.zeros(n)
+    run = 0.0
+    for i in order[1:]:
+        run += gaps[i]
+        cum[i] = run
+    lbw = ["---" if fin[i] == 1 else lbw_string(cum[i]) for i in range(n)]
+    # dead heat for 2nd now and then
+    if n > 3 and rng.random() < 0.01:
+        i2, i3 = order[1], order[2]
+        fin[i3] = fin[i2]
+        lbw[i3] = "DH"
+
+    base = distance * SEC_PER_M + (0.6 if "YIELD" in going or "SOFT" in going else 0.0)
+    base += rng.normal(0, 0.4)
+    ftime = [finish_time_string(base + 0.16 * cum[i]) for i in range(n)]
+
+    # running positions: early order from early speed, drifting to finish
+    calls = n_calls(distance)
+    early = pop.early_speed[runners] + rng.normal(0, 0.6, n)
+    early_rank = np.empty(n, dtype=int)
+    early_rank[np.argsort(-early)] = np.arange(1, n + 1)
+    rp = []
+    for k in range(calls - 1):
+        w = k / max(calls - 1, 1)
+        score = (1 - w) * early_rank + w * fin + rng.normal(0, 0.8, n)
+        r = np.empty(n, dtype=int)
+        r[np.argsort(score)] = np.arange(1, n + 1)
+        rp.append(r)
+    rp.append(fin.copy())
+    running_pos = [" ".join(str(rp[k][i]) for k in range(calls)) for i in range(n)]
+
+    results = []
+    for i in np.argsort(fin, kind="stable"):
+        h = runners[i]
+        results.append([
+            str(fin[i]), str(horse_no[i]), f"{pop.names[h]} ({pop.codes[h]})",
+            pop.jockeys[jockey[i]], pop.trainers[pop.trainer[h]],
+            str(act_wt[i]), str(horse_wt[i]), str(draw[i]), lbw[i],
+            running_pos[i], ftime[i], f"{win_odds[i]:g}",
+        ])
+    # the odd withdrawal / pulled-up: placing text, no times
+    if rng.random() < 0.04:
+        h = runners[rng.integers(0, n)]
+        results.append([
+            rng.choice(["WV", "PU", "WV-A"]), str(n + 1),
+            f"{pop.names[h]} ({pop.codes[h]})", pop.jockeys[jockey[0]],
+            pop.trainers[pop.trainer[h]], "126", "1100", "---", "---", "",
+            "---", "---",
+        ])
+
+    # dividends (per $10), priced off the public book
+    no = horse_no[order]
+    po = order
+    divs = []
+
+    def price(pool, prob):
+        d = 10.0 * (1.0 - RAKE[pool]) / max(prob, 1e-6)
+        return round(max(d, 10.5) * rng.uniform(0.9, 1.1), 1)
+
+    divs.append(("WIN", combo_str([no[0]]), price("WIN", pub[po[0]])))
+    for k in range(min(3, n)):
+        p_place = min(0.95, 3.0 * pub[po[k]])
+        divs.append(("PLACE", combo_str([no[k]]), price("PLACE", p_place)))
+    q = harville(pub, po[:2]) + harville(pub, po[1::-1])
+    divs.append(("QUINELLA", combo_str(sorted(no[:2])), price("QUINELLA", q)))
+    for a, b in itertools.combinations(range(3), 2):
+        qp = 3 * (harville(pub, [po[a], po[b]]) + harville(pub, [po[b], po[a]]))
+        divs.append(("QUINELLA PLACE", combo_str(sorted([no[a], no[b]])),
+                     price("QUINELLA PLACE", qp)))
+    divs.append(("TIERCE", combo_str(no[:3]), price("TIERCE", harville(pub, po[:3]))))
+    trio = sum(harville(pub, perm) for perm in itertools.permutations(po[:3]))
+    divs.append(("TRIO", combo_str(sorted(no[:3])), price("TRIO", trio)))
+    if n >= 4:
+        f4 = sum(harville(pub, perm) for perm in itertools.permutations(po[:4]))
+        divs.append(("FIRST 4", combo_str(sorted(no[:4])), price("FIRST 4", f4)))
+        divs.append(("QUARTET", combo_str(no[:4]), price("QUARTET", harville(pub, po[:4]))))
+
+    incs = []
+    for i in range(n):
+        if rng.random() >= incident_rate:
+            continue
+        h = runners[i]
+        other = runners[(i + 1) % n]
+        k = rng.integers(1, 3)
+        text = " ".join(t.format(other=f"{pop.names[other]}")
+                        for t in rng.choice(INCIDENTS, k, replace=False))
+        incs.append({
+            "placing": str(fin[i]), "horse_no": str(horse_no[i]),
+            "horse_name": pop.names[h], "horse_id": pop.codes[h],
+            "incident_text": text,
+        })
+    return results, divs, incs
+
+
+# ---------------------------------------------------------------------
+# Meetings -> CSV files
+# ---------------------------------------------------------------------
+def generate(out_dir: str, seasons: int = 3, start_year: int = 2016,
+             seed: int = 42, incident_rate: float = 0.25) -> dict:
+    """Write scraper-format CSVs into out_dir (which must hold none yet:
+    ingest reads every meeting file there). Returns summary counts."""
+    if any(glob.glob(os.path.join(out_dir, f"{kind}*.csv"))
+           for kind in ("races", "dividends", "metadata", "incidents")):
+        raise ValueError(f"{out_dir} already holds meeting CSVs; generate into an empty directory")
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    cal = meeting_calendar(start_year, seasons)
+    pop = Population(rng, cal)
+    race_seq = 0
+    n_rows = n_div = n_inc = 0
+
+    for meeting_no, (d, venue) in enumerate(cal, start=1):
+        ds = fmt_date(d)
+        n_races = 9 if venue == "HV" else 10
+        max_field = 12 if venue == "HV" else 14
+        active = pop.active(d)
+        used = set()
+        race_rows, div_rows, meta_rows, inc_rows = [], [], [], []
+        going = rng.choice(GOINGS)
+
+        for rn in range(1, n_races + 1):
+            race_seq += 1
+            race_name = f"RACE {rn} ({race_seq})"
+            if venue == "HV":
+                course, dist = rng.choice(HV_TURF), int(rng.choice(HV_DISTS))
+            elif rng.random() < 0.12:
+                course, dist = ST_AWT[0], int(rng.choice(AWT_DISTS))
+            else:
+                course, dist = rng.choice(ST_TURF), int(rng.choice(ST_DISTS))
+            cls = rng.choice(CLASSES)
+            race_going = "GOOD" if course == ST_AWT[0] else going
+
+            pool = np.array([h for h in active if h not in used])
+            field = int(rng.integers(12, max_field + 1))
+            if len(pool) < field:
+                pool = active
+            runners = rng.choice(pool, min(field, len(pool)), replace=False)
+            used.update(runners.tolist())
+
+            res, divs, incs = simulate_race(rng, pop, runners, dist, race_going,
+                                            incident_rate)
+            for r in res:
+                race_rows.append([race_name, race_going, course] + r)
+
+            # the last race of the day carries the Triple Trio leg string
+            if rn == n_races:
+                legs = "/".join(
+                    combo_str(sorted(rng.choice(np.arange(1, 13), 3, replace=False)))
+                    for _ in range(3))
+                divs = divs + [("TRIO", legs, round(rng.uniform(2e3, 5e6), 1))]
+            for pool_name, combo, div in divs:
+                div_rows.append({"date": ds, "race_no": str(rn),
+                                 "race_name": race_name, "pool": pool_name,
+                                 "combo": combo, "dividend": div, "is_refund": 0})
+            meta_rows.append({
+                "date": ds, "race_no": str(rn), "race_name": race_name,
+                "going": race_going, "course": course, "distance": str(dist),
+                "race_class": cls, "prize": str(PRIZES[cls]),
+                "url": RESULTS_URL.format(d=d.strftime("%Y/%m/%d"), v=venue, n=rn),
+            })
+            for inc in incs:
+                inc_rows.append({"date": ds, "race_no": str(rn),
+                                 "race_name": race_name, **inc})
+
+        pd.DataFrame(race_rows).to_csv(
+            os.path.join(out_dir, f"races{meeting_no}.csv"), index=False)
+        pd.DataFrame(div_rows).to_csv(
+            os.path.join(out_dir, f"dividends{meeting_no}.csv"), index=False)
+        pd.DataFrame(meta_rows).to_csv(
+            os.path.join(out_dir, f"metadata{meeting_no}.csv"), index=False)
+        if inc_rows:
+            pd.DataFrame(inc_rows).to_csv(
+                os.path.join(out_dir, f"incidents{meeting_no}.csv"), index=False)
+        n_rows += len(race_rows)
+        n_div += len(div_rows)
+        n_inc += len(inc_rows)
+
+    summary = {"meetings": len(cal), "races": race_seq, "race_rows": n_rows,
+               "dividend_rows": n_div, "incident_rows": n_inc,
+               "first_date": cal[0][0].isoformat(), "last_date": cal[-1][0].isoformat()}
+    log.info(f"Synthetic data: {summary}")
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic HKJC raw CSVs")
+    ap.add_argument("--out", required=True, help="output directory for the CSVs")
+    ap.add_argument("--seasons", type=int, default=3)
+    ap.add_argument("--start-year", type=int, default=2016)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--incident-rate", type=float, default=0.25,
+                    help="share of runners with a stewards' incident line")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    generate(args.out, args.seasons, args.start_year, args.seed, args.incident_rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 import glob
 import re, os
 import logging
@@ -7,6 +6,8 @@ import math
 import sqlite3
 import networkx as nx
 
+from race_parsers import parse_lbw, parse_running_pos, pace_from_positions
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -16,23 +17,15 @@ class MarginAdjustedEloEngine:
         self.initial_elo = initial_elo
 
     def _parse_lbw(self, lbw_str):
-        if pd.isna(lbw_str) or str(lbw_str).strip() in ['---', '-', '']: return 0.0
-        s = str(lbw_str).strip().upper()
-        if s in ['N', 'NOSE']: return 0.05
-        if s in ['SH', 'SHD', 'SN']: return 0.1
-        if s in ['HD']: return 0.2
-        if s in ['DH']: return 0.0
-        try:
-            if '-' in s:
-                parts = s.split('-')
-                return float(parts[0]) + (float(parts[1].split('/')[0]) / float(parts[1].split('/')[1]))
-            elif '/' in s: return float(s.split('/')[0]) / float(s.split('/')[1])
-            else: return float(s)
-        except Exception: return 0.0
+        return parse_lbw(lbw_str)
 
     def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
         logging.info("Phase 27: Engineering Margin-Adjusted Pairwise Elo...")
-        df['parsed_lbw'] = df['lbw'].apply(self._parse_lbw)
+        # DB frames carry lbw_lengths (parsed at ingest); raw CSVs need parsing
+        if 'lbw_lengths' in df.columns:
+            df['parsed_lbw'] = df['lbw_lengths']
+        else:
+            df['parsed_lbw'] = df['lbw'].apply(self._parse_lbw)
         df['plc'] = pd.to_numeric(df['plc'], errors='coerce').fillna(99.0)
 
         df['date'] = pd.to_datetime(df['date'], dayfirst=True, errors='coerce')
@@ -81,15 +74,18 @@ class SectionalPaceEngineer:
         self.rolling_window = rolling_window
 
     def _parse_running_pos(self, pos_string):
-        if pd.isna(pos_string) or pos_string == '---': return []
-        return [int(x) for x in str(pos_string).split() if x.isdigit()]
+        return parse_running_pos(pos_string)
 
     def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
         logging.info("Phase 8: Engineering Sectional Pace Momentum...")
-        parsed_pos = df['running_pos'].apply(self._parse_running_pos)
-        
-        df['raw_ESI'] = parsed_pos.apply(lambda x: 1.0 / np.sqrt(x[0]) if len(x) > 0 and x[0] > 0 else np.nan)
-        df['raw_CSI'] = parsed_pos.apply(lambda x: (x[-2] - x[-1]) if len(x) >= 2 else 0)
+        # DB frames carry esi_raw / csi_raw (parsed at ingest); raw CSVs need parsing
+        if {'esi_raw', 'csi_raw'} <= set(df.columns):
+            df['raw_ESI'] = df['esi_raw'].astype(float)
+            df['raw_CSI'] = df['csi_raw']
+        else:
+            pace = df['running_pos'].apply(self._parse_running_pos).apply(pace_from_positions)
+            df['raw_ESI'] = pace.str[0].astype(float)
+            df['raw_CSI'] = pace.str[1]
         
         df['date'] = pd.to_datetime(df['date'], dayfirst=True, errors='coerce')
         df = df.sort_values(by=['horse_id', 'date']).reset_index(drop=True)
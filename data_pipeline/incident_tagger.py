@@ -0,0 +1,80 @@
+"""
+Stewards' incident tagger — free text -> boolean trouble flags
+==============================================================
+incidents{N}.csv carries the stewards' report for each runner as prose
+('Near the 800 Metres was checked when awkwardly placed...'). ingest_v32
+tags every row ONCE with the flags below and stores them as 0/1 columns
+of race_incidents, so feature building reads integers instead of running
+regexes over text at replay time. The text itself stays searchable via
+the race_incidents_fts full-text index.
+
+Tagging is batch and column-wise: the text Series is lower-cased, known
+non-incident phrases ('gear checked', 'not lame', 'no abnormality') are
+blanked out, then each flag is one str.contains over the whole column.
+
+Changing a pattern changes stored flags only after
+    python3 data_pipeline/ingest_v32.py --retag-incidents
+"""
+
+import re
+
+import pandas as pd
+
+# Phrases that contain a flag word without describing that trouble.
+_NEUTRAL = (r"(?:gear|saddle|bridle|tongue[- ]tie|plates?|shoes?)\s+(?:was\s+|were\s+)?checked"
+            r"|checked\s+(?:by|for)\s+(?:the\s+)?vet\w*"
+            r"|(?:was\s+)?not\s+lame|no\s+(?:abnormalit|irregularit)\w*(?:\s+detected)?")
+
+# flag -> pattern (matched against the lower-cased, neutralized text).
+# Column order of race_incidents follows this dict.
+INCIDENT_FLAGS = {
+    'slow_start':     r"slow(?:ly)?\s+(?:to\s+begin|away)|began\s+(?:awkwardly|slowly)"
+                      r"|jumped\s+(?:only\s+)?fairly|blundered|\bdwelt\b|missed\s+the\s+(?:start|kick)"
+                      r"|lost\s+ground\s+(?:at|after)\s+the\s+start|\breared\b",
+    'checked':        r"\bchecked\b|\bsteadied\b|snatched\s+up",
+    'blocked':        r"held\s+up|\bblocked\b|no\s+clear\s+run"
+                      r"|(?:unable\s+to|could\s+not)\s+(?:obtain|get)\s+(?:clear\s+)?(?:running|a\s+run)"
+                      r"|(?:denied|lacked|short\s+of)\s+(?:clear\s+)?room",
+    'hampered':       r"\bbump(?:ed|ing)\b|crowded|squeezed|hampered|interfered|tightened"
+                      r"|carried\s+(?:in|out|wide)|awkwardly\s+placed|buffeted|inconvenienced",
+    'wide':           r"\bwide\b|without\s+cover",
+    'keen':           r"raced\s+keenly|pulled\s+hard|over-?rac|raced\s+(?:too\s+)?freely"
+                      r"|refused\s+to\s+settle|fought\s+(?:for\s+)?(?:its|his|her)\s+head",
+    'lay_in_out':     r"\b(?:lay|laid|lugged|hung|shifted|ducked)\s+(?:in|out)(?:wards)?\b",
+    'bled':           r"\bbled\b|bleeding|epistaxis|blood\s+in\s+(?:the\s+)?trachea",
+    'lame':           r"\blame(?:ness)?\b",
+    'heart':          r"cardiac|arrhythmia|irregular\s+heart|atrial\s+fibrillation",
+    'respiratory':    r"\broar(?:ed|ing)?\b|respiratory|abnormal\s+(?:breathing|noise)|\bchoked\b"
+                      r"|soft\s+palate|\bmucus\b",
+    'vet_exam':       r"veterinar|\bvet\b|\bsampled\b|examined|examination",
+    'eased':          r"\beased\b|not\s+persevered\s+with|not\s+ridden\s+out",
+    'did_not_finish': r"pulled\s+up|failed\s+to\s+finish|did\s+not\s+finish|\bfell\b"
+                      r"|dislodged|unseated|lost\s+(?:its|his|her|the)\s+rider",
+    'gear':           r"(?:saddle|bit|bridle|blinkers?|visor|hood|tongue[- ]tie)\s+"
+                      r"(?:\w+\s+){0,2}(?:slipped|broke|broken|displaced|came\s+(?:off|loose|adrift))"
+                      r"|(?:lost|spread|twisted|displaced)\s+(?:a|its|one|both)\s+"
+                      r"(?:(?:near|off|front|fore|hind)\s+)*(?:plates?|shoes?)",
+    'unacceptable':   r"unacceptable|disappointing|poor\s+performance"
+                      r"|no\s+(?:apparent\s+)?(?:explanation|reason)\s+for",
+}
+INCIDENT_FLAG_COLS = list(INCIDENT_FLAGS)
+
+_NEUTRAL_RE = re.compile(_NEUTRAL)
+_FLAG_RES = {flag: re.compile(p) for flag, p in INCIDENT_FLAGS.items()}
+
+
+def _normalize(text: pd.Series) -> pd.Series:
+    return (text.fillna('').astype(str).str.lower()
+            .str.replace(_NEUTRAL_RE, ' ', regex=True))
+
+
+def tag_incidents(text: pd.Series) -> pd.DataFrame:
+    """One int8 0/1 column per INCIDENT_FLAGS entry, aligned to text's index."""
+    norm = _normalize(text)
+    return pd.DataFrame({flag: norm.str.contains(rx, regex=True).astype('int8')
+                         for flag, rx in _FLAG_RES.items()}, index=text.index)
+
+
+def tag_text(text: str) -> dict:
+    """Scalar convenience for one report: {flag: 0/1}."""
+    return tag_incidents(pd.Series([text])).iloc[0].to_dict()
@@ -1,23 +1,65 @@
 """
 HKJC v32 Database Ingest Pipeline
 ==================================
-Phase 55.2 — Loads scraped CSV trio (races/dividends/metadata) into a clean
-SQLite database with three primary tables, proper indexes, and ISO date keys.
-
-Strategy: drop-and-recreate every run. Raw CSVs are the source of truth.
+Phase 55.2 — Loads scraped meeting CSVs (races/dividends/metadata/incidents)
+into a clean SQLite database with four primary tables, proper indexes, and
+ISO date keys.
+
+Strategy: raw CSVs are the source of truth. Runs are incremental by default:
+ingest_manifest records every source file's sha256, and only meetings with
+new or changed files are re-read and upserted (INSERT OR REPLACE, one
+transaction, is_bettable recomputed for the affected dates). Re-running
+with nothing new is a no-op. Drop-and-recreate is still available:
+    python3 data_pipeline/ingest_v32.py --full-rebuild
+
+Writing: rows are streamed through prepared INSERT statements
+(executemany, one transaction) with build-time pragmas — journal_mode=OFF
+for a full rebuild, WAL for incremental upserts, synchronous=OFF and a
+256 MB page cache — restored to DELETE/FULL afterwards. Per-table insert
+timings are logged.
+
+Loading: each meeting's file set is read ONCE by a worker pool
+(load_all_csvs_parallel); the races-file -> date map is built from the
+already-loaded metadata instead of re-reading every metadata{N}.csv.
+The serial loader (load_all_csvs) is kept for comparison:
+    python3 data_pipeline/ingest_v32.py --compare-loaders
+
+Cleaning: type coercions (dates, ints, floats, venue, horse_id) are
+column-wise pandas ops. The original row-wise .apply() versions are kept
+behind vectorized=False; equivalence is checked on the real CSVs with:
+    python3 data_pipeline/ingest_v32.py --verify-vectorized
 
 Inputs:
   data/raw_csvs/races{N}.csv      (positional columns, no header row)
   data/raw_csvs/dividends{N}.csv  (headed, may be empty for Conghua meetings)
   data/raw_csvs/metadata{N}.csv   (headed)
+  data/raw_csvs/incidents{N}.csv  (headed, stewards' reports; v3.2 scrapes only)
 
 Output:
   data/hk_racing.db
 
-Tables produced:
-  race_results       — one row per (race, horse), only finishing entries
+Tables produced (schema v5 — SCHEMA_VERSION, stored as PRAGMA user_version):
+  races              — race dimension, one row per race; integer race_key
+                       (YYYYMMDD*100 + race_no) plus the canonical race_id
+  runners            — one row per (race_key, horse), only finishing entries;
+                       lbw_lengths / finish_time_sec / running_pos (fixed-width
+                       byte blob) and the pace inputs esi_raw / csi_raw /
+                       early_pos, all parsed once here via race_parsers
   exotic_dividends   — one row per (race, pool, combo)
-  race_metadata      — one row per race
+  race_incidents     — one stewards' report per (race_id, horse_id): the
+                       text plus 0/1 trouble flags (checked, blocked, bled,
+                       lame, ...) tagged once here by incident_tagger
+  race_incidents_fts — FTS5 index over race_incidents.incident_text
+  ingest_manifest    — one row per ingested source CSV (name, sha256)
+
+Compatibility views (the v1 table shapes, for existing queries):
+  race_results       — runners JOIN races, running_pos / finish_time as text
+  race_metadata      — races that came from metadata CSVs
+
+Incidents: each report's text is tagged once (incident_tagger) into 0/1
+flag columns; the text is searchable through the FTS5 index:
+    python3 data_pipeline/ingest_v32.py --search-incidents 'bled'
+    python3 data_pipeline/ingest_v32.py --retag-incidents   # after a pattern change
 
 Protocol decisions enforced (see project log Phase 55.1):
   D1. Overseas simulcasts filtered (not present in scraped CSVs anyway)
@@ -33,8 +75,14 @@ import os
 import re
 import sys
 import glob
+import json
+import time
+import hashlib
 import logging
+import argparse
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Optional
 from urllib.parse import urlparse, parse_qs
@@ -42,6 +90,11 @@ from urllib.parse import urlparse, parse_qs
 import pandas as pd
 import numpy as np
 
+from race_parsers import (parse_lbw, parse_running_pos, parse_finish_time,
+                          pace_from_positions, pack_running_pos,
+                          running_pos_text_sql, finish_time_text_sql)
+from incident_tagger import INCIDENT_FLAG_COLS, tag_incidents
+
 # ---------------------------------------------------------------------
 # Path resolution — works from any cwd
 # ---------------------------------------------------------------------
@@ -52,13 +105,8 @@ DB_PATH       = os.path.join(_PROJECT_ROOT, "data", "hk_racing.db")
 LOG_PATH      = os.path.join(_PROJECT_ROOT, "data", "ingest_log.txt")
 
 # ---------------------------------------------------------------------
-# Logging
+# Logging (handlers are set up under __main__)
 # ---------------------------------------------------------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler(LOG_PATH), logging.StreamHandler()]
-)
 log = logging.getLogger(__name__)
 
 
@@ -81,22 +129,35 @@ RACE_COLS = [
     'win_odds',                              # col 14
 ]
 
+# Headed CSVs — only used to shape an empty frame when no file of that
+# kind is in the (incremental) load set.
+DIV_COLS  = ['date', 'race_no', 'race_name', 'pool', 'combo', 'dividend', 'is_refund']
+META_COLS = ['date', 'race_no', 'race_name', 'going', 'course', 'distance',
+             'race_class', 'prize', 'url']
+INC_COLS  = ['date', 'race_no', 'race_name', 'placing', 'horse_no', 'horse_name',
+             'horse_id', 'incident_text']
+
+# Every per-meeting source file: {kind}{N}.csv
+_SOURCE_FILE_RE = r'(?:races|dividends|metadata|incidents)(\d+)\.csv$'
+
 
 # =====================================================================
 # PHASE 1 — LOAD CSVs
 # =====================================================================
-def load_all_csvs() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """Load and concatenate all races/dividends/metadata CSVs."""
+def load_all_csvs(raw_dir: str = RAW_CSV_DIR) -> tuple[pd.DataFrame, pd.DataFrame,
+                                                       pd.DataFrame, pd.DataFrame]:
+    """Load and concatenate all races/dividends/metadata/incidents CSVs."""
     log.info("=" * 70)
     log.info("PHASE 1: Loading CSVs")
     log.info("=" * 70)
 
-    race_files = sorted(glob.glob(os.path.join(RAW_CSV_DIR, "races*.csv")))
-    div_files  = sorted(glob.glob(os.path.join(RAW_CSV_DIR, "dividends*.csv")))
-    meta_files = sorted(glob.glob(os.path.join(RAW_CSV_DIR, "metadata*.csv")))
+    race_files = sorted(glob.glob(os.path.join(raw_dir, "races*.csv")))
+    div_files  = sorted(glob.glob(os.path.join(raw_dir, "dividends*.csv")))
+    meta_files = sorted(glob.glob(os.path.join(raw_dir, "metadata*.csv")))
+    inc_files  = sorted(glob.glob(os.path.join(raw_dir, "incidents*.csv")))
 
     log.info(f"Found {len(race_files)} race files, {len(div_files)} dividend "
-             f"files, {len(meta_files)} metadata files")
+             f"files, {len(meta_files)} metadata files, {len(inc_files)} incident files")
 
     # --- Races: no header, skip the integer-index row pandas wrote ---
     races_dfs = []
@@ -136,7 +197,179 @@ def load_all_csvs() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     meta = pd.concat(meta_dfs, ignore_index=True)
     log.info(f"  Loaded {len(meta):,} metadata rows")
 
-    return races, divs, meta
+    # --- Incidents: headed, only meetings scraped by v3.2 have them ---
+    inc_dfs = []
+    for f in inc_files:
+        try:
+            df = pd.read_csv(f, dtype=str, keep_default_na=False)
+            if len(df) > 0:
+                inc_dfs.append(df)
+        except pd.errors.EmptyDataError:
+            pass
+        except Exception as e:
+            log.warning(f"  Skipping {f}: {e}")
+    incs = _concat(inc_dfs, INC_COLS)
+    log.info(f"  Loaded {len(incs):,} incident rows")
+
+    return races, divs, meta, incs
+
+
+def _meeting_numbers(raw_dir: str) -> list[int]:
+    """Meeting numbers present in raw_dir, in the serial loader's order
+    (lexicographic by file name, so keep='last' dedup behaves the same)."""
+    nums = set()
+    for f in os.listdir(raw_dir):
+        m = re.match(_SOURCE_FILE_RE, f)
+        if m:
+            nums.add(int(m.group(1)))
+    return sorted(nums, key=lambda n: f"races{n}.csv")
+
+
+def read_meeting_files(raw_dir: str, n: int) -> dict:
+    """Read one meeting's races/dividends/metadata/incidents CSVs. Missing
+    or empty files come back as None; read errors are returned (not logged)
+    so the caller can log them from the parent process."""
+    out = {'n': n, 'races': None, 'divs': None, 'meta': None, 'incs': None,
+           'errors': []}
+
+    f = os.path.join(raw_dir, f"races{n}.csv")
+    if os.path.exists(f):
+        try:
+            df = pd.read_csv(f, header=None, skiprows=1, names=RACE_COLS,
+                             dtype=str, keep_default_na=False)
+            df['_source_file'] = os.path.basename(f)
+            out['races'] = df
+        except Exception as e:
+            out['errors'].append(f"Skipping {f}: {e}")
+
+    f = os.path.join(raw_dir, f"dividends{n}.csv")
+    if os.path.exists(f):
+        try:
+            df = pd.read_csv(f, dtype=str, keep_default_na=False)
+            if len(df) > 0:
+                out['divs'] = df
+        except pd.errors.EmptyDataError:
+            pass  # Conghua / no-dividend meetings — expected
+        except Exception as e:
+            out['errors'].append(f"Skipping {f}: {e}")
+
+    f = os.path.join(raw_dir, f"metadata{n}.csv")
+    if os.path.exists(f):
+        try:
+            out['meta'] = pd.read_csv(f, dtype=str, keep_default_na=False)
+        except Exception as e:
+            out['errors'].append(f"Skipping {f}: {e}")
+
+    f = os.path.join(raw_dir, f"incidents{n}.csv")
+    if os.path.exists(f):
+        try:
+            df = pd.read_csv(f, dtype=str, keep_default_na=False)
+            if len(df) > 0:
+                out['incs'] = df
+        except pd.errors.EmptyDataError:
+            pass
+        except Exception as e:
+            out['errors'].append(f"Skipping {f}: {e}")
+    return out
+
+
+def _read_meeting_job(job):
+    return read_meeting_files(*job)
+
+
+def load_all_csvs_parallel(raw_dir: str = RAW_CSV_DIR, workers: Optional[int] = None,
+                           use_processes: bool = True,
+                           meetings: Optional[list[int]] = None):
+    """Parallel equivalent of load_all_csvs. Each meeting's file set is read
+    once by a pool worker; frames are concatenated in the serial loader's
+    order so downstream dedup is unchanged. Pass meetings to read only
+    those meeting numbers (incremental ingest).
+
+    Returns (races, divs, meta, incs, src_to_date) where src_to_date maps
+    'races{N}.csv' -> the meeting's DD/MM/YYYY date, taken from the
+    already-loaded metadata (clean_race_results no longer re-reads it)."""
+    log.info("=" * 70)
+    log.info("PHASE 1: Loading CSVs (parallel)")
+    log.info("=" * 70)
+
+    nums = _meeting_numbers(raw_dir)
+    if meetings is not None:
+        wanted = set(meetings)
+        nums = [n for n in nums if n in wanted]
+    workers = workers or os.cpu_count() or 1
+    mode = ('in-process' if workers <= 1 else
+            f"with {workers} {'processes' if use_processes else 'threads'}")
+    log.info(f"Found {len(nums)} meetings; reading {mode}")
+
+    jobs = [(raw_dir, n) for n in nums]
+    if workers <= 1:
+        meetings = [read_meeting_files(*j) for j in jobs]
+    else:
+        pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with pool_cls(max_workers=workers) as ex:
+            meetings = list(ex.map(_read_meeting_job, jobs,
+                                   chunksize=max(1, len(jobs) // (workers * 8))))
+
+    races_dfs, divs_dfs, meta_dfs, inc_dfs = [], [], [], []
+    src_to_date = {}
+    for m in meetings:
+        for err in m['errors']:
+            log.warning(f"  {err}")
+        if m['races'] is not None:
+            races_dfs.append(m['races'])
+        if m['divs'] is not None:
+            divs_dfs.append(m['divs'])
+        if m['meta'] is not None:
+            meta_dfs.append(m['meta'])
+            if m['races'] is not None and len(m['meta']):
+                src_to_date[f"races{m['n']}.csv"] = m['meta']['date'].iloc[0]
+        if m['incs'] is not None:
+            inc_dfs.append(m['incs'])
+
+    races = _concat(races_dfs, RACE_COLS + ['_source_file'])
+    log.info(f"  Loaded {len(races):,} race-horse rows")
+    divs = _concat(divs_dfs, DIV_COLS)
+    log.info(f"  Loaded {len(divs):,} dividend rows")
+    meta = _concat(meta_dfs, META_COLS)
+    log.info(f"  Loaded {len(meta):,} metadata rows")
+    incs = _concat(inc_dfs, INC_COLS)
+    log.info(f"  Loaded {len(incs):,} incident rows")
+
+    return races, divs, meta, incs, src_to_date
+
+
+def _concat(dfs: list, columns: list) -> pd.DataFrame:
+    if dfs:
+        return pd.concat(dfs, ignore_index=True)
+    return pd.DataFrame({c: pd.Series(dtype=str) for c in columns})
+
+
+def compare_loaders(raw_dir: str = RAW_CSV_DIR, workers: Optional[int] = None) -> dict:
+    """Time the serial and parallel loaders on the same files and check
+    that they produce identical frames."""
+    t = time.perf_counter()
+    races_s, divs_s, meta_s, incs_s = load_all_csvs(raw_dir)
+    meta_clean = clean_metadata(meta_s)
+    clean_race_results(races_s, meta_clean, raw_dir)
+    serial = time.perf_counter() - t
+
+    t = time.perf_counter()
+    races_p, divs_p, meta_p, incs_p, src_to_date = load_all_csvs_parallel(raw_dir, workers)
+    meta_clean = clean_metadata(meta_p)
+    clean_race_results(races_p, meta_clean, raw_dir, src_to_date)
+    parallel = time.perf_counter() - t
+
+    pd.testing.assert_frame_equal(races_s, races_p)
+    pd.testing.assert_frame_equal(divs_s, divs_p)
+    pd.testing.assert_frame_equal(meta_s, meta_p)
+    pd.testing.assert_frame_equal(incs_s, incs_p)
+
+    log.info("=" * 70)
+    log.info(f"LOADER COMPARISON (load + date mapping): serial {serial:.2f}s | "
+             f"parallel {parallel:.2f}s | speedup {serial / parallel:.2f}x")
+    log.info("  Frames identical.")
+    log.info("=" * 70)
+    return {'serial_seconds': serial, 'parallel_seconds': parallel}
 
 
 # =====================================================================
@@ -194,21 +427,85 @@ def to_float(s, default=None):
         return default
 
 
-def clean_metadata(meta: pd.DataFrame) -> pd.DataFrame:
+# ---------------------------------------------------------------------
+# Vectorized equivalents of the scalar parsers above. Same semantics
+# (verified by --verify-vectorized), no per-row Python / try-except.
+# ---------------------------------------------------------------------
+_HORSE_RE = r'^\s*(.+?)\s*\(([A-Z0-9]{3,5})\)\s*$'
+_VENUE_RE = r'(?i)[?&]racecourse=([^&#]+)'
+
+
+def _as_apply_result(x: pd.Series) -> pd.Series:
+    """Match Series.apply(to_int)'s dtype: int64 when nothing failed,
+    float64 with NaN otherwise."""
+    return x.astype('int64') if x.notna().all() else x
+
+
+def ddmmyyyy_to_iso_vec(s: pd.Series) -> pd.Series:
+    d = pd.to_datetime(s.astype(str).str.strip(), format="%d/%m/%Y", errors='coerce')
+    return d.dt.strftime("%Y-%m-%d")
+
+
+def to_int_vec(s: pd.Series) -> pd.Series:
+    x = pd.to_numeric(s.astype(str).str.strip(), errors='coerce')
+    return _as_apply_result(np.trunc(x.astype(float)))
+
+
+def to_float_vec(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s.astype(str).str.strip(), errors='coerce').astype(float)
+
+
+def parse_horse_id_vec(raw: pd.Series) -> tuple[pd.Series, pd.Series]:
+    raw = raw.astype(str)
+    ex = raw.str.extract(_HORSE_RE)
+    stripped = raw.str.strip()
+    name = ex[0].str.strip().fillna(stripped)
+    hid  = ex[1].str.strip().fillna(stripped.str.upper().str[:5])
+    return name, hid
+
+
+def parse_venue_from_url_vec(url: pd.Series) -> pd.Series:
+    v = url.astype(str).str.extract(_VENUE_RE, expand=False)
+    return v.str.upper().fillna("UNK")
+
+
+class _RowWise:
+    """Legacy per-row coercions (kept for --verify-vectorized)."""
+    iso      = staticmethod(lambda s: s.apply(ddmmyyyy_to_iso))
+    to_int   = staticmethod(lambda s: s.apply(to_int))
+    to_float = staticmethod(lambda s: s.apply(to_float))
+    venue    = staticmethod(lambda s: s.apply(parse_venue_from_url))
+
+    @staticmethod
+    def horse(s):
+        parsed = s.apply(parse_horse_id)
+        return parsed.apply(lambda t: t[0]), parsed.apply(lambda t: t[1])
+
+
+class _Vectorized:
+    iso      = staticmethod(ddmmyyyy_to_iso_vec)
+    to_int   = staticmethod(to_int_vec)
+    to_float = staticmethod(to_float_vec)
+    venue    = staticmethod(parse_venue_from_url_vec)
+    horse    = staticmethod(parse_horse_id_vec)
+
+
+def clean_metadata(meta: pd.DataFrame, vectorized: bool = True) -> pd.DataFrame:
     """Build the race_metadata table with venue, is_bettable, ISO date, race_id."""
     log.info("-" * 70)
     log.info("Cleaning metadata")
+    c = _Vectorized if vectorized else _RowWise
 
     df = meta.copy()
-    df['date_iso'] = df['date'].apply(ddmmyyyy_to_iso)
-    df['race_no']  = df['race_no'].apply(to_int)
+    df['date_iso'] = c.iso(df['date'])
+    df['race_no']  = c.to_int(df['race_no'])
     df = df.dropna(subset=['date_iso', 'race_no']).copy()
     df['race_no'] = df['race_no'].astype(int)
 
     df['race_id']  = df['date_iso'] + '_R' + df['race_no'].astype(str)
-    df['distance'] = df['distance'].apply(lambda x: to_int(x))
-    df['prize']    = df['prize'].apply(lambda x: to_int(x))
-    df['venue']    = df['url'].apply(parse_venue_from_url)
+    df['distance'] = c.to_int(df['distance'])
+    df['prize']    = c.to_int(df['prize'])
+    df['venue']    = c.venue(df['url'])
 
     # is_bettable: default 1, set to 0 for Conghua meetings (CH venue, no dividends).
     # The dividend check happens after we have the dividends frame, so default here
@@ -228,14 +525,15 @@ def clean_metadata(meta: pd.DataFrame) -> pd.DataFrame:
     ]]
 
 
-def clean_dividends(divs: pd.DataFrame) -> pd.DataFrame:
+def clean_dividends(divs: pd.DataFrame, vectorized: bool = True) -> pd.DataFrame:
     """Build the exotic_dividends table. Detect REFUND, set is_refund flag."""
     log.info("-" * 70)
     log.info("Cleaning dividends")
+    c = _Vectorized if vectorized else _RowWise
 
     df = divs.copy()
-    df['date_iso'] = df['date'].apply(ddmmyyyy_to_iso)
-    df['race_no']  = df['race_no'].apply(to_int)
+    df['date_iso'] = c.iso(df['date'])
+    df['race_no']  = c.to_int(df['race_no'])
     df = df.dropna(subset=['date_iso', 'race_no']).copy()
     df['race_no'] = df['race_no'].astype(int)
     df['race_id'] = df['date_iso'] + '_R' + df['race_no'].astype(str)
@@ -246,9 +544,12 @@ def clean_dividends(divs: pd.DataFrame) -> pd.DataFrame:
     # We still defensively check for any string contamination.
     div_str = df['dividend'].astype(str).str.upper()
     df['is_refund'] = div_str.str.contains('REFUND', na=False).astype(int)
-    df['dividend'] = df['dividend'].apply(
-        lambda x: to_float(x) if 'REFUND' not in str(x).upper() else None
-    )
+    if vectorized:
+        df['dividend'] = to_float_vec(df['dividend']).where(df['is_refund'] == 0)
+    else:
+        df['dividend'] = df['dividend'].apply(
+            lambda x: to_float(x) if 'REFUND' not in str(x).upper() else None
+        )
 
     # Deduplicate on (race_id, pool, combo)
     df = df.drop_duplicates(subset=['race_id', 'pool', 'combo'],
@@ -264,29 +565,17 @@ def clean_dividends(divs: pd.DataFrame) -> pd.DataFrame:
     ]]
 
 
-def clean_race_results(races: pd.DataFrame, meta: pd.DataFrame) -> pd.DataFrame:
-    """Build the race_results table.
-
-    OPTION A enforcement: only insert rows where finish_position is populated.
-    This excludes abandoned races (no result table) entirely from race_results.
-
-    The races CSVs lack a date column — we infer it from the source file
-    by joining on _source_file → meeting → date via the metadata CSVs."""
-    log.info("-" * 70)
-    log.info("Cleaning race_results")
-
-    df = races.copy()
-
-    # Build a meeting-number -> date map from metadata file naming.
-    # meta CSVs are headed; races CSVs share their meeting number.
+def _source_dates_from_files(races: pd.DataFrame, raw_dir: str) -> dict:
+    """Legacy races-file -> date map: re-reads metadata{N}.csv per meeting.
+    meta CSVs are headed; races CSVs share their meeting number."""
     src_to_date = {}
-    for src in df['_source_file'].unique():
+    for src in races['_source_file'].unique():
         # src looks like "races123.csv" → meeting 123
         m = re.match(r'races(\d+)\.csv$', src)
         if not m:
             continue
         n = m.group(1)
-        meta_path = os.path.join(RAW_CSV_DIR, f"metadata{n}.csv")
+        meta_path = os.path.join(raw_dir, f"metadata{n}.csv")
         if not os.path.exists(meta_path):
             continue
         try:
@@ -295,12 +584,35 @@ def clean_race_results(races: pd.DataFrame, meta: pd.DataFrame) -> pd.DataFrame:
                 src_to_date[src] = meta_n['date'].iloc[0]
         except Exception:
             continue
+    return src_to_date
+
+
+def clean_race_results(races: pd.DataFrame, meta: pd.DataFrame,
+                       raw_dir: str = RAW_CSV_DIR,
+                       src_to_date: Optional[dict] = None,
+                       vectorized: bool = True) -> pd.DataFrame:
+    """Build the race_results table.
+
+    OPTION A enforcement: only insert rows where finish_position is populated.
+    This excludes abandoned races (no result table) entirely from race_results.
+
+    The races CSVs lack a date column — we infer it from the source file
+    by joining on _source_file → meeting → date via the metadata CSVs.
+    Pass src_to_date (from load_all_csvs_parallel) to skip re-reading them."""
+    log.info("-" * 70)
+    log.info("Cleaning race_results")
+    c = _Vectorized if vectorized else _RowWise
+
+    df = races.copy()
+
+    if src_to_date is None:
+        src_to_date = _source_dates_from_files(df, raw_dir)
 
     df['date']     = df['_source_file'].map(src_to_date)
-    df['date_iso'] = df['date'].apply(ddmmyyyy_to_iso)
+    df['date_iso'] = c.iso(df['date'])
 
     # Parse race_no from race_name "RACE 7 (NNN)"
-    df['race_no'] = df['race_name'].str.extract(r'RACE\s+(\d+)', expand=False).apply(to_int)
+    df['race_no'] = c.to_int(df['race_name'].str.extract(r'RACE\s+(\d+)', expand=False))
 
     # Drop rows we can't key
     df = df.dropna(subset=['date_iso', 'race_no']).copy()
@@ -308,17 +620,15 @@ def clean_race_results(races: pd.DataFrame, meta: pd.DataFrame) -> pd.DataFrame:
     df['race_id'] = df['date_iso'] + '_R' + df['race_no'].astype(str)
 
     # Parse horse_id and horse_name
-    parsed = df['horse_raw'].apply(parse_horse_id)
-    df['horse_name'] = parsed.apply(lambda t: t[0])
-    df['horse_id']   = parsed.apply(lambda t: t[1])
+    df['horse_name'], df['horse_id'] = c.horse(df['horse_raw'])
 
     # Numeric coercions
-    df['finish_position'] = df['finish_position'].apply(to_int)
-    df['horse_no']        = df['horse_no'].apply(to_int)
-    df['act_wt']          = df['act_wt'].apply(to_float)
-    df['horse_wt']        = df['horse_wt'].apply(to_int)
-    df['draw']            = df['draw'].apply(to_int)
-    df['win_odds']        = df['win_odds'].apply(to_float)
+    df['finish_position'] = c.to_int(df['finish_position'])
+    df['horse_no']        = c.to_int(df['horse_no'])
+    df['act_wt']          = c.to_float(df['act_wt'])
+    df['horse_wt']        = c.to_int(df['horse_wt'])
+    df['draw']            = c.to_int(df['draw'])
+    df['win_odds']        = c.to_float(df['win_odds'])
     df['distance']        = None  # backfill from metadata in a moment
 
     # OPTION A: drop rows with no finish_position (abandoned/scratched mid-race).
@@ -392,23 +702,198 @@ def apply_bettable_flag(meta: pd.DataFrame, divs: pd.DataFrame) -> pd.DataFrame:
     return meta.drop(columns=['real_divs_for_race', 'real_divs_for_meeting'])
 
 
+def clean_incidents(incs: pd.DataFrame) -> pd.DataFrame:
+    """Build the race_incidents table: key each stewards' report by
+    (race_id, horse_id) and tag its text with INCIDENT_FLAG_COLS."""
+    log.info("-" * 70)
+    log.info("Cleaning incidents")
+
+    df = incs.copy()
+    df['date_iso'] = ddmmyyyy_to_iso_vec(df['date'])
+    df['race_no']  = to_int_vec(df['race_no'])
+    df = df.dropna(subset=['date_iso', 'race_no']).copy()
+    df['race_no'] = df['race_no'].astype(int)
+    df['race_id'] = df['date_iso'] + '_R' + df['race_no'].astype(str)
+    df['race_key'] = race_key(df['date_iso'], df['race_no'])
+
+    # The scraper leaves horse_id blank when the name has no "(CODE)";
+    # fall back the same way parse_horse_id does for runners.
+    name = df['horse_name'].astype(str).str.strip()
+    df['horse_id'] = df['horse_id'].astype(str).str.strip().where(
+        df['horse_id'].astype(str).str.strip() != '', name.str.upper().str[:5])
+    df['horse_name'] = name
+    df['horse_no'] = to_int_vec(df['horse_no'])
+    df['placing'] = df['placing'].astype(str).str.strip()
+    df['incident_text'] = df['incident_text'].astype(str).str.strip()
+    df = df[df['incident_text'] != '']
+
+    df = df.drop_duplicates(subset=['race_id', 'horse_id'],
+                            keep='last').reset_index(drop=True)
+    flags = tag_incidents(df['incident_text'])
+    df = pd.concat([df, flags], axis=1)
+
+    log.info(f"  Cleaned incidents: {len(df):,} rows")
+    if len(df):
+        log.info("  Flag counts: " + ", ".join(
+            f"{c}={int(flags[c].sum()):,}" for c in INCIDENT_FLAG_COLS if flags[c].any()))
+    return df[INCIDENTS_COLS]
+
+
+# ---------------------------------------------------------------------
+# Row-wise vs vectorized equivalence check
+# ---------------------------------------------------------------------
+_EDGE_CASES = {
+    'iso':      ['15/04/2026', '1/9/2011', ' 02/10/2012 ', '31/02/2011',
+                 '2026-04-15', '', '---', 'nan'],
+    'to_int':   ['7', ' 12 ', '12.7', '-0.5', '1e3', '', '---', 'WV', '1,000', 'nan'],
+    'to_float': ['7', ' 12.5 ', '1e3', '', '---', 'REFUND', '1,000.5', 'nan'],
+    'venue':    ['https://x/LocalResults.aspx?RaceDate=2026/04/15&Racecourse=ST&RaceNo=1',
+                 'https://x/results?RaceDate=20260524&racecourse=s2&RaceNo=1',
+                 'https://x/LocalResults.aspx?RaceDate=2026/04/15&RaceNo=1',
+                 'https://x/?Racecourse=&RaceNo=2', '', 'not a url'],
+    'horse':    ['FLYING AMANI (K152)', '  SPICE BAG  (L244) ', 'NO CODE HORSE',
+                 'lower case (k12)', 'A (B) (C123)', '(ABC)', ''],
+}
+
+
+def verify_vectorized(raw_dir: str = RAW_CSV_DIR, workers: Optional[int] = None) -> dict:
+    """Assert the vectorized cleaners reproduce the row-wise ones exactly:
+    first on hand-picked edge cases, then on every CSV in raw_dir."""
+    log.info("=" * 70)
+    log.info("VERIFY: row-wise vs vectorized cleaning")
+    log.info("=" * 70)
+
+    for name, vals in _EDGE_CASES.items():
+        sr = pd.Series(vals, dtype=str)
+        a, b = getattr(_RowWise, name)(sr), getattr(_Vectorized, name)(sr)
+        if name == 'horse':
+            pd.testing.assert_series_equal(a[0], b[0], check_names=False)
+            pd.testing.assert_series_equal(a[1], b[1], check_names=False)
+        else:
+            pd.testing.assert_series_equal(a, b, check_names=False)
+    log.info(f"  Edge cases identical ({sum(map(len, _EDGE_CASES.values()))} values)")
+
+    races_raw, divs_raw, meta_raw, _, src_to_date = load_all_csvs_parallel(raw_dir, workers)
+    out, timing = {}, {}
+    for vec in (False, True):
+        t = time.perf_counter()
+        meta = clean_metadata(meta_raw, vectorized=vec)
+        divs = clean_dividends(divs_raw, vectorized=vec)
+        meta = apply_bettable_flag(meta, divs)
+        results = clean_race_results(races_raw, meta, raw_dir, src_to_date,
+                                     vectorized=vec)
+        timing[vec] = time.perf_counter() - t
+        out[vec] = (meta, divs, results)
+
+    for tbl, a, b in zip(('race_metadata', 'exotic_dividends', 'race_results'),
+                         out[False], out[True]):
+        pd.testing.assert_frame_equal(a, b)
+        log.info(f"  {tbl}: {len(b):,} rows identical")
+    log.info(f"  Cleaning wall time: row-wise {timing[False]:.2f}s | "
+             f"vectorized {timing[True]:.2f}s | "
+             f"speedup {timing[False] / timing[True]:.1f}x")
+    return {'rowwise_seconds': timing[False], 'vectorized_seconds': timing[True]}
+
+
+# =====================================================================
+# PHASE 2b — NORMALIZE (races dimension + typed runner rows)
+# =====================================================================
+RACES_COLS = ['race_key', 'race_id', 'date', 'date_iso', 'race_no',
+              'race_name', 'going', 'course', 'distance', 'race_class',
+              'prize', 'venue', 'is_bettable', 'url', 'has_metadata']
+RUNNERS_COLS = ['race_key', 'finish_position', 'horse_no', 'horse_id',
+                'horse_name', 'jockey', 'trainer', 'act_wt', 'horse_wt',
+                'draw', 'lbw', 'lbw_lengths', 'running_pos',
+                'finish_time_sec', 'esi_raw', 'csi_raw', 'early_pos', 'win_odds']
+INCIDENTS_COLS = ['race_key', 'race_id', 'date_iso', 'race_no', 'horse_id',
+                  'horse_no', 'horse_name', 'placing', 'incident_text'] + INCIDENT_FLAG_COLS
+
+
+def race_key(date_iso: pd.Series, race_no: pd.Series) -> pd.Series:
+    """'2026-04-15', 7 -> 2026041507."""
+    return date_iso.str.replace('-', '', regex=False).astype('int64') * 100 + race_no
+
+
+def normalize_tables(results: pd.DataFrame,
+                     meta: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Split the cleaned (denormalized) frames into the races dimension and
+    typed runner rows. Races present in results but not in metadata get a
+    dimension row built from their runners (has_metadata=0, is_bettable=0);
+    race-level fields otherwise come from metadata."""
+    log.info("-" * 70)
+    log.info("Normalizing into races + runners")
+
+    races = meta.assign(has_metadata=1)
+    orphans = results[~results['race_id'].isin(meta['race_id'])]
+    if len(orphans):
+        extra = (orphans.drop_duplicates('race_id')
+                 [['race_id', 'date', 'date_iso', 'race_no', 'race_name',
+                   'going', 'course', 'distance']]
+                 .assign(race_class=None, prize=None, venue=None,
+                         is_bettable=0, url=None, has_metadata=0))
+        races = pd.concat([races, extra], ignore_index=True)
+        log.info(f"  {extra['race_id'].nunique():,} races have results but no metadata")
+    races = races.assign(race_key=race_key(races['date_iso'], races['race_no']))
+
+    positions = results['running_pos'].map(parse_running_pos)
+    pace = pd.DataFrame(positions.map(pace_from_positions).tolist(),
+                        index=results.index, columns=['esi_raw', 'csi_raw', 'early_pos'])
+    runners = results.assign(
+        race_key=race_key(results['date_iso'], results['race_no']),
+        lbw_lengths=results['lbw'].map(parse_lbw),
+        running_pos=positions.map(pack_running_pos),
+        finish_time_sec=results['finish_time'].map(parse_finish_time).astype(float),
+        esi_raw=pace['esi_raw'].astype(float),
+        csi_raw=pace['csi_raw'].astype('int64'),
+        early_pos=pace['early_pos'].astype('Int64'),
+    )
+    log.info(f"  races: {len(races):,} | runners: {len(runners):,}")
+    return races[RACES_COLS], runners[RUNNERS_COLS]
+
+
 # =====================================================================
 # PHASE 3 — WRITE TO SQLITE
 # =====================================================================
+# Bumped whenever the physical schema changes; incremental ingest refuses
+# to upsert into a database built with a different version.
+SCHEMA_VERSION = 5
+
 SCHEMA_SQL = """
-DROP TABLE IF EXISTS race_results;
+DROP VIEW  IF EXISTS race_results;
+DROP VIEW  IF EXISTS race_metadata;
+DROP TABLE IF EXISTS runners;
+DROP TABLE IF EXISTS races;
 DROP TABLE IF EXISTS exotic_dividends;
-DROP TABLE IF EXISTS race_metadata;
-
-CREATE TABLE race_results (
+DROP TABLE IF EXISTS race_incidents_fts;
+DROP TABLE IF EXISTS race_incidents;
+DROP TABLE IF EXISTS ingest_manifest;
+
+-- Race dimension: one row per race seen in metadata OR results.
+-- race_key = YYYYMMDD * 100 + race_no (deterministic, date-ordered).
+CREATE TABLE races (
+    race_key        INTEGER PRIMARY KEY,
+    race_id         TEXT NOT NULL UNIQUE,
     date            TEXT NOT NULL,
     date_iso        TEXT NOT NULL,
     race_no         INTEGER NOT NULL,
-    race_id         TEXT NOT NULL,
     race_name       TEXT,
     going           TEXT,
     course          TEXT,
     distance        INTEGER,
+    race_class      TEXT,
+    prize           INTEGER,
+    venue           TEXT,
+    is_bettable     INTEGER NOT NULL DEFAULT 1,
+    url             TEXT,
+    has_metadata    INTEGER NOT NULL DEFAULT 1
+);
+
+-- One row per finishing runner, clustered by race and finishing order
+-- (WITHOUT ROWID) so a race loads as one contiguous, already-sorted range.
+-- (race_key, horse_id) stays unique via ux_runners_horse. Result strings
+-- are pre-parsed.
+CREATE TABLE runners (
+    race_key        INTEGER NOT NULL REFERENCES races(race_key),
     finish_position INTEGER NOT NULL,
     horse_no        INTEGER NOT NULL,
     horse_id        TEXT NOT NULL,
@@ -419,12 +904,20 @@ CREATE TABLE race_results (
     horse_wt        INTEGER,
     draw            INTEGER,
     lbw             TEXT,
-    running_pos     TEXT,
-    finish_time     TEXT,
+    lbw_lengths     REAL,
+    running_pos     BLOB,
+    finish_time_sec REAL,
+    esi_raw         REAL,
+    csi_raw         INTEGER,
+    early_pos       INTEGER,
     win_odds        REAL,
-    PRIMARY KEY (race_id, horse_id)
-);
+    PRIMARY KEY (race_key, finish_position, horse_id)
+) WITHOUT ROWID;
+
+CREATE UNIQUE INDEX ux_runners_horse ON runners(race_key, horse_id);
 
+-- Clustered on (race_id, pool, combo): settlement's per-race pool lookup
+-- reads one contiguous range with every column in hand.
 CREATE TABLE exotic_dividends (
     date            TEXT NOT NULL,
     date_iso        TEXT NOT NULL,
@@ -435,98 +928,382 @@ CREATE TABLE exotic_dividends (
     dividend        REAL,
     is_refund       INTEGER NOT NULL DEFAULT 0,
     PRIMARY KEY (race_id, pool, combo)
-);
+) WITHOUT ROWID;
 
-CREATE TABLE race_metadata (
-    date            TEXT NOT NULL,
+-- Stewards' report per (race, horse) with 0/1 flags tagged at ingest by
+-- incident_tagger. Keeps a rowid (incident_id) for the FTS5 index.
+CREATE TABLE race_incidents (
+    incident_id     INTEGER PRIMARY KEY,
+    race_key        INTEGER NOT NULL,
+    race_id         TEXT NOT NULL,
     date_iso        TEXT NOT NULL,
     race_no         INTEGER NOT NULL,
-    race_id         TEXT PRIMARY KEY,
-    race_name       TEXT,
-    going           TEXT,
-    course          TEXT,
-    distance        INTEGER,
-    race_class      TEXT,
-    prize           INTEGER,
-    venue           TEXT,
-    is_bettable     INTEGER NOT NULL DEFAULT 1,
-    url             TEXT
+    horse_id        TEXT NOT NULL,
+    horse_no        INTEGER,
+    horse_name      TEXT,
+    placing         TEXT,
+    incident_text   TEXT NOT NULL,
+""" + "".join(f"    {c:<15} INTEGER NOT NULL DEFAULT 0,\n" for c in INCIDENT_FLAG_COLS) + """\
+    UNIQUE (race_id, horse_id)
 );
-"""
 
+-- Full-text search over the report text. External content: the text is
+-- stored once, in race_incidents; triggers (INDEX_SQL) keep it in sync.
+-- Porter stemming, so MATCH 'check' also finds 'checked'.
+CREATE VIRTUAL TABLE race_incidents_fts USING fts5(
+    incident_text, content='race_incidents', content_rowid='incident_id',
+    tokenize='porter unicode61'
+);
+
+-- One row per ingested source CSV. Incremental runs re-ingest a meeting
+-- only when one of its files is new or its content hash has changed.
+CREATE TABLE ingest_manifest (
+    source_file     TEXT PRIMARY KEY,
+    meeting_no      INTEGER NOT NULL,
+    sha256          TEXT NOT NULL,
+    size_bytes      INTEGER NOT NULL,
+    date_iso        TEXT,
+    ingested_at     TEXT NOT NULL
+);
+
+-- Compatibility views: the pre-normalization table shapes, so existing
+-- queries keep working. running_pos / finish_time are rebuilt as text;
+-- the pre-parsed numeric columns are appended for ad-hoc SQL.
+CREATE VIEW race_results AS
+SELECT r.date, r.date_iso, r.race_no, r.race_id,
+       r.race_name, r.going, r.course, r.distance,
+       u.finish_position, u.horse_no, u.horse_id, u.horse_name,
+       u.jockey, u.trainer, u.act_wt, u.horse_wt, u.draw,
+       u.lbw, """ + running_pos_text_sql('u.running_pos') + """ AS running_pos,
+       """ + finish_time_text_sql('u.finish_time_sec') + """ AS finish_time,
+       u.win_odds,
+       u.lbw_lengths, u.finish_time_sec, u.esi_raw, u.csi_raw, u.early_pos
+FROM runners u JOIN races r ON r.race_key = u.race_key;
+
+CREATE VIEW race_metadata AS
+SELECT date, date_iso, race_no, race_id, race_name, going, course, distance,
+       race_class, prize, venue, is_bettable, url
+FROM races WHERE has_metadata = 1;
+""" + f"PRAGMA user_version = {SCHEMA_VERSION};\n"
+
+# Indexes are matched to the engine's queries; check them with
+#   python3 backtest_engine/query_plan_audit.py
 INDEX_SQL = """
-CREATE INDEX idx_results_date  ON race_results(date_iso);
-CREATE INDEX idx_results_horse ON race_results(horse_id, date_iso);
-CREATE INDEX idx_results_race  ON race_results(race_id);
-CREATE INDEX idx_results_jock  ON race_results(jockey, date_iso);
-CREATE INDEX idx_results_train ON race_results(trainer, date_iso);
+CREATE INDEX idx_races_date   ON races(date_iso);
+CREATE INDEX idx_races_venue  ON races(venue);
+-- covers FeatureCacheBuilder's chronological bettable-race list
+CREATE INDEX idx_races_bet    ON races(is_bettable, date_iso, race_no,
+                                       has_metadata, race_id);
+
+CREATE INDEX idx_runners_horse ON runners(horse_id, race_key);
+CREATE INDEX idx_runners_jock  ON runners(jockey, race_key);
+CREATE INDEX idx_runners_train ON runners(trainer, race_key);
 
-CREATE INDEX idx_div_race  ON exotic_dividends(race_id);
 CREATE INDEX idx_div_pool  ON exotic_dividends(pool, date_iso);
 CREATE INDEX idx_div_date  ON exotic_dividends(date_iso);
 
-CREATE INDEX idx_meta_date   ON race_metadata(date_iso);
-CREATE INDEX idx_meta_venue  ON race_metadata(venue);
-CREATE INDEX idx_meta_bet    ON race_metadata(is_bettable, date_iso);
+CREATE INDEX idx_manifest_meeting ON ingest_manifest(meeting_no);
+
+CREATE INDEX idx_incidents_horse ON race_incidents(horse_id, race_key);
+CREATE INDEX idx_incidents_date  ON race_incidents(date_iso);
 """
 
+# Built after the bulk insert (one pass over the text beats per-row
+# trigger work), then kept in sync by triggers for incremental upserts.
+# Flag-only UPDATEs (--retag-incidents) do not touch the index.
+FTS_SQL = """
+INSERT INTO race_incidents_fts(race_incidents_fts) VALUES ('rebuild');
+
+CREATE TRIGGER race_incidents_ai AFTER INSERT ON race_incidents BEGIN
+    INSERT INTO race_incidents_fts(rowid, incident_text)
+    VALUES (new.incident_id, new.incident_text);
+END;
+CREATE TRIGGER race_incidents_ad AFTER DELETE ON race_incidents BEGIN
+    INSERT INTO race_incidents_fts(race_incidents_fts, rowid, incident_text)
+    VALUES ('delete', old.incident_id, old.incident_text);
+END;
+CREATE TRIGGER race_incidents_au AFTER UPDATE OF incident_text ON race_incidents BEGIN
+    INSERT INTO race_incidents_fts(race_incidents_fts, rowid, incident_text)
+    VALUES ('delete', old.incident_id, old.incident_text);
+    INSERT INTO race_incidents_fts(rowid, incident_text)
+    VALUES (new.incident_id, new.incident_text);
+END;
+"""
+
+
+# Build-time pragmas. journal_mode=OFF is only used on the fresh file of a
+# full rebuild (a crash there just means re-running the ingest); the
+# incremental path keeps a WAL so an interrupted upsert rolls back cleanly.
+_BULK_CACHE_KIB = 256 * 1024
+
 
-def write_to_db(results: pd.DataFrame,
+@contextmanager
+def bulk_write_pragmas(conn: sqlite3.Connection, journal_mode: str = 'WAL'):
+    """Fast settings for the duration of a bulk write, then restore the
+    safe defaults (rollback journal, synchronous=FULL)."""
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(f"PRAGMA cache_size=-{_BULK_CACHE_KIB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    try:
+        yield conn
+    finally:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("PRAGMA cache_size=-2000")
+
+
+def bulk_insert(conn: sqlite3.Connection, table: str, df: pd.DataFrame,
+                replace: bool = False) -> float:
+    """Stream df's rows through one prepared INSERT (executemany). NaN/NaT
+    become NULL and numpy scalars become Python ints/floats, column by
+    column, so no per-row pandas work is done. Does not commit; returns
+    the elapsed seconds."""
+    t = time.perf_counter()
+    cols = list(df.columns)
+    verb = "INSERT OR REPLACE" if replace else "INSERT"
+    sql = (f"{verb} INTO {table} ({', '.join(cols)}) "
+           f"VALUES ({', '.join('?' * len(cols))})")
+    columns = [df[c].astype(object).where(df[c].notna(), None).tolist() for c in cols]
+    conn.executemany(sql, zip(*columns))
+    return time.perf_counter() - t
+
+
+def _log_insert(verb: str, table: str, n: int, secs: float) -> None:
+    rate = f" ({n / secs:,.0f} rows/s)" if secs > 0 and n else ""
+    log.info(f"  {verb} {n:,} {table} rows in {secs:.2f}s{rate}")
+
+
+def write_to_db(races: pd.DataFrame,
+                runners: pd.DataFrame,
                 divs: pd.DataFrame,
-                meta: pd.DataFrame) -> None:
+                incs: pd.DataFrame,
+                db_path: str = DB_PATH,
+                manifest: Optional[list[tuple]] = None) -> None:
+    """Full rebuild: delete the database and recreate every table."""
     log.info("=" * 70)
-    log.info(f"PHASE 3: Writing to SQLite at {DB_PATH}")
+    log.info(f"PHASE 3: Writing to SQLite at {db_path} (full rebuild)")
     log.info("=" * 70)
 
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    if os.path.exists(db_path):
+        os.remove(db_path)
         log.info("  Deleted existing database file")
 
-    conn = sqlite3.connect(DB_PATH)
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(db_path)
     try:
-        # Schema
-        conn.executescript(SCHEMA_SQL)
-        conn.commit()
-        log.info("  Schema created")
+        with bulk_write_pragmas(conn, journal_mode='OFF'):
+            # Schema
+            conn.executescript(SCHEMA_SQL)
+            log.info("  Schema created")
+
+            # Inserts: one transaction, prepared statements, empty tables
+            with conn:
+                for tbl, df in (('races', races),
+                                ('exotic_dividends', divs),
+                                ('runners', runners),
+                                ('race_incidents', incs)):
+                    _log_insert("Inserted", tbl, len(df), bulk_insert(conn, tbl, df))
+                if manifest:
+                    conn.executemany(_MANIFEST_UPSERT, manifest)
+                    log.info(f"  Recorded {len(manifest):,} source files in ingest_manifest")
+
+            # Indexes (faster to create after bulk insert)
+            t = time.perf_counter()
+            conn.executescript(INDEX_SQL)
+            conn.commit()
+            log.info(f"  Indexes created in {time.perf_counter() - t:.2f}s")
+
+            t = time.perf_counter()
+            conn.executescript(FTS_SQL)
+            conn.commit()
+            log.info(f"  Incident full-text index built in {time.perf_counter() - t:.2f}s")
+
+            # VACUUM to optimize storage
+            t = time.perf_counter()
+            conn.execute("VACUUM;")
+            log.info(f"  VACUUM complete in {time.perf_counter() - t:.2f}s")
 
-        # Inserts (use 'append' since we just created empty tables)
-        meta.to_sql('race_metadata',    conn, if_exists='append',
-                    index=False, method='multi', chunksize=500)
-        log.info(f"  Inserted {len(meta):,} metadata rows")
+    finally:
+        conn.close()
+    log.info(f"  Write wall time: {time.perf_counter() - t0:.2f}s | "
+             f"DB size {os.path.getsize(db_path) / 1e6:.1f} MB")
 
-        divs.to_sql('exotic_dividends', conn, if_exists='append',
-                    index=False, method='multi', chunksize=500)
-        log.info(f"  Inserted {len(divs):,} dividend rows")
 
-        results.to_sql('race_results', conn, if_exists='append',
-                       index=False, method='multi', chunksize=500)
-        log.info(f"  Inserted {len(results):,} race_results rows")
+# =====================================================================
+# INCREMENTAL INGEST — manifest of source files by content hash
+# =====================================================================
+_MANIFEST_UPSERT = """
+INSERT OR REPLACE INTO ingest_manifest
+    (source_file, meeting_no, sha256, size_bytes, date_iso, ingested_at)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
 
-        # Indexes (faster to create after bulk insert)
-        conn.executescript(INDEX_SQL)
-        conn.commit()
-        log.info("  Indexes created")
+# Same rule as apply_bettable_flag: a race is bettable iff it has at least
+# one real (non-refund) dividend row (which also makes its meeting non-empty).
+_BETTABLE_UPDATE = """
+UPDATE races SET is_bettable = EXISTS (
+    SELECT 1 FROM exotic_dividends d
+    WHERE d.race_id = races.race_id AND d.is_refund = 0
+)
+WHERE has_metadata = 1 AND date_iso IN (SELECT value FROM json_each(?))
+"""
 
-        # VACUUM to optimize storage
-        conn.execute("VACUUM;")
-        log.info("  VACUUM complete")
+# Per-table deletes for the dates a re-ingested meeting replaces.
+_CLEAR_DATES = {
+    'runners': "DELETE FROM runners WHERE race_key IN (SELECT race_key FROM races "
+               "WHERE date_iso IN (SELECT value FROM json_each(?)))",
+    'exotic_dividends': "DELETE FROM exotic_dividends "
+                        "WHERE date_iso IN (SELECT value FROM json_each(?))",
+    'race_incidents': "DELETE FROM race_incidents "
+                      "WHERE date_iso IN (SELECT value FROM json_each(?))",
+    'races': "DELETE FROM races WHERE date_iso IN (SELECT value FROM json_each(?))",
+}
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def scan_source_files(raw_dir: str = RAW_CSV_DIR) -> dict:
+    """{source_file: (meeting_no, sha256, size_bytes)} for every meeting CSV."""
+    out = {}
+    for f in sorted(os.listdir(raw_dir)):
+        m = re.match(_SOURCE_FILE_RE, f)
+        if m:
+            path = os.path.join(raw_dir, f)
+            out[f] = (int(m.group(1)), file_sha256(path), os.path.getsize(path))
+    return out
+
+
+def read_manifest(db_path: str = DB_PATH) -> Optional[dict]:
+    """{source_file: (meeting_no, sha256, date_iso)} from the database, or
+    None if there is no database / no manifest / an older schema version
+    (-> full rebuild needed)."""
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            log.info(f"  Database schema v{version} != v{SCHEMA_VERSION}")
+            return None
+        rows = conn.execute(
+            "SELECT source_file, meeting_no, sha256, date_iso FROM ingest_manifest"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    return {r[0]: (r[1], r[2], r[3]) for r in rows}
+
+
+def plan_incremental(scan: dict, manifest: dict) -> tuple[list[int], set]:
+    """Meetings to (re)ingest and the dates whose existing rows they replace.
+
+    A meeting is reloaded if any of its files is new or has a new hash.
+    A changed meeting's previously ingested date is cleared before the
+    insert, so rows dropped from a re-scrape do not linger; any other
+    meeting that shares that date is reloaded with it."""
+    changed = {mn for f, (mn, sha, _) in scan.items()
+               if f not in manifest or manifest[f][1] != sha}
+
+    present = {mn for mn, _, _ in scan.values()}
+    prev_dates = {d for mn, _, d in manifest.values() if mn in changed and d}
+    changed |= {mn for mn, _, d in manifest.values()
+                if d in prev_dates and mn in present}
+
+    missing = sorted(f for f in manifest if f not in scan)
+    if missing:
+        log.warning(f"  {len(missing)} manifest files no longer in raw dir "
+                    f"(e.g. {missing[0]}); their rows are kept — "
+                    f"run --full-rebuild to drop them")
+    return sorted(changed, key=lambda n: f"races{n}.csv"), prev_dates
+
+
+def manifest_rows(scan: dict, meetings: list[int], src_to_date: dict) -> list[tuple]:
+    """Rows for _MANIFEST_UPSERT covering every file of the given meetings."""
+    now = datetime.now().isoformat(timespec='seconds')
+    wanted = set(meetings)
+    rows = []
+    for f, (mn, sha, size) in scan.items():
+        if mn in wanted:
+            date = src_to_date.get(f"races{mn}.csv")
+            rows.append((f, mn, sha, size, ddmmyyyy_to_iso(date) if date else None, now))
+    return rows
+
+
+def write_incremental(races: pd.DataFrame,
+                      runners: pd.DataFrame,
+                      divs: pd.DataFrame,
+                      incs: pd.DataFrame,
+                      manifest: list[tuple],
+                      replace_dates: set,
+                      db_path: str = DB_PATH) -> None:
+    """Upsert the re-ingested meetings in one transaction: clear the dates
+    they replace, INSERT OR REPLACE their rows, recompute is_bettable for
+    the affected dates only, and record their files in the manifest.
+    Incidents are replaced by DELETE + INSERT rather than OR REPLACE, so
+    the FTS triggers see the removal of the old text."""
+    log.info("=" * 70)
+    log.info(f"PHASE 3: Writing to SQLite at {db_path} (incremental)")
+    log.info("=" * 70)
 
+    affected = set(replace_dates) | set(races['date_iso']) | set(divs['date_iso'])
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        with bulk_write_pragmas(conn, journal_mode='WAL'), conn:
+            if replace_dates:
+                dates = json.dumps(sorted(replace_dates))
+                for tbl, sql in _CLEAR_DATES.items():
+                    n = conn.execute(sql, (dates,)).rowcount
+                    log.info(f"  Cleared {n:,} {tbl} rows on {len(replace_dates)} "
+                             f"re-ingested date(s)")
+
+            for tbl, df in (('races', races),
+                            ('exotic_dividends', divs),
+                            ('runners', runners)):
+                _log_insert("Upserted", tbl, len(df),
+                            bulk_insert(conn, tbl, df, replace=True))
+
+            t = time.perf_counter()
+            conn.executemany("DELETE FROM race_incidents WHERE race_id = ? AND horse_id = ?",
+                             zip(incs['race_id'], incs['horse_id']))
+            bulk_insert(conn, 'race_incidents', incs)
+            _log_insert("Upserted", 'race_incidents', len(incs), time.perf_counter() - t)
+
+            conn.execute(_BETTABLE_UPDATE, (json.dumps(sorted(affected)),))
+            n_bet = conn.execute(
+                "SELECT COALESCE(SUM(is_bettable), 0), COUNT(*) FROM races "
+                "WHERE has_metadata = 1 AND date_iso IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(affected)),)).fetchone()
+            log.info(f"  is_bettable recomputed for {len(affected)} date(s): "
+                     f"{n_bet[0]:,} of {n_bet[1]:,} races bettable")
+
+            conn.executemany(_MANIFEST_UPSERT, manifest)
+            log.info(f"  Recorded {len(manifest):,} source files in ingest_manifest")
     finally:
         conn.close()
+    log.info(f"  Write wall time: {time.perf_counter() - t0:.2f}s")
 
 
 # =====================================================================
 # SANITY CHECKS
 # =====================================================================
-def sanity_checks() -> None:
+def sanity_checks(db_path: str = DB_PATH) -> None:
     log.info("=" * 70)
     log.info("SANITY CHECKS")
     log.info("=" * 70)
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     try:
         # 1. Total counts
-        for tbl in ('race_results', 'exotic_dividends', 'race_metadata'):
+        for tbl in ('race_results', 'exotic_dividends', 'race_metadata', 'race_incidents'):
             n = conn.execute(f"SELECT COUNT(*) FROM {tbl}").fetchone()[0]
             log.info(f"  {tbl}: {n:,} rows")
 
@@ -588,6 +1365,19 @@ def sanity_checks() -> None:
         """).fetchone()[0]
         log.info(f"    races_results races with NO dividends: {n}")
 
+        n = conn.execute("""
+            SELECT COUNT(*) FROM race_incidents i
+            LEFT JOIN runners u ON u.race_key = i.race_key AND u.horse_id = i.horse_id
+            WHERE u.race_key IS NULL
+        """).fetchone()[0]
+        log.info(f"    race_incidents without a matching runner: {n}")
+
+        # 6b. Incident flags
+        sums = conn.execute("SELECT " + ", ".join(
+            f"COALESCE(SUM({c}), 0)" for c in INCIDENT_FLAG_COLS) + " FROM race_incidents").fetchone()
+        log.info("\n  Incident flags: " + ", ".join(
+            f"{c}={v:,}" for c, v in zip(INCIDENT_FLAG_COLS, sums)))
+
         # 7. Date range
         row = conn.execute(
             "SELECT MIN(date_iso), MAX(date_iso) FROM race_metadata"
@@ -605,25 +1395,137 @@ def sanity_checks() -> None:
         conn.close()
 
 
+# =====================================================================
+# INCIDENTS — re-tag flags, full-text search
+# =====================================================================
+def retag_incidents(db_path: str = DB_PATH) -> int:
+    """Re-run incident_tagger over the stored text and rewrite the flag
+    columns in place (after a pattern change). Returns rows updated."""
+    conn = sqlite3.connect(db_path)
+    try:
+        df = pd.read_sql_query(
+            "SELECT incident_id, incident_text FROM race_incidents", conn)
+        flags = tag_incidents(df['incident_text'])
+        sql = (f"UPDATE race_incidents SET "
+               f"{', '.join(f'{c} = ?' for c in INCIDENT_FLAG_COLS)} WHERE incident_id = ?")
+        cols = [flags[c].astype(int).tolist() for c in INCIDENT_FLAG_COLS]
+        with conn:
+            conn.executemany(sql, zip(*cols, df['incident_id'].tolist()))
+    finally:
+        conn.close()
+    log.info(f"Re-tagged {len(df):,} race_incidents rows")
+    return len(df)
+
+
+SEARCH_INCIDENTS_SQL = """
+SELECT i.date_iso, i.race_no, i.horse_id, i.horse_name, i.incident_text
+FROM race_incidents_fts f JOIN race_incidents i ON i.incident_id = f.rowid
+WHERE race_incidents_fts MATCH ?
+ORDER BY i.date_iso DESC, i.race_no
+LIMIT ?
+"""
+
+
+def search_incidents(query: str, db_path: str = DB_PATH, limit: int = 50) -> pd.DataFrame:
+    """FTS5 MATCH over the stewards' reports, newest first, e.g.
+    'bled', 'lame NEAR/3 leg', '"held up" AND straight'."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return pd.read_sql_query(SEARCH_INCIDENTS_SQL, conn, params=(query, limit))
+    finally:
+        conn.close()
+
+
 # =====================================================================
 # MAIN
 # =====================================================================
+def run_ingest(raw_dir: str = RAW_CSV_DIR, db_path: str = DB_PATH,
+               checks: bool = True, workers: Optional[int] = None,
+               full_rebuild: bool = False) -> dict:
+    """CSV -> SQLite ingest. Incremental by default: only meetings whose
+    files are new or changed (per ingest_manifest) are loaded and upserted.
+    Falls back to a full rebuild when there is no database or manifest.
+    Returns row counts written per table."""
+    scan = scan_source_files(raw_dir)
+    manifest = None if full_rebuild else read_manifest(db_path)
+    if manifest is None:
+        if not full_rebuild:
+            log.info("No usable ingest manifest — doing a full rebuild")
+        meetings, replace_dates = None, set()
+    else:
+        meetings, replace_dates = plan_incremental(scan, manifest)
+        log.info(f"Incremental ingest: {len(meetings)} new/changed meeting(s) "
+                 f"of {len({v[0] for v in scan.values()})}")
+        if not meetings:
+            log.info("  Database is up to date — nothing to ingest")
+            return {'race_results': 0, 'exotic_dividends': 0, 'race_metadata': 0,
+                    'race_incidents': 0}
+
+    t = time.perf_counter()
+    races_raw, divs_raw, meta_raw, incs_raw, src_to_date = load_all_csvs_parallel(
+        raw_dir, workers, meetings=meetings)
+    log.info(f"  Load wall time: {time.perf_counter() - t:.2f}s")
+
+    meta = clean_metadata(meta_raw)
+    divs = clean_dividends(divs_raw)
+    results = clean_race_results(races_raw, meta, raw_dir, src_to_date)
+    incs = clean_incidents(incs_raw)
+
+    if meetings is None:
+        meta = apply_bettable_flag(meta, divs)
+        races, runners = normalize_tables(results, meta)
+        rows = manifest_rows(scan, sorted({v[0] for v in scan.values()}), src_to_date)
+        write_to_db(races, runners, divs, incs, db_path, manifest=rows)
+    else:
+        races, runners = normalize_tables(results, meta)
+        rows = manifest_rows(scan, meetings, src_to_date)
+        write_incremental(races, runners, divs, incs, rows, replace_dates, db_path)
+
+    if checks:
+        sanity_checks(db_path)
+    return {'race_results': len(results), 'exotic_dividends': len(divs),
+            'race_metadata': len(meta), 'race_incidents': len(incs)}
+
+
 def main():
+    ap = argparse.ArgumentParser(description="v32 CSV -> SQLite ingest")
+    ap.add_argument('--workers', type=int, default=None,
+                    help="CSV loader pool size (default: all cores; 1 = in-process)")
+    ap.add_argument('--compare-loaders', action='store_true',
+                    help="time serial vs parallel CSV loading, verify identical, exit")
+    ap.add_argument('--verify-vectorized', action='store_true',
+                    help="check vectorized cleaning == row-wise on the CSVs, exit")
+    ap.add_argument('--full-rebuild', action='store_true',
+                    help="delete and recreate the database instead of ingesting "
+                         "only new/changed meetings")
+    ap.add_argument('--retag-incidents', action='store_true',
+                    help="re-run incident_tagger over race_incidents text, exit")
+    ap.add_argument('--search-incidents', metavar='QUERY', default=None,
+                    help="FTS5 search of the stewards' reports, e.g. 'bled' or "
+                         "'\"held up\" AND straight', exit")
+    args = ap.parse_args()
+
+    if args.compare_loaders:
+        compare_loaders(workers=args.workers)
+        return
+    if args.verify_vectorized:
+        verify_vectorized(workers=args.workers)
+        return
+    if args.retag_incidents:
+        retag_incidents()
+        return
+    if args.search_incidents:
+        hits = search_incidents(args.search_incidents)
+        log.info(f"{len(hits)} incident(s) matching {args.search_incidents!r}:\n"
+                 + (hits.to_string(index=False) if len(hits) else ""))
+        return
+
     start = datetime.now()
     log.info("#" * 70)
     log.info(f"# v32 INGEST STARTING — {start}")
     log.info("#" * 70)
 
-    races_raw, divs_raw, meta_raw = load_all_csvs()
-
-    meta = clean_metadata(meta_raw)
-    divs = clean_dividends(divs_raw)
-    meta = apply_bettable_flag(meta, divs)
-    results = clean_race_results(races_raw, meta)
-
-    write_to_db(results, divs, meta)
-
-    sanity_checks()
+    run_ingest(workers=args.workers, full_rebuild=args.full_rebuild)
 
     elapsed = (datetime.now() - start).total_seconds()
     log.info("#" * 70)
@@ -632,4 +1534,11 @@ def main():
 
 
 if __name__ == "__main__":
+    # only ingest's own runs go to ingest_log.txt; importers configure
+    # their own logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(LOG_PATH), logging.StreamHandler()]
+    )
     main()
@@ -0,0 +1,123 @@
+"""
+Race-result string parsers — shared by ingest, the engine and dataprep
+======================================================================
+HKJC result pages give margins ('1-1/4', 'SH', 'NOSE'), running positions
+('10 9 6 2 1') and finish times ('1:44.27') as text. ingest_v32 parses
+them ONCE into typed runner columns; every consumer that still holds raw
+strings uses these same functions, so there is a single definition of
+each rule.
+
+parse_lbw / parse_running_pos / pace_from_positions are the exact v31
+rules (previously copied in StatefulFeatureEngine and dataprep.py).
+
+Running positions are stored as a fixed-width blob: RUNNING_POS_WIDTH
+unsigned bytes, one per call, zero-padded. running_pos_text_sql() rebuilds
+the space-separated text inside SQLite for the race_results view.
+"""
+
+import math
+from typing import Optional
+
+import pandas as pd
+
+RUNNING_POS_WIDTH = 6       # HKJC shows at most 6 calls (2400m)
+
+
+def parse_lbw(lbw_str) -> float:
+    """Margin behind the winner in lengths. Winner / unparseable -> 0.0."""
+    if pd.isna(lbw_str) or str(lbw_str).strip() in ['---', '-', '']:
+        return 0.0
+    s = str(lbw_str).strip().upper()
+    if s in ['N', 'NOSE']:  return 0.05
+    if s in ['SH', 'SHD', 'SN']: return 0.1
+    if s in ['HD']: return 0.2
+    if s in ['DH']: return 0.0
+    try:
+        if '-' in s:
+            parts = s.split('-')
+            return float(parts[0]) + (float(parts[1].split('/')[0]) /
+                                      float(parts[1].split('/')[1]))
+        elif '/' in s:
+            return float(s.split('/')[0]) / float(s.split('/')[1])
+        else:
+            return float(s)
+    except Exception:
+        return 0.0
+
+
+def parse_running_pos(pos_string) -> list:
+    """'10 9 6 2 1' -> [10, 9, 6, 2, 1]. Missing / '---' -> []."""
+    if pd.isna(pos_string) or pos_string == '---':
+        return []
+    return [int(x) for x in str(pos_string).split() if x.isdigit()]
+
+
+def parse_finish_time(s) -> Optional[float]:
+    """'1:44.27' / '1.44.27' -> 104.27, '57.11' -> 57.11. None on failure."""
+    if s is None or pd.isna(s):
+        return None
+    t = str(s).strip().replace(':', '.')
+    parts = t.split('.')
+    try:
+        if len(parts) == 3:
+            return round(int(parts[0]) * 60 + float(f"{parts[1]}.{parts[2]}"), 2)
+        if len(parts) in (1, 2) and parts[0]:
+            return float(t)
+    except ValueError:
+        pass
+    return None
+
+
+def pace_from_positions(pos: list) -> tuple:
+    """(esi_raw, csi_raw, early_pos) for one run, exact v31 SectionalPace:
+    ESI = 1/sqrt(first call position) (NaN if none), CSI = places made
+    between the last two calls (0 if fewer than two), early_pos = first
+    call position (None if none)."""
+    esi = (1.0 / math.sqrt(pos[0])) if (len(pos) > 0 and pos[0] > 0) else float('nan')
+    csi = (pos[-2] - pos[-1]) if len(pos) >= 2 else 0
+    early = pos[0] if len(pos) > 0 else None
+    return esi, csi, early
+
+
+# ---------------------------------------------------------------------
+# Fixed-width running_pos blob
+# ---------------------------------------------------------------------
+def pack_running_pos(positions: list) -> Optional[bytes]:
+    """[10, 9, 6, 2, 1] -> b'\\x0a\\x09\\x06\\x02\\x01\\x00'. Empty -> None.
+
+    Longer-than-width lists (never seen in HKJC data) keep the first calls
+    and the last two, which is everything the pace features read."""
+    if not positions:
+        return None
+    pos = [p for p in positions if 0 < p < 256]
+    if len(pos) > RUNNING_POS_WIDTH:
+        pos = pos[:RUNNING_POS_WIDTH - 2] + pos[-2:]
+    return bytes(pos) + b'\x00' * (RUNNING_POS_WIDTH - len(pos))
+
+
+def unpack_running_pos(blob) -> list:
+    """Inverse of pack_running_pos. None -> []."""
+    if blob is None:
+        return []
+    return [b for b in bytes(blob) if b]
+
+
+def running_pos_text_sql(col: str) -> str:
+    """SQL expression turning a running_pos blob back into '10 9 6 2 1'.
+
+    instr() against a 255-byte lookup blob (bytes 1..255) returns a byte's
+    integer value, or 0 for the padding byte."""
+    lut = "X'" + bytes(range(1, 256)).hex().upper() + "'"
+    terms = [
+        f"CASE WHEN instr({lut}, substr({col}, {i}, 1)) > 0 "
+        f"THEN instr({lut}, substr({col}, {i}, 1)) || ' ' ELSE '' END"
+        for i in range(1, RUNNING_POS_WIDTH + 1)
+    ]
+    return f"CASE WHEN {col} IS NULL THEN NULL ELSE rtrim({' || '.join(terms)}) END"
+
+
+def finish_time_text_sql(col: str) -> str:
+    """SQL expression turning finish_time_sec back into 'M:SS.ss'."""
+    mins = f"CAST({col} / 60 AS INTEGER)"
+    return (f"CASE WHEN {col} IS NULL THEN NULL "
+            f"ELSE printf('%d:%05.2f', {mins}, {col} - 60 * {mins}) END")
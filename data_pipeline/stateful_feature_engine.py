@@ -13,6 +13,26 @@ CHANGES FROM v1 (smoke-tested version):
   2. horse_no added to _load_race query and to the snapshot, so the
      execution desk + settlement can map horse_id -> horse_no without
      per-race DB queries.
+  3. OPT-IN STAGE PROFILING. Attach a StageProfiler (engine.profiler) to
+     get cumulative wall time + call counts per stage (_load_race, Elo,
+     Glicko, PageRank edges, freeze_daily_pagerank, pace, human momentum,
+     physical, snapshot_for) and races/sec. Off by default (no overhead
+     beyond a null context per stage).
+  4. PRE-PARSED RESULTS. _load_race reads the normalized runners table;
+     margins (lbw_lengths) and pace inputs (esi_raw, csi_raw) are parsed
+     once at ingest, so replays do no string work.
+  5. OPT-IN STEWARDS' INCIDENT FAMILY (use_incident_features). Per-horse
+     trouble state built from the race_incidents flags tagged at ingest:
+     counts of interference / slow starts / wide runs / keen runs over the
+     last INCIDENT_WINDOW runs, days since the last veterinary finding,
+     career bleeds. Each history is a bounded deque plus running sums, so
+     advancing and snapshotting are O(1) per runner. Non-finishers (which
+     have an incident row but no runners row) advance the state too.
+     Emitted columns: INCIDENT_FEATURES. Off by default: v31 columns only.
+  6. STATE CHECKPOINTS. save_state / load_state pickle the full rating and
+     history state, and snapshot_for_field snapshots a declared field that
+     is not in the database yet (race-day scoring, see
+     backtest_engine/race_day_service.py) without replaying history.
 
 Faithfully replicates the v31 (V12 Matrix) feature engineering:
   MarginAdjustedElo / Glicko-2 / per-day PageRank / SectionalPace /
@@ -20,25 +40,145 @@ Faithfully replicates the v31 (V12 Matrix) feature engineering:
 
 LEAKAGE PROTOCOL (unchanged):
   snapshot_for(race_id) BEFORE advance_race(race_id), race-by-race in
-  chronological order. Snapshots read only prior-race state.
+  chronological order. Snapshots read only prior-race state. Verified
+  end to end (perturbed-future replays) by
+      python3 backtest_engine/leak_safety_audit.py
 """
 
+import os
 import math
+import json
+import time
+import pickle
 import logging
 import sqlite3
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import date
 
 import numpy as np
 import pandas as pd
 import networkx as nx
 
+from race_parsers import parse_lbw, parse_running_pos
+
 log = logging.getLogger(__name__)
 
 HUMAN_BASELINE = 0.083
 
+_NO_STAGE = nullcontext()
+
+# Every query the engine issues (audited by backtest_engine/query_plan_audit.py).
+# Margins and pace inputs come pre-parsed from ingest (runners table); the
+# runners primary key (race_key, finish_position, horse_id) already returns
+# a race in finishing order, so there is no sort.
+LOAD_RACE_SQL = """
+    SELECT r.race_id, r.date_iso, r.race_no, u.horse_id, u.horse_no,
+           u.horse_name, u.finish_position, u.jockey, u.trainer,
+           u.act_wt, u.draw, r.distance, r.course,
+           u.lbw_lengths, u.esi_raw, u.csi_raw, u.win_odds
+    FROM races r JOIN runners u ON u.race_key = r.race_key
+    WHERE r.race_id = ?
+    ORDER BY u.finish_position
+"""
+
+# Incident flags (ingest_v32 race_incidents, tagged by incident_tagger) for
+# one race, finishers and non-finishers alike. Only read in incident mode.
+LOAD_INCIDENTS_SQL = """
+    SELECT horse_id, checked, blocked, hampered, slow_start, wide, keen,
+           bled, lame, heart, respiratory
+    FROM race_incidents
+    WHERE race_id = ?
+"""
+
+# Snapshot columns added when use_incident_features is on.
+INCIDENT_FEATURES = [
+    'rolling_trouble', 'rolling_slow_start', 'rolling_wide', 'rolling_keen',
+    'rolling_incident_runs', 'days_since_vet_finding', 'career_bleeds',
+]
+# Per-run counters kept in the incident window, in this order.
+_INCIDENT_COUNTERS = ('trouble', 'slow_start', 'wide', 'keen', 'reported')
+_NO_INCIDENT = (0, 0, 0, 0, 0)
+
+
+class StageProfiler:
+    """Cumulative wall time and call counts per engine stage.
+
+    Stages are disjoint: snapshot_for excludes its own _load_race call, so
+    the per-stage seconds sum to (roughly) the engine's share of the build.
+    """
+
+    STAGE_ORDER = [
+        'load_race', 'elo', 'glicko', 'pagerank_edges',
+        'freeze_daily_pagerank', 'pace', 'human_momentum', 'physical',
+        'incidents', 'snapshot_for',
+    ]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.n_races = 0
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - t
+            self.calls[name] += 1
+
+    def count_race(self):
+        self.n_races += 1
+
+    def summary(self) -> dict:
+        wall = time.perf_counter() - self._t0
+        names = [n for n in self.STAGE_ORDER if n in self.calls]
+        names += sorted(n for n in self.calls if n not in self.STAGE_ORDER)
+        staged = sum(self.seconds.values())
+        return {
+            'wall_seconds': wall,
+            'n_races': self.n_races,
+            'races_per_sec': (self.n_races / wall) if wall > 0 else 0.0,
+            'staged_seconds': staged,
+            'stages': {
+                n: {
+                    'seconds': self.seconds[n],
+                    'calls': self.calls[n],
+                    'ms_per_call': 1000.0 * self.seconds[n] / self.calls[n],
+                    'share': (self.seconds[n] / staged) if staged > 0 else 0.0,
+                }
+                for n in names
+            },
+        }
+
+    def format_line(self) -> str:
+        s = self.summary()
+        parts = [f"{n}={d['seconds']:.1f}s/{d['share']*100:.0f}%"
+                 for n, d in s['stages'].items()]
+        return (f"{s['races_per_sec']:.1f} races/s | " + " ".join(parts))
+
+    def dump_json(self, path: str, **extra):
+        out = dict(extra)
+        out.update(self.summary())
+        with open(path, 'w') as f:
+            json.dump(out, f, indent=2)
+
 
 class StatefulFeatureEngine:
 
+    # Everything advance_race mutates; save_state / load_state round-trip it.
+    STATE_ATTRS = (
+        'elo', 'g_r', 'g_rd', 'g_vol', 'pr_graph', 'frozen_pr',
+        'pace_hist', 'jockey_hist', 'trainer_hist', 'horse_phys',
+        'incident_hist', 'incident_sums', 'last_vet_day', 'career_bleeds',
+    )
+    STATE_VERSION = 1
+
     ELO_K_BASE     = 20.0
     ELO_INIT       = 1500.0
 
@@ -54,10 +194,15 @@ class StatefulFeatureEngine:
     PACE_WINDOW    = 5
     HUMAN_WINDOW   = 30
 
+    INCIDENT_WINDOW   = 5
+    NO_FINDING_DAYS   = 1000.0    # days_since_vet_finding with no finding yet
+
     def __init__(self, conn: sqlite3.Connection):
         self.conn = conn
         self._race_cache = {}
         self.use_daily_pr_freeze = False   # opt-in per-day PageRank
+        self.use_incident_features = False # opt-in stewards' incident family
+        self.profiler = None               # opt-in StageProfiler
         self.reset()
 
     # =================================================================
@@ -74,55 +219,74 @@ class StatefulFeatureEngine:
         self.jockey_hist = defaultdict(list)
         self.trainer_hist = defaultdict(list)
         self.horse_phys = {}
+        self.incident_hist = {}            # hid -> deque of per-run counters
+        self.incident_sums = {}            # hid -> running sums over the deque
+        self.last_vet_day = {}             # hid -> date ordinal of last finding
+        self.career_bleeds = defaultdict(int)
         log.debug("StatefulFeatureEngine reset.")
 
+    def save_state(self, path: str, **meta) -> None:
+        """Pickle the engine state (STATE_ATTRS) plus caller metadata, e.g.
+        the last advanced race. Written to a temp file and renamed."""
+        blob = {'version': self.STATE_VERSION,
+                'use_daily_pr_freeze': self.use_daily_pr_freeze,
+                'use_incident_features': self.use_incident_features,
+                'meta': meta,
+                'state': {a: getattr(self, a) for a in self.STATE_ATTRS}}
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(blob, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load_state(self, path: str) -> dict:
+        """Restore a save_state checkpoint; returns its metadata."""
+        with open(path, 'rb') as f:
+            blob = pickle.load(f)
+        if blob.get('version') != self.STATE_VERSION:
+            raise ValueError(f"{path}: engine state v{blob.get('version')} "
+                             f"!= v{self.STATE_VERSION}")
+        self.reset()
+        for a, v in blob['state'].items():
+            setattr(self, a, v)
+        self.use_daily_pr_freeze = blob['use_daily_pr_freeze']
+        self.use_incident_features = blob['use_incident_features']
+        self.pr_dirty = True
+        return blob['meta']
+
+    def _stage(self, name: str):
+        if self.profiler is None:
+            return _NO_STAGE
+        return self.profiler.stage(name)
+
     # =================================================================
     # DATA
     # =================================================================
     def _load_race(self, race_id: str) -> pd.DataFrame:
         if race_id in self._race_cache:
             return self._race_cache[race_id]
-        q = """
-            SELECT race_id, date_iso, race_no, horse_id, horse_no, horse_name,
-                   finish_position, jockey, trainer, act_wt, draw,
-                   distance, course, lbw, running_pos, win_odds
-            FROM race_results
-            WHERE race_id = ?
-            ORDER BY finish_position
-        """
-        df = pd.read_sql(q, self.conn, params=(race_id,))
+        with self._stage('load_race'):
+            return self._load_race_uncached(race_id)
+
+    def _load_race_uncached(self, race_id: str) -> pd.DataFrame:
+        df = pd.read_sql(LOAD_RACE_SQL, self.conn, params=(race_id,))
         self._race_cache[race_id] = df
         return df
 
+    def _load_incidents(self, race_id: str) -> dict:
+        """{horse_id: (trouble, slow_start, wide, keen, reported, vet, bled)}
+        for the race's stewards' reports."""
+        out = {}
+        for (hid, checked, blocked, hampered, slow, wide, keen,
+             bled, lame, heart, resp) in self.conn.execute(LOAD_INCIDENTS_SQL, (race_id,)):
+            out[hid] = (int(bool(checked or blocked or hampered)), slow, wide, keen, 1,
+                        bool(bled or lame or heart or resp), bled)
+        return out
+
     # =================================================================
-    # PARSERS (exact v31)
+    # PARSERS (exact v31; ingest stores their output, see race_parsers)
     # =================================================================
-    @staticmethod
-    def _parse_lbw(lbw_str) -> float:
-        if pd.isna(lbw_str) or str(lbw_str).strip() in ['---', '-', '']:
-            return 0.0
-        s = str(lbw_str).strip().upper()
-        if s in ['N', 'NOSE']:  return 0.05
-        if s in ['SH', 'SHD', 'SN']: return 0.1
-        if s in ['HD']: return 0.2
-        if s in ['DH']: return 0.0
-        try:
-            if '-' in s:
-                parts = s.split('-')
-                return float(parts[0]) + (float(parts[1].split('/')[0]) /
-                                          float(parts[1].split('/')[1]))
-            elif '/' in s:
-                return float(s.split('/')[0]) / float(s.split('/')[1])
-            else:
-                return float(s)
-        except Exception:
-            return 0.0
-
-    @staticmethod
-    def _parse_running_pos(pos_string) -> list:
-        if pd.isna(pos_string) or pos_string == '---':
-            return []
-        return [int(x) for x in str(pos_string).split() if x.isdigit()]
+    _parse_lbw = staticmethod(parse_lbw)
+    _parse_running_pos = staticmethod(parse_running_pos)
 
     def _g2_transform(self, r, rd):
         return (r - self.GLICKO_INIT_R) / self.GLICKO_SCALE, rd / self.GLICKO_SCALE
@@ -142,6 +306,10 @@ class StatefulFeatureEngine:
         through the previous day) and store as the frozen snapshot used for
         all of today's races. Call at each day boundary BEFORE snapshotting
         the day's races. This matches v31's per-day groupby behavior."""
+        with self._stage('freeze_daily_pagerank'):
+            self._freeze_daily_pagerank()
+
+    def _freeze_daily_pagerank(self):
         if self.pr_graph.number_of_nodes() == 0:
             self.frozen_pr = {}
             return
@@ -175,7 +343,20 @@ class StatefulFeatureEngine:
         race = self._load_race(race_id)
         if race.empty:
             return pd.DataFrame()
+        with self._stage('snapshot_for'):
+            return self._snapshot_rows(race_id, race)
+
+    def snapshot_for_field(self, race_id: str, field: pd.DataFrame) -> pd.DataFrame:
+        """snapshot_for on a declared field instead of a stored race. field
+        has one row per runner with the LOAD_RACE_SQL columns; result
+        columns (finish_position, lbw_lengths, ...) may be missing/NaN,
+        they are not read by the snapshot."""
+        if field.empty:
+            return pd.DataFrame()
+        with self._stage('snapshot_for'):
+            return self._snapshot_rows(race_id, field)
 
+    def _snapshot_rows(self, race_id: str, race: pd.DataFrame) -> pd.DataFrame:
         pr_now = self._pagerank_snapshot()
 
         esi_vals = {}
@@ -220,8 +401,25 @@ class StatefulFeatureEngine:
                 'career_wins':          phys['career_wins'],
                 'is_turf':              1 if 'TURF' in str(r['course']).upper() else 0,
             })
+            if self.use_incident_features:
+                rows[-1].update(self._incident_snapshot(hid, r['date_iso']))
         return pd.DataFrame(rows)
 
+    def _incident_snapshot(self, horse_id, date_iso):
+        sums = self.incident_sums.get(horse_id, _NO_INCIDENT)
+        last = self.last_vet_day.get(horse_id)
+        days = (float(date.fromisoformat(date_iso).toordinal() - last)
+                if last is not None else self.NO_FINDING_DAYS)
+        return {
+            'rolling_trouble':        float(sums[0]),
+            'rolling_slow_start':     float(sums[1]),
+            'rolling_wide':           float(sums[2]),
+            'rolling_keen':           float(sums[3]),
+            'rolling_incident_runs':  float(sums[4]),
+            'days_since_vet_finding': days,
+            'career_bleeds':          float(self.career_bleeds.get(horse_id, 0)),
+        }
+
     def _rolling_pace(self, horse_id):
         hist = self.pace_hist.get(horse_id, [])
         if not hist:
@@ -284,10 +482,28 @@ class StatefulFeatureEngine:
 
         horses    = race['horse_id'].tolist()
         positions = pd.to_numeric(race['finish_position'], errors='coerce').fillna(99.0).tolist()
-        margins   = race['lbw'].apply(self._parse_lbw).tolist()
-        n = len(horses)
 
-        # ELO
+        with self._stage('elo'):
+            margins = race['lbw_lengths'].tolist()
+            self._advance_elo(horses, positions, margins)
+        with self._stage('glicko'):
+            self._advance_glicko(horses, positions)
+        with self._stage('pagerank_edges'):
+            self._advance_pagerank_edges(horses, positions)
+        with self._stage('pace'):
+            self._advance_pace(race)
+        with self._stage('human_momentum'):
+            self._advance_human(race)
+        with self._stage('physical'):
+            self._advance_physical(race)
+        if self.use_incident_features:
+            with self._stage('incidents'):
+                self._advance_incidents(race_id, race)
+        if self.profiler is not None:
+            self.profiler.count_race()
+
+    def _advance_elo(self, horses, positions, margins):
+        n = len(horses)
         for h in horses:
             self.elo.setdefault(h, self.ELO_INIT)
         if n > 1:
@@ -307,7 +523,9 @@ class StatefulFeatureEngine:
             for h in horses:
                 self.elo[h] += updates[h]
 
-        # GLICKO-2 (faithful to v31, incl. its simplified vol)
+    def _advance_glicko(self, horses, positions):
+        # faithful to v31, incl. its simplified vol
+        n = len(horses)
         for h in horses:
             if h not in self.g_r:
                 self.g_r[h], self.g_rd[h], self.g_vol[h] = (
@@ -340,7 +558,9 @@ class StatefulFeatureEngine:
             for h, d in g_updates.items():
                 self.g_r[h], self.g_rd[h] = d['r'], d['rd']
 
-        # PAGERANK GRAPH (edges added per-race; PR recomputed per-day in freeze mode)
+    def _advance_pagerank_edges(self, horses, positions):
+        # edges added per-race; PR recomputed per-day in freeze mode
+        n = len(horses)
         if n > 1:
             for i in range(n):
                 for j in range(n):
@@ -355,14 +575,12 @@ class StatefulFeatureEngine:
                             self.pr_graph.add_edge(loser, winner, weight=1.0)
             self.pr_dirty = True
 
-        # PACE HISTORY
-        for _, r in race.iterrows():
-            pos = self._parse_running_pos(r['running_pos'])
-            raw_esi = (1.0 / math.sqrt(pos[0])) if (len(pos) > 0 and pos[0] > 0) else np.nan
-            raw_csi = (pos[-2] - pos[-1]) if len(pos) >= 2 else 0
-            self.pace_hist[r['horse_id']].append((raw_esi, raw_csi))
+    def _advance_pace(self, race):
+        for hid, raw_esi, raw_csi in zip(race['horse_id'], race['esi_raw'],
+                                         race['csi_raw']):
+            self.pace_hist[hid].append((raw_esi, raw_csi))
 
-        # HUMAN MOMENTUM
+    def _advance_human(self, race):
         for _, r in race.iterrows():
             is_win = 1 if pd.to_numeric(r['finish_position'], errors='coerce') == 1 else 0
             if r['jockey'] is not None and str(r['jockey']).strip():
@@ -370,7 +588,7 @@ class StatefulFeatureEngine:
             if r['trainer'] is not None and str(r['trainer']).strip():
                 self.trainer_hist[r['trainer']].append(is_win)
 
-        # PHYSICAL
+    def _advance_physical(self, race):
         for _, r in race.iterrows():
             hid = r['horse_id']
             cur_date = pd.to_datetime(r['date_iso'])
@@ -384,3 +602,32 @@ class StatefulFeatureEngine:
                 'last_distance': cur_dist,
                 'wins': prev.get('wins', 0) + is_win,
             }
+
+    def _advance_incidents(self, race_id, race):
+        """Push one run per horse into its incident window: every finisher
+        (zeros when the stewards did not mention it) plus non-finishers that
+        only appear in race_incidents. Running sums make this O(1) a horse."""
+        incidents = self._load_incidents(race_id)
+        day = date.fromisoformat(race['date_iso'].iat[0]).toordinal()
+        horses = race['horse_id'].tolist()
+        seen = set(horses)
+        horses += [h for h in incidents if h not in seen]
+        for hid in horses:
+            inc = incidents.get(hid)
+            run = inc[:5] if inc is not None else _NO_INCIDENT
+            hist = self.incident_hist.get(hid)
+            if hist is None:
+                hist = self.incident_hist[hid] = deque(maxlen=self.INCIDENT_WINDOW)
+                self.incident_sums[hid] = [0] * len(_INCIDENT_COUNTERS)
+            sums = self.incident_sums[hid]
+            if len(hist) == hist.maxlen:
+                for k, v in enumerate(hist[0]):
+                    sums[k] -= v
+            hist.append(run)
+            for k, v in enumerate(run):
+                sums[k] += v
+            if inc is not None:
+                if inc[5]:
+                    self.last_vet_day[hid] = day
+                if inc[6]:
+                    self.career_bleeds[hid] += 1
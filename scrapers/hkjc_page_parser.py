@@ -0,0 +1,606 @@
+"""
+HKJC LocalResults page parser — HTTP + lxml backend
+====================================================
+LocalResults pages are server-rendered, so the v3.2 scraper does not need
+a browser to read them: one HTTP GET plus one lxml parse replaces the
+hundreds of WebDriver round trips (find_elements per row, .text per cell)
+a Selenium page costs.
+
+The extraction RULES (header regexes, the dividend rowspan state machine,
+the incident-table heuristic) live here once and are shared with the
+Selenium extractors in race_data_scraper_v3_2; each backend only supplies
+element text. element_text() reproduces WebDriver's visible text (block
+elements and <br> break lines, table cells are space-separated, runs of
+whitespace collapse, &nbsp; becomes a space), so both backends should
+produce the same CSV rows. That is only verified once real pages are
+saved (--save) and recorded with Selenium (--record) into
+data/html_fixtures; until then the scraper's default backend is Selenium.
+
+The Selenium backend can use this parser too (PARSE_PAGE_SOURCE in
+race_data_scraper_v3_2: one driver.page_source grab per race page instead
+of querying elements over WebDriver). It still reads element by element
+until real recorded pages show the two extractions agree.
+
+A page "needs JS" (needs_js) when the HTTP response has no body, or has
+the race info table but no result rows; the scraper then reloads that
+meeting with Selenium.
+
+Fixture check (run from project root, offline). The committed set is
+hand-made: sample pages in the LocalResults layout (a normal race, refund
+dividends, the incident table, an abandoned race, a no-races date) with
+expected extractions written from their visible content. It is a
+regression check on the parser rules, not evidence of parity with HKJC
+pages or WebDriver .text; real pages saved and recorded with the commands
+below go in the same directory and are checked the same way:
+    python3 scrapers/hkjc_page_parser.py                                          # lxml vs expected
+    python3 scrapers/hkjc_page_parser.py --save 01/01/2025 --fixtures data/html_fixtures
+    python3 scrapers/hkjc_page_parser.py --record --fixtures data/html_fixtures   # Selenium
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import lxml.html
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "data", "html_fixtures")
+
+# ---------------------------------------------------------------------
+# Page structure (shared by both backends)
+# ---------------------------------------------------------------------
+SAME_DAY_XPATH = "//div[2]/table/tbody/tr/td/a"
+ROW_XPATH      = "//div[5]/table/tbody/tr"
+INFO_XPATH     = "//div[4]/table"
+BD_TABLE_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' table_bd ')]"
+
+TARGET_POOLS = [
+    "QUINELLA PLACE", "QUINELLA", "TIERCE", "QUARTET",
+    "FIRST 4", "TRIO", "PLACE", "WIN",
+]
+
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive'
+}
+
+
+# ---------------------------------------------------------------------
+# Extraction rules (operate on text only)
+# ---------------------------------------------------------------------
+def parse_horse_id_from_text(text):
+    """'FLYING AMANI (K152)' -> ('FLYING AMANI', 'K152')."""
+    m = re.match(r'^\s*(.+?)\s*\(([A-Z0-9]{3,5})\)\s*$', str(text))
+    if m:
+        return m.group(1).strip(), m.group(2).strip()
+    return str(text).strip(), ""
+
+
+def match_pool(pool_cell_text):
+    s = pool_cell_text.upper().strip()
+    if not s:
+        return None
+    for p in TARGET_POOLS:
+        if p in s:
+            return p
+    return None
+
+
+def parse_race_headers(info_text):
+    """Race name / going / course / distance / class / prize from the
+    visible text of the race info table."""
+    out = {"race_name": "", "going": "", "course": "",
+           "distance": "", "race_class": "", "prize": ""}
+
+    m = re.search(r'(RACE\s+\d+.*?(?=\n|Going|Course|$))', info_text, re.I)
+    if m: out["race_name"] = m.group(1).strip()
+
+    m = re.search(r'Going\s*:\s*([^\n]+)', info_text)
+    if m: out["going"] = m.group(1).strip()
+
+    m = re.search(r'Course\s*:\s*([^\n]+)', info_text)
+    if m: out["course"] = m.group(1).strip()
+
+    for pattern in [
+        r'(\d{1,2},?\d{3})\s*M(?:etres?)?\b',
+        r'(\d{3,4})\s*M(?:etres?)?\b',
+        r'(\d{3,4})\s*m(?:etres?)?\b',
+    ]:
+        m = re.search(pattern, info_text)
+        if m:
+            out["distance"] = m.group(1).replace(",", "")
+            break
+
+    m = re.search(r'(Class\s+\d+|Group\s+\d+|Griffin|Restricted)', info_text, re.I)
+    if m: out["race_class"] = m.group(1).strip()
+
+    m = re.search(r'HK\$?\s*([\d,]+)', info_text)
+    if m: out["prize"] = m.group(1).replace(",", "")
+    return out
+
+
+def is_dividend_table(table_text):
+    txt = table_text.upper()
+    return any(p in txt for p in TARGET_POOLS)
+
+
+def dividends_from_rows(rows):
+    """v3.1 dividend extractor — proper rowspan state machine, over the
+    cell texts of each <tr> of one dividend table.
+
+    HKJC structure:
+      Header row:        3 cells [pool_name, combo, dividend]
+      Continuation row:  2 cells [combo, dividend]  (pool consumed by rowspan)
+      Non-target pool:   3 cells with unrecognized pool name → reset state
+    """
+    out = []
+    last_seen_pool = None
+    for cells in rows:
+        n = len(cells)
+
+        if n >= 3:
+            candidate = match_pool(cells[0])
+            if candidate is not None:
+                last_seen_pool = candidate
+                combo_idx = 1
+            else:
+                last_seen_pool = None
+                continue
+        elif n == 2:
+            if last_seen_pool is None:
+                continue
+            combo_idx = 0
+        else:
+            continue
+
+        combo = cells[combo_idx].strip()
+        raw   = cells[-1].strip()
+
+        if 'REFUND' in raw.upper():
+            out.append({
+                "pool":      last_seen_pool,
+                "combo":     combo,
+                "dividend":  None,
+                "is_refund": 1,
+            })
+            continue
+
+        m = re.search(r'\d{1,3}(?:,\d{3})*(?:\.\d+)?', raw)
+        if not m:
+            continue
+
+        out.append({
+            "pool":      last_seen_pool,
+            "combo":     combo,
+            "dividend":  float(m.group(0).replace(",", "")),
+            "is_refund": 0,
+        })
+    return out
+
+
+def is_incident_table(table_text):
+    """The Racing Incident Report table has 'Incident' in its header line
+    and none of the result / dividend table keywords."""
+    first_line = table_text.split('\n')[0].lower() if table_text else ""
+    if 'incident' not in first_line:
+        return False
+    if 'jockey' in first_line or 'dividend' in first_line:
+        return False
+    if 'pool' in first_line:
+        return False
+    return True
+
+
+def incidents_from_rows(rows):
+    """[Pla., Horse No., Horse, Incident] cell texts -> incident dicts."""
+    out = []
+    for cells in rows:
+        if len(cells) < 4:
+            continue  # header row or malformed
+
+        placing = cells[0].strip()
+        horse_no = cells[1].strip()
+        horse_raw = cells[2].strip()
+        incident_text = cells[3].strip()
+
+        # Skip if it doesn't look like a horse row (header rows
+        # have non-numeric placing)
+        if not placing or not re.match(r'^\d+', placing):
+            continue
+
+        horse_name, horse_id = parse_horse_id_from_text(horse_raw)
+
+        out.append({
+            "placing":       placing,
+            "horse_no":      horse_no,
+            "horse_name":    horse_name,
+            "horse_id":      horse_id,
+            "incident_text": incident_text,
+        })
+    return out
+
+
+# ---------------------------------------------------------------------
+# lxml backend
+# ---------------------------------------------------------------------
+_BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'caption', 'center',
+    'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer',
+    'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li',
+    'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'tfoot',
+    'thead', 'tr', 'ul',
+}
+_SKIP_TAGS = {'script', 'style', 'noscript', 'head', 'template', 'title'}
+_CELL_TAGS = {'td', 'th'}
+_HIDDEN_STYLE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden', re.I)
+_WS = re.compile(r'[ \t\r\n\f\v\xa0]+')
+
+
+def _hidden(el) -> bool:
+    return el.get('hidden') is not None or bool(_HIDDEN_STYLE.search(el.get('style') or ''))
+
+
+def _walk_text(el, out: list):
+    tag = el.tag if isinstance(el.tag, str) else None
+    if tag is None or tag in _SKIP_TAGS or _hidden(el):
+        return
+    if tag == 'br':
+        out.append('\n')
+        return
+    block = tag in _BLOCK_TAGS
+    if block:
+        out.append('\n')
+    elif tag in _CELL_TAGS:
+        out.append(' ')
+    if el.text:
+        out.append(_WS.sub(' ', el.text))
+    for child in el:
+        _walk_text(child, out)
+        if child.tail:
+            out.append(_WS.sub(' ', child.tail))
+    if block:
+        out.append('\n')
+    elif tag in _CELL_TAGS:
+        out.append(' ')
+
+
+def element_text(el) -> str:
+    """WebDriver-style visible text of an element."""
+    out = []
+    _walk_text(el, out)
+    lines = (re.sub(' +', ' ', ln).strip() for ln in ''.join(out).split('\n'))
+    return '\n'.join(ln for ln in lines if ln)
+
+
+def _ensure_tbody(doc):
+    """Browsers wrap a table's direct <tr> children in <tbody>; lxml does
+    not. Do the same so the Selenium XPaths apply unchanged."""
+    for table in doc.iter('table'):
+        direct = [c for c in table if c.tag == 'tr']
+        if not direct:
+            continue
+        tbody = lxml.html.Element('tbody')
+        table.insert(table.index(direct[0]), tbody)
+        for tr in direct:
+            tbody.append(tr)
+
+
+def parse_html(html, url: str):
+    """Parse one page; hrefs are made absolute against url."""
+    doc = lxml.html.fromstring(html)
+    doc.make_links_absolute(url, resolve_base_href=True)
+    _ensure_tbody(doc)
+    return doc
+
+
+def _cells(tr) -> list:
+    return [element_text(td) for td in tr.iter('td')]
+
+
+def page_has_races(doc) -> bool:
+    return bool(doc.xpath(ROW_XPATH)) and bool(doc.xpath(INFO_XPATH))
+
+
+def page_is_abandoned(doc) -> bool:
+    body = doc.find('.//body')
+    return body is not None and "declared abandoned" in element_text(body).lower()
+
+
+def needs_js(doc) -> bool:
+    """True if the static HTML cannot be trusted to match the rendered
+    page: no body at all, or the info table without its result rows."""
+    if doc.find('.//body') is None:
+        return True
+    return bool(doc.xpath(INFO_XPATH)) and not doc.xpath(ROW_XPATH)
+
+
+def same_day_links(doc) -> list:
+    out = []
+    for a in doc.xpath(SAME_DAY_XPATH):
+        href = a.get("href")
+        if not href or "RaceNo=" not in href:
+            continue
+        if '/overseas/' in href.lower():
+            continue
+        out.append(href)
+    return out
+
+
+def extract_race_headers(doc):
+    info = doc.xpath(INFO_XPATH)
+    if not info:
+        log.warning("Header extraction failed: no race info table")
+        return parse_race_headers("")
+    return parse_race_headers(element_text(info[0]))
+
+
+def extract_dividends(doc):
+    out = []
+    for table in doc.xpath(BD_TABLE_XPATH):
+        if not is_dividend_table(element_text(table)):
+            continue
+        out.extend(dividends_from_rows(_cells(tr) for tr in table.iter('tr')))
+    return out
+
+
+def extract_incidents(doc):
+    for table in doc.xpath(BD_TABLE_XPATH):
+        if is_incident_table(element_text(table)):
+            return incidents_from_rows(_cells(tr) for tr in table.iter('tr'))
+    return []
+
+
+def extract_result_rows(doc):
+    """Result table rows as lists of cell texts."""
+    return [_cells(tr) for tr in doc.xpath(ROW_XPATH)]
+
+
+def read_page(doc, url: str) -> dict:
+    """Everything the scraper takes from one race page."""
+    return {
+        "url":       url,
+        "abandoned": page_is_abandoned(doc),
+        "hdr":       extract_race_headers(doc),
+        "divs":      extract_dividends(doc),
+        "incidents": extract_incidents(doc),
+        "rows":      extract_result_rows(doc),
+    }
+
+
+class HttpFetcher:
+    """requests.Session wrapper with the browser-like HKJC headers."""
+
+    def __init__(self, timeout: float = 30.0):
+        import requests
+        self.session = requests.Session()
+        self.session.headers.update(HTTP_HEADERS)
+        self.timeout = timeout
+
+    def fetch(self, url: str):
+        """-> (final_url, html text)."""
+        res = self.session.get(url, timeout=self.timeout)
+        res.raise_for_status()
+        return res.url, res.text
+
+    def close(self):
+        self.session.close()
+
+
+# ---------------------------------------------------------------------
+# Meeting rows and CSV output
+# ---------------------------------------------------------------------
+CSV_FILES = (('incidents', 'incidents'), ('divs', 'dividends'),
+             ('meta', 'metadata'), ('races', 'races'))   # races LAST
+
+
+def race_no_from_url(url):
+    try:
+        q = parse_qs(urlparse(url).query)
+        rn = q.get("RaceNo", ["1"])[0]
+        return str(int(rn))
+    except Exception:
+        return "1"
+
+
+def new_meeting():
+    """CSV row lists for one meeting, plus its raw pages for the archive
+    and the number of abandoned races."""
+    return {'races': [], 'divs': [], 'meta': [], 'incidents': [], 'pages': [],
+            'n_abandoned': 0}
+
+
+def add_race(out, meet, page, html=None, tag="", on_failure=None):
+    """Append one race page's rows (read_page output) to the meeting.
+    html, if given, is kept in out['pages']; on_failure(meet, url, reason)
+    is called for a non-abandoned race with no name."""
+    race_no = race_no_from_url(page["url"])
+    hdr     = page["hdr"]
+
+    if html is not None:
+        out['pages'].append({"url": page["url"], "html": html})
+    out['n_abandoned'] += bool(page["abandoned"])
+
+    out['meta'].append({
+        "date":       meet,
+        "race_no":    race_no,
+        "race_name":  hdr["race_name"],
+        "going":      hdr["going"],
+        "course":     hdr["course"],
+        "distance":   hdr["distance"],
+        "race_class": hdr["race_class"],
+        "prize":      hdr["prize"],
+        "url":        page["url"],
+    })
+
+    for cells in page["rows"]:
+        out['races'].append([hdr["race_name"], hdr["going"], hdr["course"]] + cells)
+
+    for d in page["divs"]:
+        out['divs'].append({
+            "date":      meet,
+            "race_no":   race_no,
+            "race_name": hdr["race_name"],
+            "pool":      d["pool"],
+            "combo":     d["combo"],
+            "dividend":  d["dividend"],
+            "is_refund": d["is_refund"],
+        })
+
+    for inc in page["incidents"]:
+        out['incidents'].append({
+            "date":          meet,
+            "race_no":       race_no,
+            "race_name":     hdr["race_name"],
+            "placing":       inc["placing"],
+            "horse_no":      inc["horse_no"],
+            "horse_name":    inc["horse_name"],
+            "horse_id":      inc["horse_id"],
+            "incident_text": inc["incident_text"],
+        })
+
+    if not hdr["race_name"] and not page["abandoned"] and on_failure is not None:
+        on_failure(meet, page["url"], "empty_race_name")
+
+    status = "ABANDONED" if page["abandoned"] else f"{len(page['rows'])} horses"
+    log.info(f"  {tag}R{race_no}: {hdr['race_name']} | "
+             f"{status} | {len(page['divs'])} dividends | "
+             f"{len(page['incidents'])} incidents")
+
+
+def _atomic_to_csv(df, path):
+    """Write to a temp file in the same directory, then rename over path,
+    so readers (ingest) never see a half-written CSV."""
+    tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def write_meeting_csvs(out_dir, n, rows):
+    """Write meeting N's CSVs atomically. races{N}.csv goes LAST: its
+    presence marks the meeting's file set as complete. A file left over
+    from an earlier scrape of N with no rows now is removed, so a
+    re-scrape replaces the whole set."""
+    for key, name in CSV_FILES:
+        path = os.path.join(out_dir, f"{name}{n}.csv")
+        if rows[key]:
+            _atomic_to_csv(pd.DataFrame(rows[key]), path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+# ---------------------------------------------------------------------
+# Fixture parity check
+# ---------------------------------------------------------------------
+def _fixture_pages(fixtures_dir):
+    return sorted(Path(fixtures_dir).glob("*.html"))
+
+
+def save_fixtures(dates, fixtures_dir, base_url):
+    """Fetch every race page of each meeting date into fixtures_dir."""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    fetcher = HttpFetcher()
+    try:
+        for meet in dates:
+            url, html = fetcher.fetch(base_url + meet)
+            urls = [url] + same_day_links(parse_html(html, url))
+            for i, u in enumerate(urls):
+                if i:
+                    time.sleep(1)
+                res = fetcher.session.get(u, timeout=fetcher.timeout)
+                res.raise_for_status()
+                rn = re.search(r'RaceNo=(\d+)', res.url)
+                name = f"{meet.replace('/', '')}_R{rn.group(1) if rn else 1}.html"
+                Path(fixtures_dir, name).write_bytes(res.content)
+                log.info(f"saved {name}")
+    finally:
+        fetcher.close()
+
+
+def _comparable(page: dict) -> dict:
+    # JSON round trip so tuples / lists and float reprs compare equal; the
+    # url is the fixture's own file URI, not something the page yields
+    page = {k: v for k, v in page.items() if k != "url"}
+    return json.loads(json.dumps(page, sort_keys=True))
+
+
+def record_fixtures(fixtures_dir):
+    """Expected output per fixture, extracted by the Selenium backend."""
+    import race_data_scraper_v3_2 as v32
+    driver = v32.init_driver()
+    try:
+        for path in _fixture_pages(fixtures_dir):
+            uri = path.resolve().as_uri()
+            driver.get(uri)
+            page = _comparable(v32.read_page_webdriver(driver))
+            path.with_suffix(".json").write_text(json.dumps(page, indent=1, sort_keys=True))
+            log.info(f"recorded {path.name}")
+    finally:
+        driver.quit()
+
+
+def check_fixtures(fixtures_dir=FIXTURES_DIR) -> int:
+    """Parse every fixture with lxml and diff against its expected
+    extraction (.json). Returns the number of mismatching pages (1 if
+    nothing was checked)."""
+    bad = n = 0
+    for path in _fixture_pages(fixtures_dir):
+        expected_path = path.with_suffix(".json")
+        if not expected_path.exists():
+            log.warning(f"[skip] {path.name}: no expected extraction (run --record)")
+            continue
+        n += 1
+        uri = path.resolve().as_uri()
+        got = _comparable(read_page(parse_html(path.read_bytes(), uri), uri))
+        expected = json.loads(expected_path.read_text())
+        diffs = [k for k in expected if got.get(k) != expected[k]]
+        if diffs:
+            bad += 1
+            log.error(f"[FAIL] {path.name}: {', '.join(diffs)} differ")
+            for k in diffs:
+                log.error(f"    expected: {expected[k]!r}")
+                log.error(f"    lxml:     {got.get(k)!r}")
+        else:
+            log.info(f"[  ok] {path.name}: {len(got['rows'])} rows, "
+                     f"{len(got['divs'])} dividends, {len(got['incidents'])} incidents")
+    if not n:
+        log.error(f"no fixtures with an expected extraction in {fixtures_dir}")
+        return 1
+    log.info(f"{n - bad}/{n} fixtures match")
+    return bad
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    ap = argparse.ArgumentParser(
+        description="check the lxml parser against the expected extractions of saved pages "
+                    "(--save / --record capture real HKJC pages and their Selenium extraction)")
+    ap.add_argument('--fixtures', default=FIXTURES_DIR)
+    ap.add_argument('--save', nargs='+', metavar='DD/MM/YYYY',
+                    help="fetch these meetings' race pages into --fixtures")
+    ap.add_argument('--record', action='store_true',
+                    help="record the Selenium extraction of every fixture")
+    args = ap.parse_args()
+
+    if args.save:
+        from race_data_scraper_v3_2 import BASE_URL
+        save_fixtures(args.save, args.fixtures, BASE_URL)
+    elif args.record:
+        record_fixtures(args.fixtures)
+    else:
+        sys.exit(1 if check_fixtures(args.fixtures) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+HKJC Meeting Calendar — real race dates instead of Wed/Sat/Sun probing
+======================================================================
+get_hkjc_likely_race_dates yields every Wednesday, Saturday and Sunday
+since 2011 (~2,300 dates), and roughly half of them load a "no races"
+page. The LocalResults page already carries the answer: its race-date
+selector lists actual meeting dates. This module harvests
+those dates over HTTP (one page per step, walking back from the latest
+meeting through the earliest date each page lists), seeds them with the
+dates already present in data/raw_csvs/metadata*.csv, and caches the
+result in data/raw_csvs/meeting_calendar.json.
+
+Coverage: the cache records the contiguous range [covered_from,
+covered_to] its harvested pages span. Inside that range only harvested
+dates are meetings; outside it (history the site's navigation never
+reaches) candidate_dates() falls back to Wed/Sat/Sun probing, so nothing
+is skipped that the old scraper would have found. Coverage never spans a
+gap between known dates longer than an off-season (MAX_GAP_DAYS); the
+dates below such a gap are probed.
+
+Run from project root:
+    python3 scrapers/meeting_calendar.py                 # refresh + summary
+    python3 scrapers/meeting_calendar.py --start 01/09/2011
+"""
+
+import os
+import re
+import glob
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+import hkjc_page_parser as hp
+
+log = logging.getLogger(__name__)
+
+BASE_URL = "https://racing.hkjc.com/racing/information/English/racing/LocalResults.aspx?RaceDate="
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+RAW_CSV_DIR   = os.path.join(_PROJECT_ROOT, "data", "raw_csvs")
+CALENDAR_FILE = os.path.join(RAW_CSV_DIR, "meeting_calendar.json")
+
+MAX_GAP_DAYS = 90      # longer than the summer break between seasons
+
+_ISO_YMD = re.compile(r'(?<!\d)(\d{4})[/-](\d{2})[/-](\d{2})(?!\d)')
+_DMY     = re.compile(r'(?<!\d)(\d{2})/(\d{2})/(\d{4})(?!\d)')
+
+
+def get_hkjc_likely_race_dates(start_date_str, end_date_str):
+    start = datetime.strptime(start_date_str, "%d/%m/%Y")
+    end   = datetime.strptime(end_date_str,   "%d/%m/%Y")
+    dates = []
+    cur = end
+    while cur >= start:
+        if cur.weekday() in (2, 5, 6):
+            dates.append(cur.strftime("%d/%m/%Y"))
+        cur -= timedelta(days=1)
+    return dates
+
+
+def to_iso(meet: str) -> str:
+    return datetime.strptime(meet, "%d/%m/%Y").strftime("%Y-%m-%d")
+
+
+def to_meet(iso: str) -> str:
+    return datetime.strptime(iso, "%Y-%m-%d").strftime("%d/%m/%Y")
+
+
+def _dates_in(text: str) -> set:
+    out = set()
+    for y, m, d in _ISO_YMD.findall(text):
+        out.add(f"{y}-{m}-{d}")
+    for d, m, y in _DMY.findall(text):
+        out.add(f"{y}-{m}-{d}")
+    valid = set()
+    for iso in out:
+        try:
+            datetime.strptime(iso, "%Y-%m-%d")
+            valid.add(iso)
+        except ValueError:
+            pass
+    return valid
+
+
+def harvest_dates(doc) -> set:
+    """ISO meeting dates listed in a LocalResults page's race-date
+    <select>. Other RaceDate= links on the page (news, past results) can
+    point anywhere in history and are not a date list."""
+    found = set()
+    for select in doc.iter('select'):
+        for opt in select.iter('option'):
+            found |= _dates_in((opt.get('value') or '') + ' ' + (opt.text or ''))
+    return found
+
+
+def _days(lo: str, hi: str) -> int:
+    return (datetime.strptime(hi, "%Y-%m-%d") - datetime.strptime(lo, "%Y-%m-%d")).days
+
+
+def contiguous_low(dates, top: str) -> str:
+    """Walking down from top through dates, the earliest one reached
+    before a gap longer than MAX_GAP_DAYS."""
+    lo = top
+    for iso in sorted((d for d in dates if d <= top), reverse=True):
+        if _days(iso, lo) > MAX_GAP_DAYS:
+            break
+        lo = iso
+    return lo
+
+
+def scraped_dates(raw_dir: str = RAW_CSV_DIR) -> set:
+    """ISO dates of meetings already in metadata{N}.csv (date = DD/MM/YYYY)."""
+    out = set()
+    for path in glob.glob(os.path.join(raw_dir, "metadata*.csv")):
+        try:
+            dates = pd.read_csv(path, usecols=['date'], dtype=str)['date'].dropna().unique()
+        except (ValueError, pd.errors.EmptyDataError):
+            continue
+        for meet in dates:
+            try:
+                out.add(to_iso(meet))
+            except ValueError:
+                pass
+    return out
+
+
+class MeetingCalendar:
+    """Cached set of known HKJC meeting dates plus the range it covers."""
+
+    def __init__(self, path: str = CALENDAR_FILE):
+        self.path = path
+        self.dates: set = set()
+        self.covered_from: Optional[str] = None
+        self.covered_to: Optional[str] = None
+        self.updated_at: Optional[str] = None
+        if os.path.exists(path):
+            with open(path) as f:
+                d = json.load(f)
+            self.dates = set(d.get("dates", []))
+            self.covered_from = d.get("covered_from")
+            self.covered_to = d.get("covered_to")
+            self.updated_at = d.get("updated_at")
+            self.trim_coverage()
+
+    def cover(self, lo: str, hi: str):
+        self.covered_from = min(filter(None, [self.covered_from, lo]))
+        self.covered_to = max(filter(None, [self.covered_to, hi]))
+
+    def trim_coverage(self):
+        """Raise covered_from to the first over-long gap between known
+        dates below covered_to (caches built before the gap check)."""
+        if self.covered_from is None:
+            return
+        inside = [d for d in self.dates if self.covered_from <= d <= self.covered_to]
+        if not inside:
+            self.covered_from = self.covered_to = None
+            return
+        self.covered_from = max(self.covered_from, contiguous_low(inside, max(inside)))
+
+    def is_meeting(self, meet: str) -> Optional[bool]:
+        """True / False inside the covered range, None (unknown) outside."""
+        iso = to_iso(meet)
+        if iso in self.dates:
+            return True
+        if self.covered_from and self.covered_from <= iso <= self.covered_to:
+            return False
+        return None
+
+    def save(self):
+        self.updated_at = datetime.now().isoformat(timespec='seconds')
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"covered_from": self.covered_from, "covered_to": self.covered_to,
+                       "updated_at": self.updated_at, "n_dates": len(self.dates),
+                       "dates": sorted(self.dates)}, f, indent=0)
+        os.replace(tmp, self.path)
+
+
+def refresh_calendar(cal: MeetingCalendar, start_meet: str, fetcher=None,
+                     max_pages: int = 200, pause: float = 1.0) -> int:
+    """Harvest meeting dates over HTTP into cal. Starts at the latest
+    results page and steps to the page of the earliest date seen so far
+    until this run's span overlaps the cached coverage, then continues
+    below the cached coverage until start is reached or the site lists
+    nothing earlier. Returns pages fetched."""
+    own = fetcher is None
+    fetcher = fetcher or hp.HttpFetcher()
+    start_iso = to_iso(start_meet)
+    span_hi = datetime.now().strftime("%Y-%m-%d")   # latest page vouches up to today
+    span_lo = None
+    cal.dates |= scraped_dates()
+    pages = 0
+    url = BASE_URL
+    try:
+        while pages < max_pages:
+            if pages:
+                time.sleep(pause)
+            final_url, html = fetcher.fetch(url)
+            pages += 1
+            found = harvest_dates(hp.parse_html(html, final_url))
+            if not found:
+                break
+            cal.dates |= found
+            lo = contiguous_low(found, span_lo or max(found))
+            if span_lo is not None and lo >= span_lo:
+                if min(found) < span_lo:
+                    log.info(f"Meeting calendar: gap of over {MAX_GAP_DAYS} days below "
+                             f"{span_lo}; earlier dates are probed")
+                break                       # navigation reaches no further back
+            span_lo = lo
+            if cal.covered_to is None or span_lo <= cal.covered_to:
+                cal.cover(span_lo, span_hi)
+                span_lo = cal.covered_from      # the run's span joins the cached one
+                if cal.covered_from <= start_iso:
+                    break
+                next_url = BASE_URL + to_meet(cal.covered_from)
+            else:
+                next_url = BASE_URL + to_meet(span_lo)
+            if next_url == url:
+                break
+            url = next_url
+    finally:
+        if own:
+            fetcher.close()
+    cal.save()
+    return pages
+
+
+def load_calendar(refresh: bool = True, start_meet: str = "01/09/2011") -> MeetingCalendar:
+    """The cached calendar, refreshed over HTTP unless refresh=False. A
+    failed refresh keeps the cache (and probing covers the gap)."""
+    cal = MeetingCalendar()
+    if refresh:
+        try:
+            n = refresh_calendar(cal, start_meet)
+            log.info(f"Meeting calendar: {len(cal.dates)} dates, covering "
+                     f"{cal.covered_from} → {cal.covered_to} ({n} pages fetched)")
+        except Exception as e:
+            log.warning(f"Meeting calendar refresh failed ({e}); using cache")
+    return cal
+
+
+def candidate_dates(start_meet: str, end_meet: str, cal: MeetingCalendar) -> list:
+    """Dates to scrape, newest first (same order as
+    get_hkjc_likely_race_dates): known meetings inside the calendar's
+    coverage, Wed/Sat/Sun probes outside it."""
+    out = []
+    start_iso, end_iso = to_iso(start_meet), to_iso(end_meet)
+    for meet in get_hkjc_likely_race_dates(start_meet, end_meet):
+        if cal.is_meeting(meet) is not False:
+            out.append(meet)
+    known = {to_meet(d) for d in cal.dates if start_iso <= d <= end_iso}
+    out_set = set(out)
+    out += [m for m in known if m not in out_set]      # non-Wed/Sat/Sun meetings
+    return sorted(out, key=to_iso, reverse=True)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ap = argparse.ArgumentParser(description="Build / refresh the HKJC meeting calendar cache")
+    ap.add_argument('--start', default="01/09/2011")
+    ap.add_argument('--end', default=datetime.now().strftime("%d/%m/%Y"))
+    ap.add_argument('--no-refresh', action='store_true', help="report on the cache only")
+    args = ap.parse_args()
+
+    cal = load_calendar(refresh=not args.no_refresh, start_meet=args.start)
+    probes = get_hkjc_likely_race_dates(args.start, args.end)
+    todo = candidate_dates(args.start, args.end, cal)
+    log.info(f"{args.start} → {args.end}: {len(todo)} dates to load instead of "
+             f"{len(probes)} Wed/Sat/Sun probes "
+             f"({sum(cal.is_meeting(m) is None for m in todo)} still probed)")
+
+
+if __name__ == "__main__":
+    main()
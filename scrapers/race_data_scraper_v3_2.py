@@ -19,22 +19,69 @@ Outputs per meeting:
   - incidents{N}.csv  — NEW: per-horse incident narratives
        columns: date, race_no, race_name, horse_no, horse_name, horse_id,
                 placing, incident_text
+
+JOB MANIFEST: which dates are done lives in scrape_manifest.db
+(scrape_manifest.py), one row per date with state pending / ok / empty /
+failed / abandoned. Failures are retried with backoff instead of being
+marked processed; --requeue re-scrapes given dates (gap fills, targeted
+re-scrapes) in place under their existing meeting numbers.
+
+WORKER-POOL MODE: --workers N runs N scraper workers, each pulling due
+dates from a shared queue. All page loads go through one token-bucket
+rate limiter (--rate, page loads/s across all workers), meeting files are
+written atomically (temp file + rename, races{N}.csv last) and numbered
+from MAX(existing)+1.
+
+HTTP FAST PATH (--backend http, opt-in): pages are fetched with requests
+and parsed with lxml (hkjc_page_parser); a meeting is reloaded in Chrome
+only if one of its pages needs JavaScript. Selenium (--backend selenium)
+stays the default until real LocalResults pages saved with
+`hkjc_page_parser.py --save` and recorded with `--record` are committed
+to data/html_fixtures and the lxml parser matches them. An http run
+first re-checks the parser against the expected extractions in
+data/html_fixtures and uses Selenium if any of them no longer match.
+
+RAW PAGE ARCHIVE: every scraped meeting's raw HTML is kept in data/raw_pages
+(raw_page_archive.py), so a parser fix is applied with an offline
+`raw_page_archive.py reparse` instead of a re-scrape (--no-archive to skip).
+
+DATE DISCOVERY: candidate dates come from the meeting calendar
+(meeting_calendar.py: dates harvested from the results pages' own date
+navigation, cached in data/raw_csvs/meeting_calendar.json) instead of
+every Wed/Sat/Sun; --probe-all-dates restores blind probing.
+
+Run from project root:
+    python3 scrapers/race_data_scraper_v3_2.py                       # serial
+    python3 scrapers/race_data_scraper_v3_2.py --workers 4 --rate 1.5
+    python3 scrapers/race_data_scraper_v3_2.py --backend http
+    python3 scrapers/race_data_scraper_v3_2.py --requeue 23/03/2019 13/11/2024
 """
 
 import os
-import re
 import time
+import queue
 import shutil
 import logging
-from datetime import datetime, timedelta
-from urllib.parse import urlparse, parse_qs
+import argparse
+import threading
+from collections import Counter
+from typing import Optional
+from datetime import datetime
 
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import hkjc_page_parser as hp
+from raw_page_archive import RawPageArchive, ARCHIVE_DIR, meeting_payload
+from scrape_manifest import JobManifest, MANIFEST_DB, STATES
+from meeting_calendar import get_hkjc_likely_race_dates, load_calendar, candidate_dates
+from hkjc_page_parser import (
+    SAME_DAY_XPATH, ROW_XPATH, INFO_XPATH, parse_race_headers,
+    is_dividend_table, dividends_from_rows, is_incident_table, incidents_from_rows,
+)
 
 # ---------------------------------------------------------------------
 # Configuration
@@ -50,13 +97,16 @@ _PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
 OUTPUT_DIR    = os.path.join(_PROJECT_ROOT, "data", "raw_csvs")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-PROGRESS_FILE = os.path.join(OUTPUT_DIR, "progress.txt")
 FAILED_LOG    = os.path.join(OUTPUT_DIR, "failed_extractions.txt")
 
-TARGET_POOLS = [
-    "QUINELLA PLACE", "QUINELLA", "TIERCE", "QUARTET",
-    "FIRST 4", "TRIO", "PLACE", "WIN",
-]
+PAGE_WAIT = 20      # s for a results page to render before it is read
+NO_RESULTS_MARKERS = ("declared abandoned", "no information")
+
+# Selenium backend: read race pages from one page_source grab parsed with
+# lxml instead of element by element. Off until real pages saved and
+# recorded with hkjc_page_parser.py --save / --record are committed to
+# data/html_fixtures and the lxml extraction matches them.
+PARSE_PAGE_SOURCE = False
 
 # ---------------------------------------------------------------------
 # Logging
@@ -72,18 +122,6 @@ logging.basicConfig(
 log = logging.getLogger(__name__)
 
 
-def get_hkjc_likely_race_dates(start_date_str, end_date_str):
-    start = datetime.strptime(start_date_str, "%d/%m/%Y")
-    end   = datetime.strptime(end_date_str,   "%d/%m/%Y")
-    dates = []
-    cur = end
-    while cur >= start:
-        if cur.weekday() in (2, 5, 6):
-            dates.append(cur.strftime("%d/%m/%Y"))
-        cur -= timedelta(days=1)
-    return dates
-
-
 def init_driver():
     opts = Options()
     opts.add_argument("--no-sandbox")
@@ -95,38 +133,31 @@ def init_driver():
     return webdriver.Chrome(options=opts)
 
 
-def race_no_from_url(url):
-    try:
-        q = parse_qs(urlparse(url).query)
-        rn = q.get("RaceNo", ["1"])[0]
-        return str(int(rn))
-    except Exception:
-        return "1"
-
-
 def is_overseas_url(url):
     if not url:
         return False
     return '/overseas/' in url.lower()
 
 
-def parse_horse_id_from_text(text):
-    """'FLYING AMANI (K152)' -> ('FLYING AMANI', 'K152')."""
-    m = re.match(r'^\s*(.+?)\s*\(([A-Z0-9]{3,5})\)\s*$', str(text))
-    if m:
-        return m.group(1).strip(), m.group(2).strip()
-    return str(text).strip(), ""
-
-
 def page_has_races(driver):
     try:
-        rows = driver.find_elements(By.XPATH, "//div[5]/table/tbody/tr")
-        info = driver.find_elements(By.XPATH, "//div[4]/table")
+        rows = driver.find_elements(By.XPATH, ROW_XPATH)
+        info = driver.find_elements(By.XPATH, INFO_XPATH)
         return len(rows) > 0 and len(info) > 0
     except Exception:
         return False
 
 
+def same_day_links(driver):
+    out = []
+    for a in driver.find_elements(By.XPATH, SAME_DAY_XPATH):
+        href = a.get_attribute("href")
+        if not href or "RaceNo=" not in href or is_overseas_url(href):
+            continue
+        out.append(href)
+    return out
+
+
 def page_is_abandoned(driver):
     try:
         page_text = driver.find_element(By.TAG_NAME, "body").text
@@ -135,111 +166,50 @@ def page_is_abandoned(driver):
         return False
 
 
-def extract_race_headers(driver):
-    out = {"race_name": "", "going": "", "course": "",
-           "distance": "", "race_class": "", "prize": ""}
-    try:
-        info_text = driver.find_element(By.XPATH, "//div[4]/table").text
+def _results_rendered(driver):
+    """WebDriverWait condition: result rows and race info are in the DOM,
+    or the page says it has none."""
+    if (driver.find_elements(By.XPATH, ROW_XPATH)
+            and driver.find_elements(By.XPATH, INFO_XPATH)):
+        return True
+    text = driver.find_element(By.TAG_NAME, "body").text.lower()
+    return any(m in text for m in NO_RESULTS_MARKERS)
 
-        m = re.search(r'(RACE\s+\d+.*?(?=\n|Going|Course|$))', info_text, re.I)
-        if m: out["race_name"] = m.group(1).strip()
 
-        m = re.search(r'Going\s*:\s*([^\n]+)', info_text)
-        if m: out["going"] = m.group(1).strip()
-
-        m = re.search(r'Course\s*:\s*([^\n]+)', info_text)
-        if m: out["course"] = m.group(1).strip()
-
-        for pattern in [
-            r'(\d{1,2},?\d{3})\s*M(?:etres?)?\b',
-            r'(\d{3,4})\s*M(?:etres?)?\b',
-            r'(\d{3,4})\s*m(?:etres?)?\b',
-        ]:
-            m = re.search(pattern, info_text)
-            if m:
-                out["distance"] = m.group(1).replace(",", "")
-                break
+def wait_for_results(driver, timeout=PAGE_WAIT):
+    """Wait for the loaded page to render before page_source is grabbed
+    (page_source itself never waits). On timeout the page is read as it
+    is, as the old implicit-wait lookups did."""
+    try:
+        WebDriverWait(driver, timeout).until(_results_rendered)
+    except TimeoutException:
+        pass
 
-        m = re.search(r'(Class\s+\d+|Group\s+\d+|Griffin|Restricted)', info_text, re.I)
-        if m: out["race_class"] = m.group(1).strip()
 
-        m = re.search(r'HK\$?\s*([\d,]+)', info_text)
-        if m: out["prize"] = m.group(1).replace(",", "")
+def extract_race_headers(driver):
+    try:
+        info_text = driver.find_element(By.XPATH, INFO_XPATH).text
+        return parse_race_headers(info_text)
     except Exception as e:
         log.warning(f"Header extraction failed: {e}")
-    return out
+    return parse_race_headers("")
 
 
-def match_pool(pool_cell_text):
-    s = pool_cell_text.upper().strip()
-    if not s:
-        return None
-    for p in TARGET_POOLS:
-        if p in s:
-            return p
-    return None
+def _row_cells(table):
+    return ([c.text for c in tr.find_elements(By.TAG_NAME, "td")]
+            for tr in table.find_elements(By.TAG_NAME, "tr"))
 
 
 def extract_dividends(driver):
-    """v3.1 dividend extractor — proper rowspan state machine.
-
-    HKJC structure:
-      Header row:        3 cells [pool_name, combo, dividend]
-      Continuation row:  2 cells [combo, dividend]  (pool consumed by rowspan)
-      Non-target pool:   3 cells with unrecognized pool name → reset state
-    """
+    """Dividends via the shared rowspan state machine
+    (hkjc_page_parser.dividends_from_rows)."""
     out = []
     try:
         tables = driver.find_elements(By.CSS_SELECTOR, "table.table_bd")
         for table in tables:
-            txt = table.text.upper()
-            if not any(p in txt for p in TARGET_POOLS):
+            if not is_dividend_table(table.text):
                 continue
-
-            last_seen_pool = None
-            rows = table.find_elements(By.TAG_NAME, "tr")
-
-            for tr in rows:
-                cells = tr.find_elements(By.TAG_NAME, "td")
-                n = len(cells)
-
-                if n >= 3:
-                    candidate = match_pool(cells[0].text)
-                    if candidate is not None:
-                        last_seen_pool = candidate
-                        combo_idx = 1
-                    else:
-                        last_seen_pool = None
-                        continue
-                elif n == 2:
-                    if last_seen_pool is None:
-                        continue
-                    combo_idx = 0
-                else:
-                    continue
-
-                combo = cells[combo_idx].text.strip()
-                raw   = cells[-1].text.strip()
-
-                if 'REFUND' in raw.upper():
-                    out.append({
-                        "pool":      last_seen_pool,
-                        "combo":     combo,
-                        "dividend":  None,
-                        "is_refund": 1,
-                    })
-                    continue
-
-                m = re.search(r'\d{1,3}(?:,\d{3})*(?:\.\d+)?', raw)
-                if not m:
-                    continue
-
-                out.append({
-                    "pool":      last_seen_pool,
-                    "combo":     combo,
-                    "dividend":  float(m.group(0).replace(",", "")),
-                    "is_refund": 0,
-                })
+            out.extend(dividends_from_rows(_row_cells(table)))
     except Exception as e:
         log.warning(f"Dividend extraction failed: {e}")
     return out
@@ -253,239 +223,392 @@ def extract_incidents(driver):
 
     Returns a list of dicts, one per horse per race. Returns empty list
     if no incident table is present (older races sometimes omit it).
-
-    We identify the incident table by checking each <table class='table_bd'>
-    for a header row containing 'Incident' (case-insensitive). This is
-    structurally distinct from the result table (which has 'Pla. Horse
-    No. Horse Jockey...') and the dividend table (which has 'Pool Winning
-    Combination Dividend').
+    The table is identified by hkjc_page_parser.is_incident_table.
     """
-    out = []
     try:
         tables = driver.find_elements(By.CSS_SELECTOR, "table.table_bd")
         for table in tables:
-            txt = table.text
-            # Heuristic: must contain "Incident" as a column header
-            # and NOT have jockey/dividend keywords
-            first_line = txt.split('\n')[0].lower() if txt else ""
-            if 'incident' not in first_line:
-                continue
-            if 'jockey' in first_line or 'dividend' in first_line:
-                continue
-            if 'pool' in first_line:
-                continue
-
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            for tr in rows:
-                cells = tr.find_elements(By.TAG_NAME, "td")
-                if len(cells) < 4:
-                    continue  # header row or malformed
-
-                placing = cells[0].text.strip()
-                horse_no = cells[1].text.strip()
-                horse_raw = cells[2].text.strip()
-                incident_text = cells[3].text.strip()
-
-                # Skip if it doesn't look like a horse row (header rows
-                # have non-numeric placing)
-                if not placing or not re.match(r'^\d+', placing):
-                    continue
-
-                horse_name, horse_id = parse_horse_id_from_text(horse_raw)
-
-                out.append({
-                    "placing":       placing,
-                    "horse_no":      horse_no,
-                    "horse_name":    horse_name,
-                    "horse_id":      horse_id,
-                    "incident_text": incident_text,
-                })
-
-            break  # found and parsed the incident table; stop scanning
+            if is_incident_table(table.text):
+                return incidents_from_rows(_row_cells(table))
     except Exception as e:
         log.warning(f"Incident extraction failed: {e}")
-    return out
+    return []
+
+
+def extract_result_rows(driver):
+    return [[c.text for c in r.find_elements(By.TAG_NAME, "td")]
+            for r in driver.find_elements(By.XPATH, ROW_XPATH)]
+
+
+def read_page_webdriver(driver):
+    """Everything the scraper takes from the loaded race page, read element
+    by element over WebDriver (one round trip per table, row and cell).
+    The Selenium backend's extraction, and the reference that
+    hkjc_page_parser.py --record saves for the fixture check."""
+    return {
+        "url":       driver.current_url,
+        "abandoned": page_is_abandoned(driver),
+        "hdr":       extract_race_headers(driver),
+        "divs":      extract_dividends(driver),
+        "incidents": extract_incidents(driver),
+        "rows":      extract_result_rows(driver),
+    }
+
+
+def read_page(driver, html=None):
+    """The loaded race page: read_page_webdriver, or with
+    PARSE_PAGE_SOURCE its lxml equivalent on one page_source grab (html,
+    if already taken)."""
+    if not PARSE_PAGE_SOURCE:
+        return read_page_webdriver(driver)
+    url = driver.current_url
+    return hp.read_page(hp.parse_html(html if html is not None else driver.page_source, url), url)
 
 
 # ---------------------------------------------------------------------
-# Persistence
+# One meeting
 # ---------------------------------------------------------------------
-def save_progress(dates):
-    with open(PROGRESS_FILE, 'w') as f:
-        f.write("\n".join(dates))
+class NeedsBrowser(Exception):
+    """Raised by the HTTP backend when a page must be rendered by Selenium."""
 
 
-def load_progress():
-    if not os.path.exists(PROGRESS_FILE):
-        return []
-    with open(PROGRESS_FILE, 'r') as f:
-        return [ln.strip() for ln in f if ln.strip()]
+def _add_race(out, meet, page, html, tag=""):
+    hp.add_race(out, meet, page, html=html, tag=tag, on_failure=log_failure)
 
 
-def log_failure(meet, race_url, reason):
-    with open(FAILED_LOG, 'a') as f:
-        f.write(f"{meet}\t{race_url}\t{reason}\n")
+def scrape_meeting(driver, meet, throttle=None, tag=""):
+    """Scrape every race of one meeting date with an open driver.
+
+    Returns None if the date has no races, else a dict of row lists
+    {'races', 'divs', 'meta', 'incidents'} plus the raw 'pages' for the
+    archive (hkjc_page_parser.new_meeting). throttle (a RateLimiter) is
+    acquired before every page load; without one the v3.2 fixed 1s pause
+    after each same-day race page is kept. Timeouts propagate."""
+    if throttle is not None:
+        throttle.acquire()
+    driver.set_page_load_timeout(30)
+    driver.implicitly_wait(0)           # wait_for_results polls instead
+    driver.get(BASE_URL + meet)
+    wait_for_results(driver)
+
+    if not page_has_races(driver):
+        return None
+
+    all_urls = [driver.current_url] + same_day_links(driver)
+    out = hp.new_meeting()
+
+    for url in all_urls:
+        if is_overseas_url(url):
+            continue
+
+        if url != driver.current_url:
+            if throttle is not None:
+                throttle.acquire()
+            driver.get(url)
+            if throttle is None:
+                time.sleep(1)
+            wait_for_results(driver)
+
+        html = driver.page_source       # kept for the raw page archive
+        _add_race(out, meet, read_page(driver, html), html, tag)
+
+    return out
+
+
+def scrape_meeting_http(fetcher, meet, throttle=None, tag=""):
+    """scrape_meeting over plain HTTP + lxml (hkjc_page_parser). Same
+    return value; raises NeedsBrowser if any page of the meeting needs
+    JavaScript to render."""
+    if throttle is not None:
+        throttle.acquire()
+    current_url, html = fetcher.fetch(BASE_URL + meet)
+    doc = hp.parse_html(html, current_url)
+    if hp.needs_js(doc):
+        raise NeedsBrowser(current_url)
+
+    if not hp.page_has_races(doc):
+        return None
+
+    all_urls = [current_url] + hp.same_day_links(doc)
+    out = hp.new_meeting()
+
+    for url in all_urls:
+        if is_overseas_url(url):
+            continue
+
+        if url != current_url:
+            if throttle is not None:
+                throttle.acquire()
+            current_url, html = fetcher.fetch(url)
+            doc = hp.parse_html(html, current_url)
+            if hp.needs_js(doc):
+                raise NeedsBrowser(current_url)
+            if throttle is None:
+                time.sleep(1)
+
+        _add_race(out, meet, hp.read_page(doc, current_url), html, tag)
+
+    return out
+
+
+class MeetingScraper:
+    """One worker's scraping backend. 'selenium' is the original
+    browser-only path; 'http' fetches with requests + lxml and opens a
+    Chrome session only when a meeting needs JS."""
+
+    def __init__(self, backend="selenium"):
+        self.backend = backend
+        self.fetcher = hp.HttpFetcher() if backend == "http" else None
+        self.driver = None if backend == "http" else init_driver()
+        self.n_browser_fallbacks = 0
+
+    def _driver(self):
+        if self.driver is None:
+            self.driver = init_driver()
+        return self.driver
+
+    def scrape(self, meet, throttle=None, tag=""):
+        if self.fetcher is not None:
+            try:
+                return scrape_meeting_http(self.fetcher, meet, throttle, tag)
+            except NeedsBrowser as e:
+                self.n_browser_fallbacks += 1
+                log.info(f"  {tag}{e} needs JS; reloading {meet} in Chrome")
+        return scrape_meeting(self._driver(), meet, throttle, tag)
+
+    def reset_driver(self):
+        """Drop a (possibly dead) Chrome session; the next use starts a new one."""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None if self.backend == "http" else init_driver()
+
+    def close(self):
+        if self.fetcher is not None:
+            self.fetcher.close()
+        if self.driver is not None:
+            self.driver.quit()
 
 
 # ---------------------------------------------------------------------
-# Main loop
+# Persistence
 # ---------------------------------------------------------------------
-def run():
-    dates = get_hkjc_likely_race_dates(START_DATE, END_DATE)
-    log.info(f"Generated {len(dates)} candidate race dates "
-             f"({START_DATE} → {END_DATE})")
+def write_meeting_files(n, meet, rows, archive=None):
+    """Archive meeting N's raw pages (if archiving), then write its CSVs
+    atomically (races{N}.csv last, marking the file set complete).
+    Returns the pages' content hash."""
+    if archive is not None:
+        sha = archive.put_meeting(n, meet, rows['pages'])
+    else:
+        sha = meeting_payload(meet, rows['pages'])[1]
+    hp.write_meeting_csvs(OUTPUT_DIR, n, rows)
+    return sha
 
-    processed = load_progress()
-    log.info(f"Resume: {len(processed)} dates already processed.")
 
-    driver = init_driver()
-    count = 0
-    ok    = 0
-    skip  = 0
+_FAILED_LOG_LOCK = threading.Lock()
 
-    same_day_xpath = "//div[2]/table/tbody/tr/td/a"
-    row_xpath      = "//div[5]/table/tbody/tr"
 
-    try:
-        for meet in dates:
-            if meet in processed:
-                continue
-            count += 1
-            races_csv     = os.path.join(OUTPUT_DIR, f"races{count}.csv")
-            dividends_csv = os.path.join(OUTPUT_DIR, f"dividends{count}.csv")
-            metadata_csv  = os.path.join(OUTPUT_DIR, f"metadata{count}.csv")
-            incidents_csv = os.path.join(OUTPUT_DIR, f"incidents{count}.csv")
-
-            if os.path.isfile(races_csv):
-                log.info(f"{meet}: races{count}.csv exists, skipping.")
-                processed.append(meet)
-                continue
+def log_failure(meet, race_url, reason):
+    with _FAILED_LOG_LOCK, open(FAILED_LOG, 'a') as f:
+        f.write(f"{meet}\t{race_url}\t{reason}\n")
+
 
-            log.info(f"Checking {meet} ...")
+# ---------------------------------------------------------------------
+# Job loop (serial or worker pool, driven by the scrape manifest)
+# ---------------------------------------------------------------------
+class RateLimiter:
+    """Global token bucket shared by every worker: at most `rate` page
+    loads per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def prepare_jobs(jm, use_calendar=True):
+    """Seed the manifest with this run's candidate dates (importing the
+    legacy progress files on first use). Returns the candidate dates and
+    the meeting calendar."""
+    cal = load_calendar(refresh=use_calendar, start_meet=START_DATE)
+    if jm.is_empty():
+        jm.import_legacy(cal)
+    if use_calendar:
+        dates = candidate_dates(START_DATE, END_DATE, cal)
+    else:
+        dates = get_hkjc_likely_race_dates(START_DATE, END_DATE)
+    jm.seed(dates, source="v3.2")
+    return dates, cal
+
+
+def scrape_job(scraper, jm, meet, store=None, throttle=None, tag="", calendar=None):
+    """Scrape one due date and record the outcome in the manifest:
+    'ok' / 'abandoned' / 'empty', or 'failed' (retried with backoff). A
+    date the calendar lists as a meeting is never 'empty': no races there
+    means the page did not load properly."""
+    log.info(f"{tag}Checking {meet} ...")
+    try:
+        rows = scraper.scrape(meet, throttle=throttle, tag=tag)
+        if rows is None and calendar is not None and calendar.is_meeting(meet) is True:
+            log.warning(f"  {tag}no races parsed for calendar meeting {meet}")
+            log_failure(meet, BASE_URL + meet, "no_races_on_meeting_date")
+            wait = jm.mark_failed(meet, "no races parsed on a calendar meeting date")
+            log.info(f"  {tag}{meet} will be retried in {wait / 60:.0f} min")
+            return 'failed'
+        if rows is None:
+            log.info(f"  {tag}no races for {meet}")
+            jm.mark_empty(meet)
+            return 'empty'
+        n = jm.claim_meeting_no(meet)
+        sha = write_meeting_files(n, meet, rows, store)
+        abandoned = rows['n_abandoned'] == len(rows['meta'])
+        jm.mark_ok(meet, n, sha, len(rows['meta']), abandoned=abandoned)
+        log.info(f"  {tag}{meet} -> meeting {n}")
+        return 'abandoned' if abandoned else 'ok'
+    except TimeoutException:
+        log.error(f"  {tag}timeout on {meet}")
+        log_failure(meet, BASE_URL + meet, "timeout")
+        jm.mark_failed(meet, "timeout")
+    except Exception as e:
+        log.error(f"  {tag}error on {meet}: {e}")
+        log_failure(meet, BASE_URL + meet, f"exception: {e}")
+        wait = jm.mark_failed(meet, f"exception: {e}")
+        log.info(f"  {tag}{meet} will be retried in {wait / 60:.0f} min")
+        if isinstance(e, WebDriverException):
+            # the session may be dead; start a fresh browser
+            scraper.reset_driver()
+    return 'failed'
+
+
+def _worker(wid, dates_q, jm, limiter, stop, backend, store, stats, calendar=None):
+    tag = f"[w{wid}] " if limiter is not None else ""
+    scraper = MeetingScraper(backend)
+    try:
+        while not stop.is_set():
             try:
-                driver.set_page_load_timeout(30)
-                driver.get(BASE_URL + meet)
-                driver.implicitly_wait(20)
-
-                if not page_has_races(driver):
-                    log.info(f"  no races for {meet}")
-                    skip += 1
-                    processed.append(meet)
-                    continue
-
-                same_day = driver.find_elements(By.XPATH, same_day_xpath)
-                same_day_links = []
-                for x in same_day:
-                    href = x.get_attribute("href")
-                    if not href or "RaceNo=" not in href:
-                        continue
-                    if is_overseas_url(href):
-                        continue
-                    same_day_links.append(href)
-
-                all_urls = [driver.current_url] + same_day_links
-
-                race_rows     = []
-                div_rows      = []
-                meta_rows     = []
-                incident_rows = []
-
-                for url in all_urls:
-                    if is_overseas_url(url):
-                        continue
-
-                    if url != driver.current_url:
-                        driver.get(url)
-                        time.sleep(1)
-
-                    race_no   = race_no_from_url(driver.current_url)
-                    abandoned = page_is_abandoned(driver)
-                    hdr       = extract_race_headers(driver)
-                    divs      = extract_dividends(driver)
-                    incidents = extract_incidents(driver)
-
-                    meta_rows.append({
-                        "date":       meet,
-                        "race_no":    race_no,
-                        "race_name":  hdr["race_name"],
-                        "going":      hdr["going"],
-                        "course":     hdr["course"],
-                        "distance":   hdr["distance"],
-                        "race_class": hdr["race_class"],
-                        "prize":      hdr["prize"],
-                        "url":        driver.current_url,
-                    })
-
-                    rows = driver.find_elements(By.XPATH, row_xpath)
-                    for r in rows:
-                        entry = [hdr["race_name"], hdr["going"], hdr["course"]]
-                        cols = r.find_elements(By.TAG_NAME, "td")
-                        entry.extend([c.text for c in cols])
-                        race_rows.append(entry)
-
-                    for d in divs:
-                        div_rows.append({
-                            "date":      meet,
-                            "race_no":   race_no,
-                            "race_name": hdr["race_name"],
-                            "pool":      d["pool"],
-                            "combo":     d["combo"],
-                            "dividend":  d["dividend"],
-                            "is_refund": d["is_refund"],
-                        })
-
-                    for inc in incidents:
-                        incident_rows.append({
-                            "date":          meet,
-                            "race_no":       race_no,
-                            "race_name":     hdr["race_name"],
-                            "placing":       inc["placing"],
-                            "horse_no":      inc["horse_no"],
-                            "horse_name":    inc["horse_name"],
-                            "horse_id":      inc["horse_id"],
-                            "incident_text": inc["incident_text"],
-                        })
-
-                    if not hdr["race_name"] and not abandoned:
-                        log_failure(meet, driver.current_url, "empty_race_name")
-
-                    status = "ABANDONED" if abandoned else f"{len(rows)} horses"
-                    log.info(f"  R{race_no}: {hdr['race_name']} | "
-                             f"{status} | {len(divs)} dividends | "
-                             f"{len(incidents)} incidents")
-
-                if race_rows:
-                    pd.DataFrame(race_rows).to_csv(races_csv, index=False)
-                if div_rows:
-                    pd.DataFrame(div_rows).to_csv(dividends_csv, index=False)
-                if meta_rows:
-                    pd.DataFrame(meta_rows).to_csv(metadata_csv, index=False)
-                if incident_rows:
-                    pd.DataFrame(incident_rows).to_csv(incidents_csv, index=False)
-
-                ok += 1
-                processed.append(meet)
-                if count % 5 == 0:
-                    save_progress(processed)
+                meet = dates_q.get_nowait()
+            except queue.Empty:
+                return
+            stats[scrape_job(scraper, jm, meet, store, limiter, tag, calendar)] += 1
+            if limiter is None:
                 time.sleep(2)
-
-            except TimeoutException:
-                log.error(f"  timeout on {meet}")
-                log_failure(meet, BASE_URL + meet, "timeout")
-                processed.append(meet)
-            except Exception as e:
-                log.error(f"  error on {meet}: {e}")
-                log_failure(meet, BASE_URL + meet, f"exception: {e}")
-                processed.append(meet)
-
     finally:
-        save_progress(processed)
-        driver.quit()
+        stats['browser_fallbacks'] += scraper.n_browser_fallbacks
+        scraper.close()
+
+
+def run(workers: int = 1, rate: Optional[float] = None, burst: int = 2,
+        backend: str = "selenium", archive: bool = True, use_calendar: bool = True,
+        requeue: Optional[list] = None, source: str = "v3.2",
+        requeue_states: tuple = STATES, only_requeued: bool = False,
+        retry_exhausted: bool = False):
+    """Scrape every due job in the manifest (pending, or failed with its
+    backoff expired), newest first.
+
+    workers=1 without a rate is the original serial loop with its fixed
+    pauses. Otherwise `workers` workers pull dates from a shared queue and
+    total page loads are capped at `rate` per second by one RateLimiter,
+    so adding workers overlaps page rendering and extraction without
+    raising the load on HKJC. requeue = dates to (re)scrape if their state
+    is in requeue_states: gap fills and targeted re-scrapes (only_requeued
+    restricts the run to them)."""
+    if backend == "http" and hp.check_fixtures():
+        log.warning("lxml parser does not match the expected extractions in "
+                    "data/html_fixtures; using Selenium")
+        backend = "selenium"
+    jm = JobManifest(MANIFEST_DB, OUTPUT_DIR)
+    dates, cal = prepare_jobs(jm, use_calendar)
+    if requeue:
+        jm.requeue(requeue, source, requeue_states)
+    todo = jm.due(retry_exhausted=retry_exhausted)
+    if requeue and only_requeued:
+        wanted = set(requeue)
+        todo = [d for d in todo if d in wanted]
+    if workers > 1 and rate is None:
+        rate = 1.0
+    log.info(f"{len(dates)} candidate race dates ({START_DATE} → {END_DATE}); "
+             f"{len(todo)} due with {workers} worker(s)"
+             + (f" at <= {rate:g} page loads/s" if rate else ""))
+
+    dates_q = queue.Queue()
+    for d in todo:
+        dates_q.put(d)
+    limiter = RateLimiter(rate, burst) if rate else None
+    store = RawPageArchive(ARCHIVE_DIR) if archive else None
+    stop = threading.Event()
+    stats = [Counter() for _ in range(workers)]
+    threads = [threading.Thread(target=_worker, name=f"scrape-w{i}",
+                                args=(i, dates_q, jm, limiter, stop, backend, store, stats[i],
+                                      cal),
+                                daemon=True)
+               for i in range(workers)]
+    t0 = time.monotonic()
+    try:
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=1.0)
+    except KeyboardInterrupt:
+        log.warning("Interrupted — letting workers finish their current meeting")
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        total = sum(stats, Counter())
+        states = jm.summary()
+        jm.close()
         log.info("=" * 60)
-        log.info(f"SCRAPE COMPLETE | checked={len(dates)} "
-                 f"successful={ok} skipped={skip}")
+        log.info(f"SCRAPE COMPLETE | due={len(todo)} ok={total['ok']} "
+                 f"abandoned={total['abandoned']} empty={total['empty']} "
+                 f"failed={total['failed']} browser_fallbacks={total['browser_fallbacks']} | "
+                 f"{(time.monotonic() - t0) / 60:.1f} min")
+        log.info("Manifest: " + " | ".join(f"{k}={states.get(k, 0)}" for k in STATES))
         log.info("=" * 60)
 
 
+def main():
+    ap = argparse.ArgumentParser(description="HKJC v3.2 results scraper")
+    ap.add_argument('--workers', type=int, default=1,
+                    help="parallel workers (1 = original serial loop)")
+    ap.add_argument('--backend', choices=['http', 'selenium'], default='selenium',
+                    help="http: requests + lxml, Chrome only for pages that need JS "
+                         "(opt-in until real recorded pages verify it)")
+    ap.add_argument('--no-archive', action='store_true',
+                    help="do not keep raw pages in data/raw_pages (see raw_page_archive.py)")
+    ap.add_argument('--probe-all-dates', action='store_true',
+                    help="load every Wed/Sat/Sun instead of the meeting calendar's dates")
+    ap.add_argument('--rate', type=float, default=None,
+                    help="max page loads per second across ALL workers "
+                         "(default: 1.0 with --workers > 1, else fixed pauses)")
+    ap.add_argument('--burst', type=int, default=2,
+                    help="token-bucket burst size")
+    ap.add_argument('--requeue', nargs='+', metavar='DD/MM/YYYY', default=None,
+                    help="re-scrape these dates whatever their manifest state")
+    ap.add_argument('--retry-exhausted', action='store_true',
+                    help="also retry failed jobs that used up their attempts")
+    args = ap.parse_args()
+    run(args.workers, args.rate, args.burst, args.backend,
+        archive=not args.no_archive, use_calendar=not args.probe_all_dates,
+        requeue=args.requeue, source="requeue" if args.requeue else "v3.2",
+        retry_exhausted=args.retry_exhausted)
+
+
 if __name__ == "__main__":
-    run()
+    main()
@@ -0,0 +1,236 @@
+"""
+Raw HKJC Page Archive + Offline Re-parse
+========================================
+Every schema fix so far (v2.1 -> v3.0 -> v3.1 -> v3.2 incidents, the
+gap-fill, targeted_rescrape.py) needed a multi-day re-scrape because only
+the parsed CSVs were kept. The scrapers now also keep the raw HTML of each
+meeting here, so a parser change is applied offline with `reparse`.
+
+Layout (data/raw_pages/):
+    objects/ab/<sha256>.zst    one blob per meeting, content-addressed:
+                               JSON {"date", "pages": [{"url", "html"}]},
+                               compressed as a whole (race pages of one
+                               meeting share most of their markup). gzip
+                               (.gz) when `zstandard` is not installed.
+    meetings/meeting{N}.json   pointer for meeting N: date, sha256, object
+                               path, n_pages, archived_at. Re-scraping a
+                               meeting repoints it; identical content is
+                               stored once.
+
+`reparse` rebuilds races/dividends/metadata/incidents{N}.csv with the
+CURRENT hkjc_page_parser rules, one process per core, no network.
+
+Run from project root:
+    python3 scrapers/raw_page_archive.py stats
+    python3 scrapers/raw_page_archive.py reparse --out data/raw_csvs_reparsed
+    python3 scrapers/raw_page_archive.py reparse --out data/raw_csvs_reparsed --meetings 12 13
+"""
+
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:          # gzip fallback; reading .zst objects then fails
+    zstandard = None
+
+import hkjc_page_parser as hp
+
+log = logging.getLogger(__name__)
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+ARCHIVE_DIR   = os.path.join(_PROJECT_ROOT, "data", "raw_pages")
+
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+
+def _compress(data: bytes) -> tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), ".zst"
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0), ".gz"
+
+
+def _decompress(data: bytes, ext: str) -> bytes:
+    if ext == ".gz":
+        return gzip.decompress(data)
+    if zstandard is None:
+        raise RuntimeError("archive object is zstd-compressed; pip install zstandard")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def meeting_payload(meet: str, pages: list) -> tuple[bytes, str]:
+    """Canonical archive payload of one meeting and its sha256."""
+    payload = json.dumps({"date": meet, "pages": pages},
+                         ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return payload, hashlib.sha256(payload).hexdigest()
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class RawPageArchive:
+    """Content-addressed store of raw meeting pages. Safe to share between
+    scraper threads: every write goes to its own temp file + rename."""
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.meetings_dir = os.path.join(root, "meetings")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.meetings_dir, exist_ok=True)
+
+    def _pointer_path(self, n: int) -> str:
+        return os.path.join(self.meetings_dir, f"meeting{n}.json")
+
+    def put_meeting(self, n: int, meet: str, pages: list) -> str:
+        """Archive meeting N (pages = [{'url', 'html'}, ...] in scrape
+        order). Returns the content hash."""
+        payload, sha = meeting_payload(meet, pages)
+        blob, ext = _compress(payload)
+        rel = os.path.join("objects", sha[:2], sha + ext)
+        path = os.path.join(self.root, rel)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, blob)
+        pointer = {"meeting_no": n, "date": meet, "sha256": sha, "object": rel,
+                   "n_pages": len(pages), "raw_bytes": len(payload),
+                   "stored_bytes": len(blob),
+                   "archived_at": datetime.now().isoformat(timespec='seconds')}
+        _atomic_write(self._pointer_path(n), json.dumps(pointer, indent=1).encode())
+        return sha
+
+    def meetings(self) -> list[int]:
+        out = []
+        for f in os.listdir(self.meetings_dir):
+            m = re.match(r'meeting(\d+)\.json$', f)
+            if m:
+                out.append(int(m.group(1)))
+        return sorted(out)
+
+    def pointer(self, n: int) -> dict:
+        with open(self._pointer_path(n)) as f:
+            return json.load(f)
+
+    def get_meeting(self, n: int) -> tuple[str, list]:
+        """-> (meet date 'DD/MM/YYYY', [{'url', 'html'}, ...])."""
+        ptr = self.pointer(n)
+        path = os.path.join(self.root, ptr["object"])
+        with open(path, 'rb') as f:
+            payload = _decompress(f.read(), os.path.splitext(path)[1])
+        if hashlib.sha256(payload).hexdigest() != ptr["sha256"]:
+            raise ValueError(f"meeting {n}: archive object {ptr['object']} is corrupt")
+        doc = json.loads(payload)
+        return doc["date"], doc["pages"]
+
+
+# ---------------------------------------------------------------------
+# Offline re-parse
+# ---------------------------------------------------------------------
+def reparse_meeting(archive: RawPageArchive, n: int, out_dir: str) -> dict:
+    """Regenerate meeting N's CSVs from its archived pages."""
+    meet, pages = archive.get_meeting(n)
+    failures = []
+    out = hp.new_meeting()
+    for p in pages:
+        doc = hp.parse_html(p["html"], p["url"])
+        hp.add_race(out, meet, hp.read_page(doc, p["url"]),
+                    on_failure=lambda *a: failures.append(a))
+    hp.write_meeting_csvs(out_dir, n, out)
+    return {"meeting_no": n, "date": meet, "races": len(out['meta']),
+            "runners": len(out['races']), "dividends": len(out['divs']),
+            "incidents": len(out['incidents']), "failures": failures}
+
+
+def _reparse_job(args):
+    root, n, out_dir = args
+    try:
+        return reparse_meeting(RawPageArchive(root), n, out_dir)
+    except Exception as e:
+        return {"meeting_no": n, "error": f"{type(e).__name__}: {e}"}
+
+
+def _quiet_worker():
+    hp.log.setLevel(logging.WARNING)
+
+
+def reparse(root: str, out_dir: str, meetings: Optional[list] = None,
+            workers: Optional[int] = None) -> list[dict]:
+    """Re-parse archived meetings into out_dir, in parallel across cores."""
+    archive = RawPageArchive(root)
+    todo = meetings or archive.meetings()
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    jobs = [(root, n, out_dir) for n in todo]
+    if workers == 1 or len(jobs) <= 1:
+        _quiet_worker()
+        return [_reparse_job(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as ex:
+        return list(ex.map(_reparse_job, jobs,
+                           chunksize=max(1, len(jobs) // (workers * 8))))
+
+
+def _stats(root: str):
+    archive = RawPageArchive(root)
+    ptrs = [archive.pointer(n) for n in archive.meetings()]
+    raw = sum(p["raw_bytes"] for p in ptrs)
+    objs = {p["object"] for p in ptrs}
+    stored = sum(os.path.getsize(os.path.join(root, o)) for o in objs)
+    log.info(f"{len(ptrs)} meetings, {sum(p['n_pages'] for p in ptrs)} pages, "
+             f"{len(objs)} objects")
+    log.info(f"raw {raw / 1e6:,.1f} MB -> stored {stored / 1e6:,.1f} MB"
+             + (f" ({raw / stored:.1f}x)" if stored else ""))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ap = argparse.ArgumentParser(description="Raw HKJC page archive")
+    ap.add_argument('--archive', default=ARCHIVE_DIR)
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('stats', help="archive size and compression")
+    rp = sub.add_parser('reparse', help="regenerate meeting CSVs from archived pages")
+    rp.add_argument('--out', required=True,
+                    help="output dir for races/dividends/metadata/incidents{N}.csv")
+    rp.add_argument('--meetings', type=int, nargs='*', default=None)
+    rp.add_argument('--workers', type=int, default=None, help="default: all cores")
+    args = ap.parse_args()
+
+    if args.cmd == 'stats':
+        _stats(args.archive)
+        return
+
+    t = time.perf_counter()
+    results = reparse(args.archive, args.out, args.meetings, args.workers)
+    errors = [r for r in results if "error" in r]
+    for r in errors:
+        log.error(f"meeting {r['meeting_no']}: {r['error']}")
+    for r in results:
+        for meet, url, reason in r.get("failures", []):
+            log.warning(f"meeting {r['meeting_no']} {meet}: {reason} ({url})")
+    ok = [r for r in results if "error" not in r]
+    log.info(f"Re-parsed {len(ok)}/{len(results)} meetings "
+             f"({sum(r['races'] for r in ok):,} races, "
+             f"{sum(r['runners'] for r in ok):,} runner rows) into {args.out} "
+             f"in {time.perf_counter() - t:.1f}s")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Scrape Job Manifest — one resumable SQLite job table for every scraper
+======================================================================
+Replaces the per-scraper progress text files (progress.txt,
+gap_fill_progress.txt) and their `if meet in processed` list scans.
+Those files marked FAILED dates as processed too, which is how the May
+2026 DNS outage silently lost 356 meetings and needed a gap-fill script.
+
+One row per candidate date (data/raw_csvs/scrape_manifest.db):
+
+    state       pending | ok | empty | failed | abandoned
+    attempts    scrape attempts so far
+    meeting_no  N of races/dividends/metadata/incidents{N}.csv (ok/abandoned)
+    sha256      content hash of the meeting's raw pages (raw_page_archive)
+    next_try    failed jobs are retried with exponential backoff
+                (BACKOFF_BASE_S * 2**(attempts-1), capped) until
+                MAX_ATTEMPTS, then stay failed until requeued
+
+Gap filling and targeted re-scrapes are queries on this table (requeue),
+not separate bookkeeping. The first open imports the legacy progress
+files: dates found in metadata{N}.csv become ok, calendar non-meetings
+become empty, everything else is re-checked (pending).
+
+Run from project root:
+    python3 scrapers/scrape_manifest.py                     # state summary
+    python3 scrapers/scrape_manifest.py --list failed
+"""
+
+import os
+import re
+import glob
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+_SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_SCRIPT_DIR)
+RAW_CSV_DIR   = os.path.join(_PROJECT_ROOT, "data", "raw_csvs")
+MANIFEST_DB   = os.path.join(RAW_CSV_DIR, "scrape_manifest.db")
+LEGACY_PROGRESS_FILES = ("progress.txt", "gap_fill_progress.txt")
+
+STATES = ('pending', 'ok', 'empty', 'failed', 'abandoned')
+DONE_STATES = ('ok', 'empty', 'abandoned')
+MAX_ATTEMPTS   = 6
+BACKOFF_BASE_S = 300.0          # 5 min, 10, 20, 40, ... capped below
+BACKOFF_MAX_S  = 24 * 3600.0
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS scrape_jobs (
+    date_iso     TEXT PRIMARY KEY,
+    meet         TEXT NOT NULL,
+    state        TEXT NOT NULL DEFAULT 'pending'
+                 CHECK (state IN ('pending','ok','empty','failed','abandoned')),
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    meeting_no   INTEGER,
+    sha256       TEXT,
+    n_races      INTEGER,
+    last_error   TEXT,
+    next_try     REAL NOT NULL DEFAULT 0,
+    source       TEXT,
+    updated_at   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON scrape_jobs (state, next_try, date_iso);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_meeting ON scrape_jobs (meeting_no)
+    WHERE meeting_no IS NOT NULL;
+"""
+
+
+def to_iso(meet: str) -> str:
+    return datetime.strptime(meet, "%d/%m/%Y").strftime("%Y-%m-%d")
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** max(0, attempts - 1))
+
+
+def _now_text() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def csv_meetings(raw_dir: str = RAW_CSV_DIR) -> dict:
+    """{meet 'DD/MM/YYYY': meeting N} from existing metadata{N}.csv."""
+    out = {}
+    for path in glob.glob(os.path.join(raw_dir, "metadata*.csv")):
+        m = re.search(r'metadata(\d+)\.csv$', path)
+        if not m:
+            continue
+        try:
+            dates = pd.read_csv(path, usecols=['date'], dtype=str)['date'].dropna().unique()
+        except (ValueError, pd.errors.EmptyDataError):
+            continue
+        for meet in dates:
+            out.setdefault(meet, int(m.group(1)))
+    return out
+
+
+def max_file_meeting_no(raw_dir: str = RAW_CSV_DIR) -> int:
+    """MAX(N) over every existing {races,dividends,metadata,incidents}{N}.csv."""
+    existing = [0]
+    for f in os.listdir(raw_dir):
+        m = re.match(r'(?:races|dividends|metadata|incidents)(\d+)\.csv$', f)
+        if m:
+            existing.append(int(m.group(1)))
+    return max(existing)
+
+
+class JobManifest:
+    """The job table. One connection shared by all scraper threads,
+    serialized by a lock (writes are tiny; page loads dominate)."""
+
+    def __init__(self, path: str = MANIFEST_DB, raw_dir: str = RAW_CSV_DIR):
+        self.path = path
+        self.raw_dir = raw_dir
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA_SQL)
+        self._next_n: Optional[int] = None
+
+    def close(self):
+        self.conn.close()
+
+    # --- queue -----------------------------------------------------------
+    def seed(self, meets, source: str):
+        """Add dates as pending jobs; existing jobs are left untouched."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO scrape_jobs (date_iso, meet, source, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(to_iso(m), m, source, _now_text()) for m in meets])
+
+    def requeue(self, meets, source: str, states=STATES):
+        """Make dates pending again (attempts reset) whatever their state
+        in `states`; unknown dates are added. Meeting numbers are kept, so
+        a re-scrape replaces the meeting's files in place."""
+        self.seed(meets, source)
+        marks = ",".join("?" * len(states))
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"UPDATE scrape_jobs SET state='pending', attempts=0, next_try=0, "
+                f"source=?, updated_at=? WHERE date_iso=? AND state IN ({marks})",
+                [(source, _now_text(), to_iso(m), *states) for m in meets])
+
+    def due(self, now: Optional[float] = None, retry_exhausted: bool = False) -> list:
+        """Dates to scrape now, newest first: pending jobs and failed jobs
+        whose backoff has expired (and attempts < MAX_ATTEMPTS unless
+        retry_exhausted)."""
+        now = time.time() if now is None else now
+        cap = 1 << 30 if retry_exhausted else MAX_ATTEMPTS
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT meet FROM scrape_jobs WHERE state='pending' "
+                "OR (state='failed' AND next_try <= ? AND attempts < ?) "
+                "ORDER BY date_iso DESC", (now, cap)).fetchall()
+        return [r[0] for r in rows]
+
+    def job(self, meet: str) -> Optional[dict]:
+        with self._lock:
+            cur = self.conn.execute("SELECT * FROM scrape_jobs WHERE date_iso=?", (to_iso(meet),))
+            row = cur.fetchone()
+            return dict(zip([c[0] for c in cur.description], row)) if row else None
+
+    def summary(self) -> dict:
+        with self._lock:
+            return dict(self.conn.execute(
+                "SELECT state, COUNT(*) FROM scrape_jobs GROUP BY state").fetchall())
+
+    # --- meeting numbers ---------------------------------------------------
+    def claim_meeting_no(self, meet: str) -> int:
+        """The job's existing meeting number (re-scrape replaces in place),
+        else MAX(manifest, files) + 1."""
+        with self._lock:
+            row = self.conn.execute("SELECT meeting_no FROM scrape_jobs WHERE date_iso=?",
+                                    (to_iso(meet),)).fetchone()
+            if row and row[0] is not None:
+                return row[0]
+            if self._next_n is None:
+                db_max = self.conn.execute(
+                    "SELECT COALESCE(MAX(meeting_no), 0) FROM scrape_jobs").fetchone()[0]
+                self._next_n = max(db_max, max_file_meeting_no(self.raw_dir)) + 1
+            n = self._next_n
+            self._next_n += 1
+            return n
+
+    # --- outcomes ----------------------------------------------------------
+    def _finish(self, meet, state, **cols):
+        sets = ", ".join(f"{k}=?" for k in cols)
+        with self._lock, self.conn:
+            self.conn.execute(
+                f"UPDATE scrape_jobs SET state=?, attempts=attempts+1, updated_at=?"
+                f"{', ' + sets if sets else ''} WHERE date_iso=?",
+                (state, _now_text(), *cols.values(), to_iso(meet)))
+
+    def mark_ok(self, meet, meeting_no: int, sha256: str, n_races: int, abandoned=False):
+        self._finish(meet, 'abandoned' if abandoned else 'ok', meeting_no=meeting_no,
+                     sha256=sha256, n_races=n_races, last_error=None)
+
+    def mark_empty(self, meet):
+        self._finish(meet, 'empty', last_error=None)
+
+    def mark_failed(self, meet, error: str) -> float:
+        """Record a failure; returns the backoff (s) before the next try."""
+        with self._lock:
+            row = self.conn.execute("SELECT attempts FROM scrape_jobs WHERE date_iso=?",
+                                    (to_iso(meet),)).fetchone()
+        wait = backoff_seconds((row[0] if row else 0) + 1)
+        self._finish(meet, 'failed', last_error=str(error)[:500], next_try=time.time() + wait)
+        return wait
+
+    # --- legacy import -----------------------------------------------------
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM scrape_jobs").fetchone()[0] == 0
+
+    def import_legacy(self, calendar=None) -> dict:
+        """Seed from existing CSVs and the old progress files. Only dates
+        with meeting files are trusted as done; 'processed' dates the
+        calendar confirms are not meetings become empty; the rest (which
+        may be swallowed failures) go back to pending."""
+        scraped = csv_meetings(self.raw_dir)
+        listed = set()
+        for name in LEGACY_PROGRESS_FILES:
+            path = os.path.join(self.raw_dir, name)
+            if os.path.exists(path):
+                with open(path) as f:
+                    listed |= {ln.strip() for ln in f if ln.strip()}
+        rows = []
+        for meet, n in scraped.items():
+            rows.append((to_iso(meet), meet, 'ok', 1, n))
+        n_empty = 0
+        for meet in listed - set(scraped):
+            try:
+                iso = to_iso(meet)
+            except ValueError:
+                continue
+            if calendar is not None and calendar.is_meeting(meet) is False:
+                rows.append((iso, meet, 'empty', 1, None))
+                n_empty += 1
+            else:
+                rows.append((iso, meet, 'pending', 0, None))
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO scrape_jobs "
+                "(date_iso, meet, state, attempts, meeting_no, source, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'legacy', ?)",
+                [r + (_now_text(),) for r in rows])
+        out = {'ok': len(scraped), 'empty': n_empty,
+               'pending': len(rows) - len(scraped) - n_empty}
+        log.info(f"Imported legacy progress: {out}")
+        return out
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    ap = argparse.ArgumentParser(description="Scrape job manifest status")
+    ap.add_argument('--db', default=MANIFEST_DB)
+    ap.add_argument('--list', choices=STATES, default=None, help="list jobs in this state")
+    args = ap.parse_args()
+    if not os.path.exists(args.db):
+        ap.error(f"no manifest at {args.db} (created by the first scraper run)")
+    jm = JobManifest(args.db)
+    try:
+        s = jm.summary()
+        log.info(" | ".join(f"{k}={s.get(k, 0)}" for k in STATES))
+        log.info(f"due now: {len(jm.due())}")
+        if args.list:
+            with jm._lock:
+                rows = jm.conn.execute(
+                    "SELECT meet, attempts, meeting_no, last_error FROM scrape_jobs "
+                    "WHERE state=? ORDER BY date_iso", (args.list,)).fetchall()
+            for meet, attempts, n, err in rows:
+                log.info(f"  {meet}  attempts={attempts}  meeting={n}  {err or ''}")
+    finally:
+        jm.close()
+
+
+if __name__ == "__main__":
+    main()